@@ -0,0 +1,125 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+from typing import Literal, Optional
+from core.config import settings
+from core.profiling import StackSampler, container_sizes, memory_tracer
+from services.auto_movement import TICK_SECONDS, AutoMovementService, auto_movement
+
+router = APIRouter()
+
+# One sampling capture at a time; concurrent samplers would skew each other
+_capture_lock = asyncio.Lock()
+
+ProfileFormat = Literal['folded', 'json']
+
+
+def _profile_response(sampler: StackSampler, profile_format: str, **extra):
+    if profile_format == 'folded':
+        return PlainTextResponse(sampler.folded(), headers={"X-Profile-Samples": str(sampler.samples)})
+    return {**extra, **sampler.summary()}
+
+
+async def _within(awaitable, timeout: float):
+    try:
+        await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Capture did not finish within {timeout}s")
+
+
+async def _tick_count_reaches(target: int):
+    while TICK_SECONDS.count() < target:
+        await asyncio.sleep(0.01)
+
+
+# Sampling profile of the movement loop over the next N ticks
+@router.get("/admin/profile/ticks")
+async def profile_ticks(
+    ticks: int = Query(5, ge=1, le=1000),
+    interval: float = Query(settings.profile_interval, ge=0.001, le=0.1),
+    profile_format: ProfileFormat = Query('folded', alias="format")
+):
+
+    if not auto_movement.is_running:
+        raise HTTPException(status_code=409, detail="Auto-movement is not running")
+    if _capture_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+
+    async with _capture_lock:
+        # Start on a tick boundary so the capture holds whole ticks only
+        await _within(_tick_count_reaches(TICK_SECONDS.count() + 1), settings.profile_max_seconds)
+
+        sampler = StackSampler([AutoMovementService._process_all_bots.__code__], interval)
+        sampler.start()
+        try:
+            await _within(_tick_count_reaches(TICK_SECONDS.count() + ticks), settings.profile_max_seconds)
+        finally:
+            sampler.stop()
+
+    return _profile_response(sampler, profile_format, ticks=ticks)
+
+
+# Sampling profile of one endpoint's handler for a number of seconds of live traffic
+@router.get("/admin/profile/requests")
+async def profile_requests(
+    request: Request,
+    path: str,
+    method: str = "GET",
+    seconds: float = Query(10.0, gt=0),
+    interval: float = Query(settings.profile_interval, ge=0.001, le=0.1),
+    profile_format: ProfileFormat = Query('folded', alias="format")
+):
+
+    seconds = min(seconds, settings.profile_max_seconds)
+    scope = {"type": "http", "path": path, "root_path": "", "method": method.upper()}
+    endpoint = next(
+        (route.endpoint for route in request.app.routes
+         if getattr(route, "endpoint", None) and route.matches(scope)[0] == Match.FULL),
+        None
+    )
+    if endpoint is None:
+        raise HTTPException(status_code=404, detail=f"No route for {method.upper()} {path}")
+    if _capture_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile capture is already running")
+
+    async with _capture_lock:
+        # Sync handlers run in the threadpool and async ones on the loop; the sampler sees both
+        sampler = StackSampler([endpoint.__code__], interval)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+
+    return _profile_response(sampler, profile_format, endpoint=endpoint.__name__)
+
+
+# Start tracemalloc and take the baseline snapshot
+@router.post("/admin/memory/start")
+def start_memory_trace(frames: int = Query(10, ge=1, le=100)):
+
+    return memory_tracer.start(frames)
+
+
+# Allocation growth since the baseline, plus the movement loop's per-bot state sizes
+@router.get("/admin/memory/diff")
+def memory_diff(
+    top: int = Query(25, ge=1, le=500),
+    group_by: Literal['lineno', 'traceback'] = 'lineno',
+    file: Optional[str] = Query(None, description="Only allocations from files matching this, e.g. auto_movement.py")
+):
+
+    try:
+        diff = memory_tracer.diff(top, group_by, file)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {**diff, "auto_movement": container_sizes(auto_movement)}
+
+
+# Stop tracemalloc and drop the baseline
+@router.post("/admin/memory/stop")
+def stop_memory_trace():
+
+    memory_tracer.stop()
+    return memory_tracer.status()
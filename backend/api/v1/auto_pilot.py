@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from core.compact import COMPACT_JSON_MEDIA_TYPE, encode_route, wants_compact
+from core.responses import fast_json
 from services.auto_movement import auto_movement
 import asyncio
 router = APIRouter()
@@ -26,11 +28,18 @@ async def get_auto_movement_status():
     return {
         "is_running": auto_movement.is_running,
         "move_interval": auto_movement.move_interval,
-        "active_routes": len(auto_movement.bot_routes)
+        "active_routes": len(auto_movement.bot_routes),
+        "tick": auto_movement.get_tick_stats()
     }
 
 # Get auto-movement progress
 @router.get("/auto-movement/bot/{bot_id}/progress")
-async def get_bot_progress(bot_id: int):
+async def get_bot_progress(bot_id: int, request: Request):
     
-    return auto_movement.get_bot_progress(bot_id)
\ No newline at end of file
+    progress = auto_movement.get_bot_progress(bot_id)
+    if not wants_compact(request.headers.get("accept")):
+        return fast_json(progress)
+
+    if "route" in progress:
+        progress["route"] = encode_route(progress["route"])
+    return fast_json(progress, media_type=COMPACT_JSON_MEDIA_TYPE)
\ No newline at end of file
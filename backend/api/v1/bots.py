@@ -1,34 +1,45 @@
 # app/api/v1/bots.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional
-from core.database import get_db
+from core.pagination import parse_fields, cursor_headers
+from core.responses import fast_json, model_rows
 from models.bot import Bot
-from models.order import Order
+from repositories import Repositories, get_repositories
 from schemas.bot import BotCreate, BotUpdate, BotResponse
+from schemas.order import OrderResponse
+from services.order_latency import set_order_status
 from services.route_algorithm import RouteOptimizer
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 # Create a new bot
 @router.post("/bots/", response_model=BotResponse)
-async def create_bot(bot: BotCreate, db: Session = Depends(get_db)):
+async def create_bot(bot: BotCreate, repos: Repositories = Depends(get_repositories)):
 
-    db_bot = Bot(**bot.model_dump())
-    db.add(db_bot)
-    db.commit()
-    db.refresh(db_bot)
+    db_bot = repos.bots.create(bot.model_dump())
+    repos.commit()
     return db_bot
 # Get all bots
 @router.get("/bots/", response_model=List[BotResponse])
-async def get_bots(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_bots(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    repos: Repositories = Depends(get_repositories)
+):
 
-    bots = db.query(Bot).offset(skip).limit(limit).all()
-    return bots
+    field_list = parse_fields(fields, BotResponse.model_fields)
+    bots, next_cursor = repos.bots.page(cursor, limit, field_list, offset=skip)
+    
+    return fast_json(model_rows(bots, BotResponse), headers=cursor_headers(next_cursor))
 # Get the specify bot
 @router.get("/bots/{bot_id}", response_model=BotResponse)
-async def get_bot(bot_id: int, db: Session = Depends(get_db)):
+async def get_bot(bot_id: int, repos: Repositories = Depends(get_repositories)):
     
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = repos.bots.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     return bot
@@ -38,10 +49,10 @@ async def get_bot(bot_id: int, db: Session = Depends(get_db)):
 async def update_bot(
     bot_id: int,
     bot_update: BotUpdate,
-    db: Session = Depends(get_db)
+    repos: Repositories = Depends(get_repositories)
 ):
 
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = repos.bots.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -49,29 +60,25 @@ async def update_bot(
         if hasattr(bot, field):
             setattr(bot, field, value)
     
-    db.commit()
-    db.refresh(bot)
+    repos.commit()
     
     return bot
 
 # Get bot route
 @router.get("/bots/{bot_id}/route")
-async def get_bot_route(bot_id: int, db: Session = Depends(get_db)):
+async def get_bot_route(bot_id: int, repos: Repositories = Depends(get_repositories)):
     
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = repos.bots.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    orders = db.query(Order).filter(
-        Order.bot_id == bot_id,
-        Order.status.in_(['ASSIGNED', 'PICKED_UP'])
-    ).all()
+    orders = repos.orders.list_in_progress_for_bot(bot_id)
     
     if not orders:
         return {"route_points": [], "total_distance": 0, "estimated_time": 0}
     
     # Calculate optimized route
-    route_optimizer = RouteOptimizer(db)
+    route_optimizer = RouteOptimizer(repos)
     route = route_optimizer.optimize_delivery_route(bot, orders)
     
     return route
@@ -82,10 +89,10 @@ async def move_bot(
     bot_id: int,
     x: int,
     y: int,
-    db: Session = Depends(get_db)
+    repos: Repositories = Depends(get_repositories)
 ):
 
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = repos.bots.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -96,10 +103,10 @@ async def move_bot(
     old_x, old_y = bot.current_x, bot.current_y
     bot.current_x = x
     bot.current_y = y
-    db.commit()
+    repos.commit()
     
 
-    await check_bot_location_updates(bot, db)
+    await check_bot_location_updates(bot, repos)
     
     return {
         "message": f"Bot moved from ({old_x}, {old_y}) to ({x}, {y})",
@@ -108,36 +115,42 @@ async def move_bot(
     }
 
 # Get bot's order
-@router.get("/bots/{bot_id}/orders")
-async def get_bot_orders(bot_id: int, db: Session = Depends(get_db)):
+@router.get("/bots/{bot_id}/orders", response_model=List[OrderResponse])
+async def get_bot_orders(
+    bot_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    archived: bool = False,
+    repos: Repositories = Depends(get_repositories)
+):
     
-    bot = db.query(Bot).filter(Bot.id == bot_id).first()
+    bot = repos.bots.get(bot_id)
     if not bot:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    orders = db.query(Order).filter(Order.bot_id == bot_id).all()
-    return orders
+    field_list = parse_fields(fields, OrderResponse.model_fields)
+    orders, next_cursor = repos.orders.page(cursor, limit, field_list, bot_id=bot_id, archived=archived)
+    
+    return fast_json(model_rows(orders, OrderResponse), headers=cursor_headers(next_cursor))
 
-async def check_bot_location_updates(bot: Bot, db: Session):
+async def check_bot_location_updates(bot: Bot, repos: Repositories):
     
-    orders = db.query(Order).filter(
-        Order.bot_id == bot.id,
-        Order.status.in_(['ASSIGNED', 'PICKED_UP'])
-    ).all()
+    orders = repos.orders.list_in_progress_for_bot(bot.id)
     
     for order in orders:
         # Check pickup
         if (order.status == 'ASSIGNED' and 
             bot.current_x == order.pickup_x and 
             bot.current_y == order.pickup_y):
-            order.status = 'PICKED_UP'
-            print(f"Bot {bot.id} picked up order {order.id}")
+            set_order_status(order, 'PICKED_UP', repos.now())
+            logger.info("Bot %s picked up order %s", bot.id, order.id, extra={"bot_id": bot.id, "order_id": order.id})
         
         # Check delivery
         elif (order.status == 'PICKED_UP' and 
             bot.current_x == order.delivery_x and 
             bot.current_y == order.delivery_y):
-            order.status = 'DELIVERED'
+            set_order_status(order, 'DELIVERED', repos.now())
             bot.current_orders -= 1
             
             # Update bot status if no more orders
@@ -146,6 +159,6 @@ async def check_bot_location_updates(bot: Bot, db: Session):
             elif bot.current_orders < bot.max_capacity:
                 bot.status = 'IDLE'
             
-            print(f"Bot {bot.id} delivered order {order.id}")
+            logger.info("Bot %s delivered order %s", bot.id, order.id, extra={"bot_id": bot.id, "order_id": order.id})
     
-    db.commit()
\ No newline at end of file
+    repos.commit()
\ No newline at end of file
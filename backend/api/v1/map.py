@@ -1,61 +1,94 @@
 # app/api/v1/map_api.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from core.database import get_db
-from models.node import Node
-from models.bot import Bot
-from models.order import Order
+import io
+import threading
+from dataclasses import asdict
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from typing import List, Optional
+from core.compact import GRID_MEDIA_TYPE, encode_grid, encode_node_flags, wants_compact
+from core.config import settings
+from core.responses import fast_json, model_rows, snapshot_cache
+from models.order import ACTIVE_STATUSES, IN_PROGRESS_STATUSES
+from repositories import Repositories, get_repositories
 from schemas.node import NodeResponse
-from models.blocked_path import BlockedPath
+from services.auto_movement import auto_movement
+from services.demand_model import demand_model
+from services.map_data import cell_for
+from services.map_importer import GridMismatchError, import_map
+from services.node_index import node_index
 
 router = APIRouter()
 
+# One map import at a time
+_import_lock = threading.Lock()
+
 # Get a map grid
+# Plain def: on a large grid building and serializing it is real work, keep it off the event loop
 @router.get("/map/grid")
-async def get_map_grid(db: Session = Depends(get_db)):
+def get_map_grid(request: Request, repos: Repositories = Depends(get_repositories)):
+
+    cells = node_index.cells(repos)
+    if wants_compact(request.headers.get("accept")):
+        return snapshot_cache.response(
+            "map/grid.compact", node_index.version, lambda: build_compact_grid(repos, cells, settings.grid_size),
+            ttl=settings.snapshot_ttl, media_type=GRID_MEDIA_TYPE
+        )
+
+    # Bots and orders change every tick; the snapshot is shared by every poll within snapshot_ttl
+    return snapshot_cache.response(
+        "map/grid", node_index.version, lambda: build_map_grid(repos, cells, settings.grid_size), ttl=settings.snapshot_ttl
+    )
+
+def build_map_grid(repos: Repositories, cells, grid_size: int) -> dict:
 
-    # Get all nodes
-    nodes = db.query(Node).all()
-    
     # Get all bots with current positions
-    bots = db.query(Bot).all()
+    bots = repos.bots.list_all()
     
     # Get active orders
-    active_orders = db.query(Order).filter(
-        Order.status.in_(['PENDING', 'ASSIGNED', 'PICKED_UP'])
-    ).all()
+    active_orders = repos.orders.list_by_status(ACTIVE_STATUSES)
     
-    # Create 9x9 grid structure
+    return {
+        "grid": build_cells(cells, range(grid_size), range(grid_size), bots, active_orders),
+        "grid_size": grid_size,
+        "total_nodes": len(cells),
+        "total_bots": len(bots),
+        "active_orders": len(active_orders)
+    }
+
+def build_viewport(repos: Repositories, cells, x0: int, y0: int, x1: int, y1: int) -> dict:
+
+    # Only what lies in the box, through the spatial indexes
+    bots = repos.bots.list_in_box(x0, y0, x1, y1)
+    active_orders = repos.orders.list_active_in_box(x0, y0, x1, y1)
+
+    return {
+        "grid": build_cells(cells, range(x0, x1 + 1), range(y0, y1 + 1), bots, active_orders),
+        "bounds": {"x0": x0, "y0": y0, "x1": x1, "y1": y1},
+        "grid_size": settings.grid_size,
+        "tile_size": settings.tile_size,
+        "total_bots": len(bots),
+        "active_orders": len(active_orders)
+    }
+
+def build_cells(cells, xs: range, ys: range, bots: list, active_orders: list) -> dict:
+    
+    # Create grid structure, filled in from the node index
     grid = {}
-    for y in range(9):
-        for x in range(9):
+    for y in ys:
+        for x in xs:
+            node = cells.get((x, y))
             grid[f"{x},{y}"] = {
                 "x": x,
                 "y": y,
-                "node_type": "NODE",
-                "is_delivery_point": False,
-                "is_restaurant": False,
-                "is_bot_station": False,
-                "restaurant_type": None,
-                "name": f"Node_{x}_{y}",
+                "node_type": node.node_type if node else "NODE",
+                "is_delivery_point": node.is_delivery_point if node else False,
+                "is_restaurant": node.is_restaurant if node else False,
+                "is_bot_station": node.is_bot_station if node else False,
+                "restaurant_type": node.restaurant_type if node else None,
+                "name": (node.name if node else None) or f"Node_{x}_{y}",
                 "bots": [],
                 "active_orders": []
             }
     
-    # Fill in node information
-    for node in nodes:
-        key = f"{node.x},{node.y}"
-        if key in grid:
-            grid[key].update({
-                "node_type": node.node_type,
-                "is_delivery_point": node.is_delivery_point,
-                "is_restaurant": node.is_restaurant,
-                "is_bot_station": node.is_bot_station,
-                "restaurant_type": node.restaurant_type,
-                "name": node.name or f"Node_{node.x}_{node.y}"
-            })
-    
     # Add bot positions
     for bot in bots:
         key = f"{bot.current_x},{bot.current_y}"
@@ -93,27 +126,59 @@ async def get_map_grid(db: Session = Depends(get_db)):
                 "location_type": "delivery"
             })
     
-    return {
-        "grid": grid,
-        "grid_size": 9,
-        "total_nodes": len(nodes),
-        "total_bots": len(bots),
-        "active_orders": len(active_orders)
-    }
+    return grid
+
+def build_compact_grid(repos: Repositories, cells, grid_size: int) -> bytes:
+    """The grid as packed node flags plus bot and order columns, see core/compact.py"""
+    # Node flags only change with the map; bots and orders are re-packed every snapshot
+    flags = snapshot_cache.get(
+        f"map/grid.flags/{grid_size}", node_index.version, lambda: encode_node_flags(cells, grid_size)
+    )
+    bots = repos.bots.list_all()
+    active_orders = repos.orders.list_by_status(ACTIVE_STATUSES)
+    return encode_grid(grid_size, flags, bots, active_orders)
+
+# Get the cells, bots and active orders inside a box (inclusive corners)
+# Plain def for the same reason as /map/grid
+@router.get("/map/viewport")
+def get_map_viewport(
+    x0: int = Query(..., ge=0),
+    y0: int = Query(..., ge=0),
+    x1: int = Query(..., ge=0),
+    y1: int = Query(..., ge=0),
+    repos: Repositories = Depends(get_repositories)
+):
+
+    if x1 < x0 or y1 < y0:
+        raise HTTPException(status_code=400, detail="Viewport needs x0 <= x1 and y0 <= y1")
+    x1, y1 = min(x1, settings.grid_size - 1), min(y1, settings.grid_size - 1)
+    if x0 > x1 or y0 > y1:
+        raise HTTPException(status_code=400, detail="Viewport lies outside the map")
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > settings.viewport_max_cells:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Viewport covers more than {settings.viewport_max_cells} cells, request smaller boxes"
+        )
+
+    cells = node_index.cells(repos)
+    return fast_json(build_viewport(repos, cells, x0, y0, x1, y1))
 
 # Get all Nodes
 @router.get("/map/nodes", response_model=List[NodeResponse])
-async def get_all_nodes(db: Session = Depends(get_db)):
+async def get_all_nodes(repos: Repositories = Depends(get_repositories)):
 
-    return db.query(Node).all()
+    # Nodes only change with the map, so the serialized list lives as long as the index version
+    node_index.ensure_loaded(repos)
+    return snapshot_cache.response(
+        "map/nodes", node_index.version, lambda: model_rows(repos.nodes.list_all(), NodeResponse)
+    )
 
 # Get all Restaurants
 @router.get("/map/restaurants")
-async def get_restaurants(db: Session = Depends(get_db)):
+async def get_restaurants(repos: Repositories = Depends(get_repositories)):
 
-    restaurants = db.query(Node).filter(Node.is_restaurant == True).all()
-    
-    return [
+    node_index.ensure_loaded(repos)
+    return snapshot_cache.response("map/restaurants", node_index.version, lambda: [
         {
             "id": r.id,
             "x": r.x,
@@ -121,41 +186,42 @@ async def get_restaurants(db: Session = Depends(get_db)):
             "restaurant_type": r.restaurant_type,
             "name": r.name
         }
-        for r in restaurants
-    ]
+        for r in repos.nodes.list_restaurants()
+    ])
 
 # Get all Delivery point
 @router.get("/map/delivery-points")
-async def get_delivery_points(db: Session = Depends(get_db)):
+async def get_delivery_points(repos: Repositories = Depends(get_repositories)):
 
-    houses = db.query(Node).filter(Node.is_delivery_point == True).all()
-    
-    return [
+    node_index.ensure_loaded(repos)
+    return snapshot_cache.response("map/delivery-points", node_index.version, lambda: [
         {
             "id": h.id,
             "x": h.x,
             "y": h.y,
             "name": h.name
         }
-        for h in houses
-    ]
+        for h in repos.nodes.list_delivery_points()
+    ])
 
 # Get map statistics
 @router.get("/map/stats")
-async def get_map_stats(db: Session = Depends(get_db)):
+async def get_map_stats(repos: Repositories = Depends(get_repositories)):
 
-    total_nodes = db.query(Node).count()
-    restaurants = db.query(Node).filter(Node.is_restaurant == True).count()
-    houses = db.query(Node).filter(Node.is_delivery_point == True).count()
-    bot_stations = db.query(Node).filter(Node.is_bot_station == True).count()
+    total_nodes = len(repos.nodes.list_all())
+    restaurants = len(repos.nodes.list_restaurants())
+    houses = len(repos.nodes.list_delivery_points())
+    bot_stations = len(repos.nodes.list_bot_stations())
     
-    total_bots = db.query(Bot).count()
-    idle_bots = db.query(Bot).filter(Bot.status == 'IDLE').count()
-    busy_bots = db.query(Bot).filter(Bot.status == 'BUSY').count()
+    bots = repos.bots.list_all()
+    total_bots = len(bots)
+    idle_bots = sum(1 for bot in bots if bot.status == 'IDLE')
+    busy_bots = sum(1 for bot in bots if bot.status == 'BUSY')
     
-    pending_orders = db.query(Order).filter(Order.status == 'PENDING').count()
-    active_orders = db.query(Order).filter(Order.status.in_(['ASSIGNED', 'PICKED_UP'])).count()
-    delivered_orders = db.query(Order).filter(Order.status == 'DELIVERED').count()
+    pending_orders = repos.orders.count_by_status(('PENDING',))
+    active_orders = repos.orders.count_by_status(IN_PROGRESS_STATUSES)
+    # Includes orders already moved to the archive
+    delivered_orders = repos.orders.count_by_status(('DELIVERED',))
     
     return {
         "map": {
@@ -177,18 +243,74 @@ async def get_map_stats(db: Session = Depends(get_db)):
     }
 
 
+# Get predicted order demand per restaurant cell and where idle bots are waiting for it
+@router.get("/map/demand")
+async def get_demand_heatmap(
+    limit: int = Query(100, ge=1, le=10000),
+    repos: Repositories = Depends(get_repositories)
+):
+
+    return {
+        "policy": settings.idle_policy,
+        "bucket_minutes": demand_model.bucket_minutes,
+        "cells": demand_model.heatmap(repos.now(), limit),
+        "waiting": [
+            {"bot_id": bot_id, "x": x, "y": y}
+            for bot_id, (x, y) in sorted(auto_movement.idle_targets.items())
+        ]
+    }
+
+# Import a new map from sample_data.csv and/or BlockedPaths.csv uploads
+# Plain def: FastAPI runs it in the threadpool, so a large import doesn't stall the event loop
+@router.post("/map/import")
+def import_map_files(
+    sample_data: Optional[UploadFile] = File(None),
+    blocked_paths: Optional[UploadFile] = File(None),
+    skip_invalid: bool = Query(False, description="Leave invalid rows out instead of rejecting the import"),
+    repos: Repositories = Depends(get_repositories)
+):
+
+    if sample_data is None and blocked_paths is None:
+        raise HTTPException(status_code=400, detail="Upload sample_data and/or blocked_paths")
+    
+    if not _import_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A map import is already running")
+    
+    try:
+        report = import_map(
+            repos, _upload_lines(sample_data), _upload_lines(blocked_paths), settings.grid_size, skip_invalid
+        )
+        if report.applied:
+            # Swap in the new map for order validation and bot movement
+            node_index.load(repos)
+            report.map_version = node_index.version
+            auto_movement.request_map_reload()
+    except GridMismatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        _import_lock.release()
+    
+    if not report.applied:
+        raise HTTPException(status_code=422, detail=asdict(report))
+    
+    return asdict(report)
+
+def _upload_lines(upload: Optional[UploadFile]):
+    # Stream the spooled upload line by line instead of reading it into memory
+    if upload is None:
+        return None
+    return io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+
 # Get blocked path
 @router.get("/map/blocked-paths")
-async def get_blocked_paths(db: Session = Depends(get_db)):
+async def get_blocked_paths(repos: Repositories = Depends(get_repositories)):
 
-    blocked_paths = db.query(BlockedPath).all()
+    blocked_paths = repos.blocked_paths.list_pairs()
     
     visualization_data = []
-    for blocked in blocked_paths:
-        from_x = (blocked.from_node_id - 1) % 9
-        from_y = (blocked.from_node_id - 1) // 9
-        to_x = (blocked.to_node_id - 1) % 9
-        to_y = (blocked.to_node_id - 1) // 9
+    for from_node_id, to_node_id in blocked_paths:
+        from_x, from_y = cell_for(from_node_id, settings.grid_size)
+        to_x, to_y = cell_for(to_node_id, settings.grid_size)
         
         visualization_data.append({
             "from_x": from_x, "from_y": from_y,
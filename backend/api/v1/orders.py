@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from core.database import get_db
-from models.order import Order
-from models.node import Node
-from schemas.order import OrderCreate, OrderUpdate, OrderResponse
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from core.config import settings
+from core.events import ORDER_CHANGED, events
+from core.pagination import parse_fields, cursor_headers
+from core.responses import fast_json, model_rows
+from repositories import Repositories, get_repositories, open_repositories
+from schemas.order import (
+    OrderCreate, OrderUpdate, OrderResponse,
+    OrderBulkCreate, OrderBulkResult, OrderBulkResponse
+)
 from services.bot_manager import BotManager
-from core.database import SessionLocal
-from models.bot import Bot
+from services.demand_model import demand_model
+from services.node_index import node_index
+from services.order_latency import GROUPS, STAGES, order_latency, set_order_status
+import csv
 import datetime
+import io
+import json
 
 router = APIRouter()
 
@@ -17,14 +26,11 @@ router = APIRouter()
 async def create_order(
     order: OrderCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    repos: Repositories = Depends(get_repositories)
 ):  
-    pickup_node = db.query(Node).filter(
-        Node.x == order.pickup_x,
-        Node.y == order.pickup_y,
-        Node.is_restaurant == True,
-        Node.restaurant_type == order.restaurant_type.upper()
-    ).first()
+    pickup_node = node_index.find_restaurant(
+        repos, order.pickup_x, order.pickup_y, order.restaurant_type
+    )
     
     if not pickup_node:
         raise HTTPException(
@@ -32,11 +38,7 @@ async def create_order(
             detail=f"No {order.restaurant_type} restaurant found at position ({order.pickup_x}, {order.pickup_y})"
         )
     
-    delivery_node = db.query(Node).filter(
-        Node.x == order.delivery_x,
-        Node.y == order.delivery_y,
-        Node.is_delivery_point == True
-    ).first()
+    delivery_node = node_index.find_delivery_point(repos, order.delivery_x, order.delivery_y)
     
     if not delivery_node:
         raise HTTPException(
@@ -44,69 +46,223 @@ async def create_order(
             detail=f"Invalid delivery location at position ({order.delivery_x}, {order.delivery_y})"
         )
     
-    time_threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=30)
-    recent_orders = db.query(Order).filter(
-        Order.pickup_x == order.pickup_x,
-        Order.pickup_y == order.pickup_y,
-        Order.status.in_(['PENDING', 'ASSIGNED', 'PICKED_UP']),
-        Order.created_at >= time_threshold
-    ).count()
+    time_threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        seconds=settings.restaurant_time_window
+    )
+    pickup_cell = (order.pickup_x, order.pickup_y)
+    recent_orders = repos.orders.count_recent_by_pickup([pickup_cell], time_threshold).get(pickup_cell, 0)
     
-    if recent_orders >= 3:
+    if recent_orders >= settings.restaurant_order_limit:
         raise HTTPException(
             status_code=429,
             detail="Restaurant is at capacity. Please try again later."
         )
     
-    db_order = Order(**order.model_dump())
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db_order = repos.orders.create({**order.model_dump(), "restaurant_id": pickup_node.id})
+    repos.commit()
+    demand_model.record(pickup_cell, repos.now())
     
     background_tasks.add_task(assign_order_to_bot, db_order.id)
     
     return db_order
 
+# Create a batch of Orders
+@router.post("/orders/bulk", response_model=OrderBulkResponse)
+async def create_orders_bulk(
+    payload: OrderBulkCreate,
+    background_tasks: BackgroundTasks,
+    repos: Repositories = Depends(get_repositories)
+):
+    results: List[Optional[OrderBulkResult]] = [None] * len(payload.orders)
+    valid = []
+
+    # Validate every order against the node index, no DB round trips
+    for index, order in enumerate(payload.orders):
+        pickup_node = node_index.find_restaurant(
+            repos, order.pickup_x, order.pickup_y, order.restaurant_type
+        )
+        if not pickup_node:
+            results[index] = OrderBulkResult(
+                index=index, status='REJECTED', status_code=400,
+                detail=f"No {order.restaurant_type} restaurant found at position ({order.pickup_x}, {order.pickup_y})"
+            )
+            continue
+
+        if not node_index.find_delivery_point(repos, order.delivery_x, order.delivery_y):
+            results[index] = OrderBulkResult(
+                index=index, status='REJECTED', status_code=400,
+                detail=f"Invalid delivery location at position ({order.delivery_x}, {order.delivery_y})"
+            )
+            continue
+
+        valid.append((index, order, pickup_node.id))
+
+    # One grouped count for every restaurant in the batch, then apply the limit across the batch
+    pickup_cells = {(order.pickup_x, order.pickup_y) for _, order, _ in valid}
+    load = {}
+    if pickup_cells:
+        time_threshold = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            seconds=settings.restaurant_time_window
+        )
+        load = repos.orders.count_recent_by_pickup(list(pickup_cells), time_threshold)
+
+    accepted = []
+    for index, order, restaurant_id in valid:
+        cell = (order.pickup_x, order.pickup_y)
+        if load.get(cell, 0) >= settings.restaurant_order_limit:
+            results[index] = OrderBulkResult(
+                index=index, status='REJECTED', status_code=429,
+                detail="Restaurant is at capacity. Please try again later."
+            )
+            continue
+
+        load[cell] = load.get(cell, 0) + 1
+        accepted.append((index, {
+            **order.model_dump(),
+            "restaurant_id": restaurant_id,
+            "status": 'PENDING'
+        }))
+
+    order_ids = []
+    if accepted:
+        order_ids = repos.orders.create_many([row for _, row in accepted])
+        repos.commit()
+
+        now = repos.now()
+        for _, row in accepted:
+            demand_model.record((row["pickup_x"], row["pickup_y"]), now)
+
+        for (index, _), order_id in zip(accepted, order_ids):
+            results[index] = OrderBulkResult(
+                index=index, status='CREATED', status_code=200, order_id=order_id
+            )
+
+        background_tasks.add_task(assign_orders_to_bots, order_ids)
+
+    return OrderBulkResponse(
+        created=len(order_ids),
+        rejected=len(results) - len(order_ids),
+        results=results
+    )
+
 # Assign the Order to the bot
 async def assign_order_to_bot(order_id: int):
 
-    db = SessionLocal()
-    try:
-        order = db.query(Order).filter(Order.id == order_id).first()
-        if order and order.status == 'PENDING':
-            bot_manager = BotManager(db)
-            assigned_bot = bot_manager.assign_order_to_best_bot(order)
-            
-            if assigned_bot:
-                print(f"Order {order_id} assigned to bot {assigned_bot.id}")
-                
-            else:
-                print(f"No available bot for order {order_id}")
-    finally:
-        db.close()
+    await assign_orders_to_bots([order_id])
+
+# Assign a batch of Orders to bots in one session
+async def assign_orders_to_bots(order_ids: List[int]):
+
+    with open_repositories() as repos:
+        orders = repos.orders.list_by_ids(order_ids, status='PENDING')
+        
+        if orders:
+            # BotManager logs each assignment; partial batches are left to the movement tick's dispatch
+            bot_manager = BotManager(repos)
+            bot_manager.assign_orders_to_best_bots(orders, hold=True)
 
 # Get all Order
 @router.get("/orders/", response_model=List[OrderResponse])
 async def get_orders(
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    archived: bool = False,
+    repos: Repositories = Depends(get_repositories)
 ):
 
-    query = db.query(Order)
+    field_list = parse_fields(fields, OrderResponse.model_fields)
+    orders, next_cursor = repos.orders.page(
+        cursor, limit, field_list, status=status.upper() if status else None,
+        offset=skip, archived=archived
+    )
     
-    if status:
-        query = query.filter(Order.status == status.upper())
+    # Rows come from our own store: serialize them directly instead of revalidating through OrderResponse
+    return fast_json(model_rows(orders, OrderResponse), headers=cursor_headers(next_cursor))
+
+# Export order history as a stream
+@router.get("/orders/export")
+async def export_orders(
+    export_format: Literal['ndjson', 'csv'] = Query('ndjson', alias="format"),
+    status: Optional[str] = None,
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    bot_id: Optional[int] = None,
+    archived: bool = False
+):
+
+    filters = {
+        "status": status.upper() if status else None,
+        "created_from": created_from,
+        "created_to": created_to,
+        "bot_id": bot_id,
+        "archived": archived
+    }
     
-    orders = query.offset(skip).limit(limit).all()
-    return orders
+    media_type = "text/csv" if export_format == 'csv' else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_orders(filters, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{export_format}"'}
+    )
+
+EXPORT_COLUMNS = [*OrderResponse.model_fields, "restaurant_id"]
+
+def _stream_orders(filters: dict, export_format: str):
+    # Sync generator: Starlette runs it in the threadpool, one server-side batch at a time
+    with open_repositories() as repos:
+        batches = repos.orders.stream(
+            EXPORT_COLUMNS, batch_size=settings.export_batch_size, **filters
+        )
+        
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == 'csv' else None
+        if writer:
+            writer.writerow(EXPORT_COLUMNS)
+        
+        for partition in batches:
+            for row in partition:
+                if writer:
+                    writer.writerow([_csv_value(value) for value in row])
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_json_default))
+                    buffer.write("\n")
+            
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        
+        if buffer.tell():
+            yield buffer.getvalue()
+
+def _csv_value(value):
+    # Same timestamp format as the NDJSON export
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+# Latency percentiles per lifecycle stage, kept in memory as orders move through it
+@router.get("/orders/stats/latency")
+async def get_order_latency(
+    stage: Optional[Literal[tuple(STAGES)]] = None,
+    group_by: Optional[Literal[GROUPS]] = None
+):
+
+    return order_latency.snapshot(stage, group_by)
 
 # Get the specific Order
 @router.get("/orders/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: int, db: Session = Depends(get_db)):
+async def get_order(order_id: int, repos: Repositories = Depends(get_repositories)):
 
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = repos.orders.get(order_id)
+    if not order:
+        # Finished orders may already have been moved to the archive
+        order = repos.orders.get_archived(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
@@ -116,26 +272,34 @@ async def get_order(order_id: int, db: Session = Depends(get_db)):
 async def update_order(
     order_id: int,
     order_update: OrderUpdate,
-    db: Session = Depends(get_db)
+    repos: Repositories = Depends(get_repositories)
 ):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = repos.orders.get(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    for field, value in order_update.model_dump(exclude_unset=True).items():
+    changes = order_update.model_dump(exclude_unset=True)
+    status = changes.pop("status", None)
+    previous = (order.status, order.bot_id)
+    for field, value in changes.items():
         if hasattr(order, field):
             setattr(order, field, value)
+    if status and status != order.status:
+        set_order_status(order, status, repos.now())
+    
+    repos.commit()
     
-    db.commit()
-    db.refresh(order)
+    # The bot that had it repairs its plan now, not on its next full replan
+    if (order.status, order.bot_id) != previous:
+        events.publish(ORDER_CHANGED, order_id=order_id, bot_id=previous[1])
     
     return order
 
 # Delete the Order
 @router.delete("/orders/{order_id}")
-async def cancel_order(order_id: int, db: Session = Depends(get_db)):
+async def cancel_order(order_id: int, repos: Repositories = Depends(get_repositories)):
 
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = repos.orders.get(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -145,15 +309,18 @@ async def cancel_order(order_id: int, db: Session = Depends(get_db)):
             detail="Cannot cancel order that is already delivered or cancelled"
         )
     
-    order.status = 'CANCELLED'
+    set_order_status(order, 'CANCELLED', repos.now())
     
-    if order.bot_id:
-        bot = db.query(Bot).filter(Bot.id == order.bot_id).first()
+    bot_id = order.bot_id
+    if bot_id:
+        bot = repos.bots.get(bot_id)
         if bot:
             bot.current_orders -= 1
             if bot.current_orders < bot.max_capacity and bot.status == 'BUSY':
                 bot.status = 'IDLE'
     
-    db.commit()
+    repos.commit()
+    # The bot stops heading for the cancelled waypoints from its next step
+    events.publish(ORDER_CHANGED, order_id=order_id, bot_id=bot_id)
     
     return {"message": "Order cancelled successfully"}
@@ -1,25 +1,33 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from core.database import get_db
-from models.bot import Bot
-from models.order import Order
+from fastapi import APIRouter, Depends, Request
+from core.compact import COMPACT_JSON_MEDIA_TYPE, encode_route, wants_compact
+from core.responses import fast_json
+from repositories import Repositories, get_repositories
+from services.auto_movement import auto_movement
+from services.bot_manager import BotManager
 from services.route_algorithm import RouteOptimizer
 
 router = APIRouter()
 
 # Get optimized route
 @router.get("/routes/optimize")
-async def optimize_all_routes(db: Session = Depends(get_db)):
-    route_optimizer = RouteOptimizer(db)
+async def optimize_all_routes(request: Request, repos: Repositories = Depends(get_repositories)):
+
+    results = optimized_routes(repos, RouteOptimizer(repos))
+    if not wants_compact(request.headers.get("accept")):
+        return fast_json(results)
+
+    # Paths as start cell + direction runs instead of one [x, y] pair per step
+    for route in results.values():
+        route["detailed_path"] = encode_route(route["detailed_path"])
+    return fast_json(results, media_type=COMPACT_JSON_MEDIA_TYPE)
+
+def optimized_routes(repos: Repositories, route_optimizer: RouteOptimizer) -> dict:
     results = {}
     
-    bots = db.query(Bot).filter(Bot.current_orders > 0).all()
+    bots = [bot for bot in repos.bots.list_all() if bot.current_orders > 0]
     
     for bot in bots:
-        orders = db.query(Order).filter(
-            Order.bot_id == bot.id,
-            Order.status.in_(['ASSIGNED', 'PICKED_UP'])
-        ).all()
+        orders = repos.orders.list_in_progress_for_bot(bot.id)
         
         if orders:
             route = route_optimizer.optimize_delivery_route(bot, orders)
@@ -27,6 +35,20 @@ async def optimize_all_routes(db: Session = Depends(get_db)):
     
     return results
 
+# Assign pending orders, then move not-yet-picked-up ones to bots that reach them sooner
+@router.post("/routes/rebalance")
+async def rebalance_orders(repos: Repositories = Depends(get_repositories)):
+
+    route_optimizer = auto_movement.route_optimizer or RouteOptimizer(repos)
+    results = BotManager(repos, route_optimizer).rebalance_orders()
+    transfers = auto_movement.rebalance_assigned_orders(repos, route_optimizer)
+    
+    return {
+        **results,
+        "transferred_orders": len(transfers),
+        "transfers": transfers
+    }
+
 # Get route distance
 @router.get("/routes/distance")
 async def calculate_distance(
@@ -34,9 +56,9 @@ async def calculate_distance(
     start_y: int,
     end_x: int,
     end_y: int,
-    db: Session = Depends(get_db)
+    repos: Repositories = Depends(get_repositories)
 ):
-    route_optimizer = RouteOptimizer(db)
+    route_optimizer = RouteOptimizer(repos)
     path = route_optimizer.dijkstra((start_x, start_y), (end_x, end_y))
     
     return {
@@ -0,0 +1,128 @@
+# benchmarks/assignment.py - Bot selection cost against fleet size
+#
+#   python -m benchmarks.assignment                          # 100x100 city, 100 and 1000 bots
+#   python -m benchmarks.assignment --size 200 --fleets 500,5000 --orders 5
+#
+# "exhaustive" is the previous selection: a shortest path from every available bot to the
+# pickup. "nearest" is BotManager.select_nearest_bot: bots in rings around the pickup,
+# stopping once the Manhattan bound passes the best exact cost. Both must pick the same bot.
+import argparse
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import List
+from core.config import settings
+from core.log import setup_logging
+from repositories.memory import InMemoryStore, MemoryRepositories
+from services.bot_index import BotIndex
+from services.bot_manager import BotManager
+from services.map_generator import CityConfig, generate_city
+from services.route_algorithm import RouteOptimizer
+
+
+@dataclass
+class AssignmentResult:
+    grid_size: int
+    bots: int
+    orders: int
+    exhaustive_ms: float
+    nearest_ms: float
+    exhaustive_paths: float
+    nearest_paths: float
+    speedup: float
+
+
+class CountingOptimizer(RouteOptimizer):
+    paths = 0
+
+    def dijkstra(self, start, end):
+        self.paths += 1
+        return super().dijkstra(start, end)
+
+
+def exhaustive(manager: BotManager, order, bots):
+    best_bot, min_cost = None, float('inf')
+    pickup_pos = (order.pickup_x, order.pickup_y)
+    for bot in bots:
+        path = manager.route_optimizer.dijkstra((bot.current_x, bot.current_y), pickup_pos)
+        cost = (len(path) - 1 if path else float('inf')) + (2 if bot.status == 'BUSY' else 0)
+        if cost < min_cost:
+            best_bot, min_cost = bot, cost
+    return best_bot, min_cost
+
+
+def run(size: int, fleet: int, orders: int, seed: int) -> AssignmentResult:
+    rng = random.Random(seed)
+    map_data = generate_city(CityConfig(grid_size=size, seed=seed))
+    store = InMemoryStore(tile_size=settings.tile_size)
+    store.load_map(map_data)
+    free = [cell for cell, node in store.nodes.items() if node.node_type == 'NODE']
+    for i in range(fleet):
+        x, y = rng.choice(free)
+        store.add_bot(name=f"Bench-Bot-{i + 1}", current_x=x, current_y=y,
+                      status=rng.choice(['IDLE', 'BUSY']))
+
+    repos = MemoryRepositories(store)
+    optimizer = CountingOptimizer.from_map(map_data.grid_size, map_data.blocked_paths, map_data.restricted_nodes())
+    manager = BotManager(repos, optimizer, BotIndex(settings.tile_size))
+    restaurants = [n for n in map_data.nodes.values() if n.is_restaurant]
+    pickups = [rng.choice(restaurants) for _ in range(orders)]
+    jobs = [store.add_order(restaurant_type=r.restaurant_type, pickup_x=r.x, pickup_y=r.y,
+                            delivery_x=0, delivery_y=0) for r in pickups]
+    bots = manager.get_available_bots()
+
+    started, optimizer.paths = time.perf_counter(), 0
+    expected = [exhaustive(manager, order, bots) for order in jobs]
+    exhaustive_s, exhaustive_paths = time.perf_counter() - started, optimizer.paths
+
+    started, optimizer.paths = time.perf_counter(), 0
+    manager.bot_index.sync(bots)
+    candidates = {bot.id: bot for bot in bots}
+    found = [manager.select_nearest_bot(order, candidates) for order in jobs]
+    nearest_s, nearest_paths = time.perf_counter() - started, optimizer.paths
+
+    for (want_bot, want_cost), (got_bot, got_cost) in zip(expected, found):
+        if want_cost != got_cost or (want_bot and got_bot.id != want_bot.id):
+            raise AssertionError(f"Selections differ: {want_bot and want_bot.id}/{want_cost} vs "
+                                 f"{got_bot and got_bot.id}/{got_cost}")
+
+    return AssignmentResult(
+        grid_size=size, bots=fleet, orders=orders,
+        exhaustive_ms=round(exhaustive_s / orders * 1000, 3),
+        nearest_ms=round(nearest_s / orders * 1000, 3),
+        exhaustive_paths=round(exhaustive_paths / orders, 1),
+        nearest_paths=round(nearest_paths / orders, 1),
+        speedup=round(exhaustive_s / nearest_s, 1),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-order bot selection: every bot vs nearest rings")
+    parser.add_argument("--size", type=int, default=100, help="city grid side length")
+    parser.add_argument("--fleets", default="100,1000", help="comma separated bot counts")
+    parser.add_argument("--orders", type=int, default=5, help="orders selected per fleet size")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    setup_logging(level="WARNING")
+    results: List[AssignmentResult] = []
+    for fleet in (int(n) for n in args.fleets.split(",")):
+        results.append(run(args.size, fleet, args.orders, args.seed))
+        print(f"{fleet:>6} bots done", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+        return
+
+    print(f"{args.size}x{args.size} grid, tile size {settings.tile_size}, {args.orders} orders")
+    print(f"{'bots':>6} {'exhaustive ms':>14} {'nearest ms':>11} {'paths/order':>17} {'speedup':>8}")
+    for r in results:
+        paths = f"{r.exhaustive_paths:.0f} -> {r.nearest_paths:.1f}"
+        print(f"{r.bots:>6} {r.exhaustive_ms:>14.2f} {r.nearest_ms:>11.2f} {paths:>17} {r.speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+# benchmarks/load_test.py - Order intake and dispatch load test
+#
+#   python -m benchmarks.load_test --url http://localhost:8000 --secret $PASS_KEY --rates 6,12,24
+#   python -m benchmarks.load_test --in-process --rates 6,12     # in-memory backend, no server needed
+#
+# Arrivals are an open-loop, seeded Poisson process: slow responses don't slow the sender.
+# State changes are observed by polling, so lifecycle latencies carry +/- --poll-interval.
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+import httpx
+from core.config import settings
+from services.simulator import percentile
+
+API = "/api/v1"
+FINAL_STATUSES = ('DELIVERED', 'CANCELLED')
+LIFECYCLE = ('ASSIGNED', 'PICKED_UP', 'DELIVERED')
+
+
+@dataclass
+class StageReport:
+    rate_per_minute: float
+    duration: float
+    sent: int = 0
+    accepted: int = 0
+    rejected_429: int = 0
+    rejected_other: int = 0
+    errors: int = 0
+    delivered: int = 0
+    undelivered: int = 0
+    reject_rate: float = 0.0
+    delivered_per_minute: float = 0.0
+    intake_ms: Dict[str, Optional[float]] = field(default_factory=dict)
+    latency_s: Dict[str, Dict[str, Optional[float]]] = field(default_factory=dict)
+    tick_ms: Dict[str, Optional[float]] = field(default_factory=dict)
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None
+    }
+
+
+class LoadStage:
+    """One fixed-rate stage: submit orders, track them to DELIVERED, collect server tick stats"""
+
+    def __init__(self, client: httpx.AsyncClient, restaurants: list, houses: list, rate: float,
+                 duration: float, bulk_size: int, poll_interval: float, drain_timeout: float, seed: int):
+        self.client = client
+        self.restaurants = restaurants
+        self.houses = houses
+        self.rate = rate
+        self.duration = duration
+        self.bulk_size = bulk_size
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.rng = random.Random(seed)
+
+        self.report = StageReport(rate_per_minute=rate, duration=duration)
+        # order id -> status -> monotonic time first seen
+        self.orders: Dict[int, Dict[str, float]] = {}
+        self.intake_times: List[float] = []
+        self.tick_samples: List[float] = []
+        self.tick_max: Optional[float] = None
+        self._in_flight: set = set()
+        self._sending_done: Optional[float] = None
+
+    def _random_order(self) -> dict:
+        restaurant = self.rng.choice(self.restaurants)
+        house = self.rng.choice(self.houses)
+        return {
+            "customer_name": f"Load_{self.rng.randrange(1 << 30)}",
+            "restaurant_type": restaurant["restaurant_type"],
+            "pickup_x": restaurant["x"],
+            "pickup_y": restaurant["y"],
+            "delivery_x": house["x"],
+            "delivery_y": house["y"]
+        }
+
+    async def run(self) -> StageReport:
+        poller = asyncio.create_task(self._poll_until_done())
+        await self._send_arrivals()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+        self._sending_done = time.monotonic()
+        await poller
+        return self._finish()
+
+    async def _send_arrivals(self):
+        started = time.monotonic()
+        batch: List[dict] = []
+        next_arrival = started + self.rng.expovariate(self.rate / 60)
+
+        while next_arrival < started + self.duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.monotonic()))
+            batch.append(self._random_order())
+            next_arrival += self.rng.expovariate(self.rate / 60)
+
+            if len(batch) >= self.bulk_size:
+                self._submit(batch)
+                batch = []
+
+        if batch:
+            self._submit(batch)
+
+    def _submit(self, batch: List[dict]):
+        task = asyncio.create_task(self._post(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _post(self, batch: List[dict]):
+        self.report.sent += len(batch)
+        sent_at = time.monotonic()
+        try:
+            if self.bulk_size > 1:
+                response = await self.client.post(f"{API}/orders/bulk", json={"orders": batch})
+            else:
+                response = await self.client.post(f"{API}/orders/", json=batch[0])
+        except httpx.HTTPError:
+            self.report.errors += len(batch)
+            return
+        accepted_at = time.monotonic()
+        self.intake_times.append((accepted_at - sent_at) * 1000)
+
+        if self.bulk_size > 1 and response.status_code == 200:
+            for result in response.json()["results"]:
+                self._record_result(result["status_code"], result.get("order_id"), accepted_at)
+        else:
+            order_id = response.json().get("id") if response.status_code == 200 else None
+            self._record_result(response.status_code, order_id, accepted_at)
+
+    def _record_result(self, status_code: int, order_id: Optional[int], accepted_at: float):
+        if status_code == 200:
+            self.report.accepted += 1
+            self.orders[order_id] = {'PENDING': accepted_at}
+        elif status_code == 429:
+            self.report.rejected_429 += 1
+        else:
+            self.report.rejected_other += 1
+
+    async def _poll_until_done(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self._poll_orders()
+            await self._poll_ticks()
+
+            open_orders = [o for o in self.orders.values() if not any(s in o for s in FINAL_STATUSES)]
+            if self._sending_done is not None and (
+                not open_orders or time.monotonic() - self._sending_done > self.drain_timeout
+            ):
+                return
+
+    async def _poll_orders(self):
+        # One keyset-paged scan with a narrow projection per poll
+        now = time.monotonic()
+        params = {"limit": 1000, "fields": "id,status"}
+        while True:
+            response = await self.client.get(f"{API}/orders/", params=params)
+            if response.status_code != 200:
+                return
+            for row in response.json():
+                seen = self.orders.get(row["id"])
+                if seen is None or row["status"] in seen:
+                    continue
+                if row["status"] == 'CANCELLED':
+                    seen['CANCELLED'] = now
+                    continue
+                # Backfill states a poll skipped over, so every latency has a sample
+                for status in LIFECYCLE:
+                    seen.setdefault(status, now)
+                    if status == row["status"]:
+                        break
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    async def _poll_ticks(self):
+        response = await self.client.get(f"{API}/auto-movement/status")
+        if response.status_code != 200:
+            return
+        tick = response.json().get("tick") or {}
+        if tick.get("last_ms") is not None:
+            self.tick_samples.append(tick["last_ms"])
+            self.tick_max = max(self.tick_max or 0.0, tick["max_ms"])
+
+    def _finish(self) -> StageReport:
+        report = self.report
+        report.delivered = sum(1 for o in self.orders.values() if 'DELIVERED' in o)
+        report.undelivered = report.accepted - report.delivered
+        report.reject_rate = round(report.rejected_429 / report.sent, 4) if report.sent else 0.0
+        report.delivered_per_minute = round(report.delivered / self.duration * 60, 2)
+        report.intake_ms = summarize(self.intake_times)
+        report.latency_s = {
+            f"accepted_to_{status.lower()}": summarize([
+                round(o[status] - o['PENDING'], 3) for o in self.orders.values() if status in o
+            ])
+            for status in LIFECYCLE
+        }
+        samples = summarize(self.tick_samples)
+        report.tick_ms = {"p50": samples["p50"], "p95": samples["p95"], "max": self.tick_max}
+        return report
+
+
+def capacity(reports: List[StageReport], max_reject_rate: float, slo: Optional[float]) -> Optional[float]:
+    """Highest tested rate that kept rejections and delivery time within limits"""
+    passing = [
+        r.rate_per_minute for r in reports
+        if r.reject_rate <= max_reject_rate and r.undelivered == 0
+        and (slo is None or (r.latency_s["accepted_to_delivered"]["p95"] or 0) <= slo)
+    ]
+    return max(passing) if passing else None
+
+
+@contextlib.asynccontextmanager
+async def open_client(args):
+    if not args.in_process:
+        async with httpx.AsyncClient(
+            base_url=args.url, headers={"x-internal-secret": args.secret}, timeout=30.0
+        ) as client:
+            yield client
+        return
+
+    # The in-memory stand-in: the real app on the memory backend, served through ASGI
+    settings.repository_backend = "memory"
+    # Keep per-order logs out of the report
+    settings.log_level = "WARNING"
+    # Imported after the overrides above, which main reads at import; its lifespan seeds the
+    # store and then starts the movement loop
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.socket_app), base_url="http://load-test",
+            headers={"x-internal-secret": settings.secret_key}, timeout=30.0
+        ) as client:
+            yield client
+        main.auto_movement.stop_auto_movement()
+
+
+async def run(args) -> List[StageReport]:
+    reports = []
+    async with open_client(args) as client:
+        restaurants = (await client.get(f"{API}/map/restaurants")).json()
+        houses = (await client.get(f"{API}/map/delivery-points")).json()
+        if not restaurants or not houses:
+            raise SystemExit("Map has no restaurants or delivery points; run init_data.py first")
+
+        for i, rate in enumerate(args.rates):
+            print(f"Stage {i + 1}/{len(args.rates)}: {rate} orders/min for {args.duration}s", file=sys.stderr)
+            stage = LoadStage(
+                client, restaurants, houses, rate, args.duration, args.bulk,
+                args.poll_interval, args.drain_timeout, args.seed + i
+            )
+            reports.append(await stage.run())
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive order intake at fixed rates and measure dispatch latency")
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of a running backend")
+    parser.add_argument("--secret", default=None, help="x-internal-secret, defaults to PASS_KEY")
+    parser.add_argument("--in-process", action="store_true", help="run the app in-process on the memory backend")
+    parser.add_argument("--rates", default="6,12,24", help="orders per minute for each stage, comma separated")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of arrivals per stage")
+    parser.add_argument("--bulk", type=int, default=1, help="orders per request; >1 uses POST /orders/bulk")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--drain-timeout", type=float, default=180.0, help="max wait for open orders per stage")
+    parser.add_argument("--max-reject-rate", type=float, default=0.05, help="429 share a stage may have to pass")
+    parser.add_argument("--slo", type=float, default=None, help="p95 accepted->DELIVERED seconds a stage must meet")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = parser.parse_args()
+    args.rates = [float(r) for r in args.rates.split(",")]
+    args.secret = args.secret or settings.secret_key
+
+    reports = asyncio.run(run(args))
+    result = capacity(reports, args.max_reject_rate, args.slo)
+
+    if args.json:
+        print(json.dumps({"capacity_per_minute": result, "stages": [asdict(r) for r in reports]}, indent=2))
+        return
+
+    print("=" * 72)
+    print(" LOAD TEST REPORT")
+    print("=" * 72)
+    for r in reports:
+        delivered = r.latency_s["accepted_to_delivered"]
+        print(f"{r.rate_per_minute:>6.1f}/min  sent {r.sent:<5} accepted {r.accepted:<5} "
+              f"429 {r.rejected_429:<4} ({r.reject_rate * 100:.1f}%)  errors {r.errors + r.rejected_other}")
+        for name, stats in r.latency_s.items():
+            print(f"           {name:<26} p50 {stats['p50']}s  p95 {stats['p95']}s  p99 {stats['p99']}s")
+        print(f"           intake p50/p95 {r.intake_ms['p50']:.1f}/{r.intake_ms['p95']:.1f}ms  "
+              if r.intake_ms["count"] else "           intake: no responses  ", end="")
+        print(f"tick p50/max {r.tick_ms['p50']}/{r.tick_ms['max']}ms  "
+              f"delivered {delivered['count']} ({r.delivered_per_minute}/min, {r.undelivered} open)")
+    print("-" * 72)
+    print(f"Capacity: {result} orders/min" if result is not None else "Capacity: below the lowest tested rate")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# benchmarks/middleware.py - Per-request cost of the secret middleware stack
+#
+#   python -m benchmarks.middleware                        # /health and /api/v1/bots/, both stacks
+#   python -m benchmarks.middleware --requests 5000 --concurrency 16
+#
+# "before" is the BaseHTTPMiddleware version this stack replaced, rebuilt here for comparison;
+# "after" is the stack main.py serves. Both run in-process on the memory backend.
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List
+import httpx
+import socketio
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from api.v1 import bots
+from core.config import settings
+from core.log import setup_logging
+from middleware.internal_secret import EXCLUDE_PATHS, InternalSecretMiddleware
+from repositories import memory_store
+
+PATHS = ["/health", "/api/v1/bots/"]
+CORS = dict(allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+
+
+class BaseHTTPSecretMiddleware(BaseHTTPMiddleware):
+    """The previous implementation"""
+
+    async def dispatch(self, request: Request, call_next):
+        if request.url.path not in EXCLUDE_PATHS:
+            secret = request.headers.get("x-internal-secret")
+            if not secret or secret != settings.secret_key:
+                return JSONResponse(
+                    {"detail": "Unauthorized: invalid or missing internal secret"},
+                    status_code=401
+                )
+        return await call_next(request)
+
+
+def build_api() -> FastAPI:
+    app = FastAPI()
+    app.include_router(bots.router, prefix="/api/v1")
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "version": "1.0.0"}
+
+    return app
+
+
+def before_stack():
+    app = build_api()
+    app.add_middleware(BaseHTTPSecretMiddleware)
+    app.add_middleware(CORSMiddleware, **CORS)
+    return socketio.ASGIApp(socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*"), app)
+
+
+def after_stack():
+    sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins=[])
+    return CORSMiddleware(InternalSecretMiddleware(socketio.ASGIApp(sio, build_api())), **CORS)
+
+
+STACKS: Dict[str, Callable] = {"before": before_stack, "after": after_stack}
+
+
+@dataclass
+class BenchResult:
+    stack: str
+    path: str
+    requests: int
+    concurrency: int
+    seconds: float
+    requests_per_sec: float
+    p50_ms: float
+    p99_ms: float
+
+
+async def bench(stack: str, path: str, requests: int, concurrency: int) -> BenchResult:
+    transport = httpx.ASGITransport(app=STACKS[stack]())
+    latencies: List[float] = []
+    remaining = requests
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers={"x-internal-secret": settings.secret_key}
+    ) as client:
+        # Warm up routing and validation caches
+        for _ in range(50):
+            (await client.get(path)).raise_for_status()
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return BenchResult(
+        stack=stack, path=path, requests=requests, concurrency=concurrency,
+        seconds=round(seconds, 3),
+        requests_per_sec=round(requests / seconds, 1),
+        p50_ms=round(statistics.median(latencies) * 1000, 3),
+        p99_ms=round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests/sec through the old and new middleware stacks")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--bots", type=int, default=settings.max_bots, help="bots listed by /api/v1/bots/")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    setup_logging(level="WARNING")
+    settings.repository_backend = "memory"
+    for i in range(args.bots):
+        memory_store.add_bot(name=f"Bot-{i + 1}")
+
+    results = []
+    for path in PATHS:
+        for stack in STACKS:
+            results.append(asyncio.run(bench(stack, path, args.requests, args.concurrency)))
+            print(f"{stack:<7} {path:<16} {results[-1].requests_per_sec:>9.1f} req/s", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+        return
+
+    print(f"{'path':<16} {'stack':<7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for path in PATHS:
+        by_stack = {r.stack: r for r in results if r.path == path}
+        for r in by_stack.values():
+            print(f"{path:<16} {r.stack:<7} {r.requests_per_sec:>9.1f} {r.p50_ms:>8.3f} {r.p99_ms:>8.3f}")
+        change = by_stack["after"].requests_per_sec / by_stack["before"].requests_per_sec - 1
+        print(f"{path:<16} {'change':<7} {change * 100:>+8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
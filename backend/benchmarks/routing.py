@@ -0,0 +1,308 @@
+# benchmarks/routing.py - Routing benchmark suite with stored baselines
+#
+#   python -m benchmarks.routing                         # run and compare with baselines
+#   python -m benchmarks.routing --save-baseline         # record new baselines
+#   python -m benchmarks.routing --sizes 200,1000 --cases p2p   # large grids take minutes
+#
+# Baselines are machine specific. Each one records the machine, interpreter and commit it
+# came from, and results are only compared with baselines from the same machine and interpreter.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+from core.log import setup_logging
+from repositories.memory import InMemoryStore, MemoryRepositories
+from services.map_data import MapData, RESTAURANT_TYPES, RESTAURANT_NAMES, node_id_for
+from services.node_index import NodeEntry
+from services.route_algorithm import RouteOptimizer
+from services.simulator import FleetSimulator, SimulationConfig
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines", "routing.json")
+
+CASES = ["p2p", "nearest_poi", "optimize_route", "fleet_tick"]
+DEFAULT_SIZES = [9, 50, 100]
+# (blocked edge fraction, restricted cell fraction)
+DEFAULT_DENSITIES = [(0.05, 0.05), (0.2, 0.15)]
+
+@dataclass
+class BenchResult:
+    case: str
+    grid_size: int
+    blocked_density: float
+    restricted_density: float
+    ops: int
+    seconds: float
+    ops_per_sec: float
+    peak_kib: float
+    alloc_blocks: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.case}/{self.grid_size}/{self.blocked_density}:{self.restricted_density}"
+
+
+def generate_map(grid_size: int, blocked_density: float, restricted_density: float, seed: int) -> MapData:
+    """Random grid: restaurants and houses on restricted cells, random blocked edges, centre station"""
+    rng = random.Random(seed)
+    map_data = MapData(grid_size=grid_size)
+    station = (grid_size // 2, grid_size // 2)
+
+    cells = [(x, y) for y in range(grid_size) for x in range(grid_size) if (x, y) != station]
+    special = rng.sample(cells, max(2, int(len(cells) * restricted_density)))
+    # Restaurants grow with the side of the grid, not its area, as a city's would
+    restaurant_count = max(1, min(len(special) // 5, grid_size))
+
+    for i, (x, y) in enumerate(special):
+        is_restaurant = i < restaurant_count
+        restaurant_type = RESTAURANT_TYPES[i % len(RESTAURANT_TYPES)] if is_restaurant else None
+        map_data.nodes[(x, y)] = NodeEntry(
+            id=node_id_for(x, y, grid_size), x=x, y=y,
+            node_type='RESTAURANT' if is_restaurant else 'HOUSE',
+            is_delivery_point=not is_restaurant,
+            is_restaurant=is_restaurant,
+            is_bot_station=False,
+            restaurant_type=restaurant_type,
+            name=RESTAURANT_NAMES[restaurant_type] if is_restaurant else f"House_{i}"
+        )
+
+    map_data.nodes[station] = NodeEntry(
+        id=node_id_for(*station, grid_size), x=station[0], y=station[1], node_type='BOT_STATION',
+        is_delivery_point=False, is_restaurant=False, is_bot_station=True,
+        restaurant_type=None, name="Central Station"
+    )
+
+    edge_count = 2 * grid_size * (grid_size - 1)
+    while len(map_data.blocked_paths) < int(edge_count * blocked_density):
+        x, y = rng.randrange(grid_size), rng.randrange(grid_size)
+        other = (x + 1, y) if rng.random() < 0.5 else (x, y + 1)
+        if other[0] < grid_size and other[1] < grid_size:
+            map_data.blocked_paths.add(((x, y), other))
+
+    return map_data
+
+
+def build_optimizer(map_data: MapData) -> RouteOptimizer:
+    # Goes through the same repository path as the live service, on the in-memory backend
+    store = InMemoryStore()
+    store.load_map(map_data)
+    return RouteOptimizer(MemoryRepositories(store), grid_size=map_data.grid_size)
+
+
+def measure(op: Callable[[int], object], iterations: int, budget: float) -> Tuple[int, float]:
+    op(0)  # warm-up
+    count = 0
+    started = time.perf_counter()
+    while count < iterations:
+        op(count)
+        count += 1
+        if time.perf_counter() - started > budget:
+            break
+    return count, time.perf_counter() - started
+
+
+def measure_memory(op: Callable[[int], object], runs: int = 1) -> Tuple[float, int]:
+    # Peak traced memory and net new allocation blocks; tracing slows calls down a lot
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    for i in range(runs):
+        op(i)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return round(peak / 1024, 1), blocks
+
+
+def build_case(case: str, map_data: MapData, optimizer: RouteOptimizer, rng: random.Random) -> Callable[[int], object]:
+    restaurants = map_data.restaurants
+    houses = map_data.houses
+
+    if case == "p2p":
+        pairs = [((r.x, r.y), (h.x, h.y)) for r, h in
+                 ((rng.choice(restaurants), rng.choice(houses)) for _ in range(64))]
+        return lambda i: optimizer.dijkstra(*pairs[i % len(pairs)])
+
+    if case == "nearest_poi":
+        starts = [(h.x, h.y, rng.choice(RESTAURANT_TYPES)) for h in (rng.choice(houses) for _ in range(64))]
+        return lambda i: optimizer.find_nearest_restaurant(starts[i % len(starts)][:2], starts[i % len(starts)][2])
+
+    if case == "optimize_route":
+        station = map_data.bot_stations[0]
+        bot = SimpleNamespace(id=1, current_x=station.x, current_y=station.y)
+        batches = []
+        for _ in range(16):
+            batch = []
+            for order_id in range(1, 4):
+                r, h = rng.choice(restaurants), rng.choice(houses)
+                batch.append(SimpleNamespace(
+                    id=order_id, status='ASSIGNED', restaurant_type=r.restaurant_type,
+                    customer_name=f"Customer_{order_id}",
+                    pickup_x=r.x, pickup_y=r.y, delivery_x=h.x, delivery_y=h.y
+                ))
+            batches.append(batch)
+        return lambda i: optimizer.optimize_delivery_route(bot, batches[i % len(batches)])
+
+    if case == "fleet_tick":
+        # A loaded fleet: generation, assignment and one movement step for every bot
+        simulator = FleetSimulator(map_data, SimulationConfig(
+            ticks=0, orders_per_minute=30.0, bots=10, seed=rng.randrange(1 << 30),
+            restaurant_order_limit=1000
+        ))
+        return lambda i: asyncio.run(simulator.step())
+
+    raise ValueError(f"Unknown case: {case}")
+
+
+def run_suite(cases: List[str], sizes: List[int], densities: List[Tuple[float, float]],
+              iterations: int, budget: float, seed: int) -> List[BenchResult]:
+    results = []
+    for grid_size in sizes:
+        for blocked_density, restricted_density in densities:
+            map_data = generate_map(grid_size, blocked_density, restricted_density, seed)
+            optimizer = build_optimizer(map_data)
+
+            for case in cases:
+                # Fresh inputs per case so timing and memory runs see the same workload
+                op = build_case(case, map_data, optimizer, random.Random(seed))
+                ops, seconds = measure(op, iterations, budget)
+                op = build_case(case, map_data, optimizer, random.Random(seed))
+                peak_kib, blocks = measure_memory(op)
+
+                results.append(BenchResult(
+                    case=case, grid_size=grid_size,
+                    blocked_density=blocked_density, restricted_density=restricted_density,
+                    ops=ops, seconds=round(seconds, 4),
+                    ops_per_sec=round(ops / seconds, 2) if seconds > 0 else 0.0,
+                    peak_kib=peak_kib, alloc_blocks=blocks
+                ))
+                print(format_result(results[-1]), file=sys.stderr)
+    return results
+
+
+def format_result(result: BenchResult, baseline: Optional[dict] = None) -> str:
+    line = (f"{result.key:<32} {result.ops_per_sec:>12.2f} ops/s "
+            f"{result.peak_kib:>10.1f} KiB peak {result.alloc_blocks:>8} blocks")
+    if baseline:
+        change = (result.ops_per_sec / baseline["ops_per_sec"] - 1) * 100 if baseline["ops_per_sec"] else 0.0
+        line += f"   {change:+6.1f}% vs baseline"
+    return line
+
+
+def machine() -> dict:
+    """What a baseline depends on besides the code: results only compare when this matches"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparable(baselines: Dict[str, dict]) -> Dict[str, dict]:
+    """Baselines recorded on this machine and interpreter"""
+    here = machine()
+    return {key: baseline for key, baseline in baselines.items() if baseline.get("machine") == here}
+
+
+def load_baselines(path: str) -> Dict[str, dict]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(path: str, results: List[BenchResult]):
+    baselines = load_baselines(path)
+    recorded = {"machine": machine(), "commit": current_commit()}
+    baselines.update({r.key: {**asdict(r), **recorded} for r in results})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(dict(sorted(baselines.items())), f, indent=2)
+        f.write("\n")
+
+
+def find_regressions(results: List[BenchResult], baselines: Dict[str, dict], tolerance: float) -> List[str]:
+    regressions = []
+    for result in results:
+        baseline = baselines.get(result.key)
+        if baseline and result.ops_per_sec < baseline["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{result.key}: {result.ops_per_sec} ops/s < {baseline['ops_per_sec']} baseline")
+    return regressions
+
+
+def parse_densities(value: str) -> List[Tuple[float, float]]:
+    return [tuple(float(part) for part in pair.split(":")) for pair in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark route planning across grid sizes and densities")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"comma separated, from {CASES}")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="grid sizes, up to 1000")
+    parser.add_argument("--densities", default=",".join(f"{b}:{r}" for b, r in DEFAULT_DENSITIES),
+                        help="blocked:restricted fractions, comma separated")
+    parser.add_argument("--iterations", type=int, default=200, help="max operations per case")
+    parser.add_argument("--budget", type=float, default=2.0, help="max seconds per case")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed ops/sec drop before flagging")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    cases = args.cases.split(",")
+    for case in cases:
+        if case not in CASES:
+            parser.error(f"unknown case {case!r}")
+
+    # Per-query debug logs stay off, so the timings don't include them
+    setup_logging(level="WARNING")
+    results = run_suite(
+        cases, [int(s) for s in args.sizes.split(",")], parse_densities(args.densities),
+        args.iterations, args.budget, args.seed
+    )
+
+    if args.save_baseline:
+        save_baselines(args.baseline, results)
+        print(f"Saved {len(results)} baselines to {args.baseline}")
+        return
+
+    recorded = load_baselines(args.baseline)
+    baselines = comparable(recorded)
+    if len(baselines) < len(recorded):
+        print(f"Skipping {len(recorded) - len(baselines)} baselines recorded on another machine or interpreter; "
+              f"rerun with --save-baseline to record them here", file=sys.stderr)
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+    else:
+        for result in results:
+            print(format_result(result, baselines.get(result.key)))
+
+    regressions = find_regressions(results, baselines, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
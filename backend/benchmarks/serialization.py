@@ -0,0 +1,162 @@
+# benchmarks/serialization.py - Response serialization time per endpoint
+#
+#   python -m benchmarks.serialization                  # 100x100 city, loaded fleet
+#   python -m benchmarks.serialization --size 300 --bots 50
+#
+# Payloads come from a simulated fleet on the in-memory store. "default" is FastAPI's path
+# (response_model validation + serialization, or jsonable_encoder, then json.dumps);
+# "orjson" is core.responses; "cached" is a SnapshotCache hit. The response models cap
+# coordinates at 8, so on larger grids the default path rejects list rows outright.
+# "(compact)" rows are the core.compact encodings served for `Accept: application/vnd.eagroute.compact`.
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter, ValidationError
+from api.v1.map import build_map_grid
+from api.v1.routes import optimized_routes
+from core.compact import encode_grid, encode_node_flags, encode_route
+from core.log import setup_logging
+from core.responses import SnapshotCache, dumps, model_rows
+from models.order import ACTIVE_STATUSES
+from schemas.bot import BotResponse
+from schemas.node import NodeResponse
+from schemas.order import OrderResponse
+from services.map_generator import CityConfig, generate_city
+from services.node_index import NodeIndex
+from services.simulator import FleetSimulator, SimulationConfig
+
+
+@dataclass
+class SerializationResult:
+    endpoint: str
+    payload_kib: float
+    default_ms: Optional[float]
+    orjson_ms: float
+    cached_ms: Optional[float]
+    speedup: Optional[float]
+    rejected: bool = False
+
+
+def timed(fn: Callable, budget: float) -> float:
+    """Mean milliseconds per call, repeating until the time budget is spent"""
+    fn()
+    calls, started = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= budget:
+            return elapsed / calls * 1000
+
+
+def default_dict(payload) -> bytes:
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def default_models(model):
+    adapter = TypeAdapter(List[model])
+    return lambda rows: JSONResponse(adapter.dump_python(adapter.validate_python(rows), mode="json")).body
+
+
+def timed_or_none(fn: Callable, budget: float) -> Optional[float]:
+    try:
+        return round(timed(fn, budget), 3)
+    except ValidationError:
+        return None
+
+
+def compact_routes(routes: dict) -> bytes:
+    return dumps({
+        bot_id: {**route, "detailed_path": encode_route(route["detailed_path"])} for bot_id, route in routes.items()
+    })
+
+
+def run(size: int, bots: int, ticks: int, budget: float) -> List[SerializationResult]:
+    map_data = generate_city(CityConfig(grid_size=size))
+    simulator = FleetSimulator(map_data, SimulationConfig(
+        ticks=0, orders_per_minute=bots * 3.0, bots=bots, restaurant_order_limit=1000
+    ))
+    # Warm up until bots carry orders, so routes, progress and the grid have live content
+    for _ in range(ticks):
+        asyncio.run(simulator.step())
+
+    repos = simulator.repos
+    index = NodeIndex()
+    index.load(repos)
+    busy = max(repos.bots.list_all(), key=lambda b: b.current_orders)
+    orders, _ = repos.orders.page(None, 1000)
+    bot_rows, _ = repos.bots.page(None, 1000)
+    cells = index.cells(repos)
+    flags = encode_node_flags(cells, size)
+
+    cases = [
+        ("/map/grid", lambda: build_map_grid(repos, index.cells(repos), size), default_dict, dumps, True),
+        # Node flags are cached per map version, bots and orders are packed per snapshot
+        ("/map/grid (compact)", lambda: (repos.bots.list_all(), repos.orders.list_by_status(ACTIVE_STATUSES)),
+         None, lambda p: encode_grid(size, flags, *p), True),
+        ("/map/nodes", lambda: model_rows(repos.nodes.list_all(), NodeResponse), default_dict, dumps, True),
+        ("/routes/optimize", lambda: optimized_routes(repos, simulator.route_optimizer), default_dict, dumps, False),
+        ("/routes/optimize (compact)", lambda: optimized_routes(repos, simulator.route_optimizer),
+         None, compact_routes, False),
+        ("/auto-movement/bot/{id}/progress", lambda: simulator.movement.get_bot_progress(busy.id),
+         default_dict, dumps, False),
+        ("/orders/", lambda: orders, default_models(OrderResponse),
+         lambda rows: dumps(model_rows(rows, OrderResponse)), False),
+        ("/bots/", lambda: bot_rows, default_models(BotResponse),
+         lambda rows: dumps(model_rows(rows, BotResponse)), False),
+    ]
+
+    results = []
+    for endpoint, build, default, fast, cacheable in cases:
+        payload = build()
+        body = fast(payload)
+        cache = SnapshotCache()
+        result = SerializationResult(
+            endpoint=endpoint,
+            payload_kib=round(len(body) / 1024, 1),
+            default_ms=timed_or_none(lambda: default(payload), budget) if default else None,
+            orjson_ms=round(timed(lambda: fast(payload), budget), 3),
+            cached_ms=round(timed(lambda: cache.get(endpoint, 1, lambda: payload), budget), 4) if cacheable else None,
+            speedup=None
+        )
+        result.rejected = default is not None and result.default_ms is None
+        if result.default_ms is not None:
+            result.speedup = round(result.default_ms / result.orjson_ms, 1)
+        results.append(result)
+        print(f"{endpoint:<34} done", file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization time per endpoint: FastAPI default vs orjson vs cached")
+    parser.add_argument("--size", type=int, default=100, help="city grid side length")
+    parser.add_argument("--bots", type=int, default=20)
+    parser.add_argument("--ticks", type=int, default=60, help="simulated ticks before measuring")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds of timing per measurement")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    setup_logging(level="WARNING")
+    results = run(args.size, args.bots, args.ticks, args.budget)
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], indent=2))
+        return
+
+    print(f"{args.size}x{args.size} grid, {args.bots} bots")
+    print(f"{'endpoint':<34} {'KiB':>9} {'default ms':>11} {'orjson ms':>10} {'cached ms':>10} {'speedup':>8}")
+    for r in results:
+        default = f"{r.default_ms:.3f}" if r.default_ms is not None else "rejects" if r.rejected else "-"
+        cached = f"{r.cached_ms:.4f}" if r.cached_ms is not None else "-"
+        speedup = f"{r.speedup:.1f}x" if r.speedup is not None else "-"
+        print(f"{r.endpoint:<34} {r.payload_kib:>9.1f} {default:>11} {r.orjson_ms:>10.3f} {cached:>10} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Compact encodings for large maps, chosen with `Accept: application/vnd.eagroute.compact`.
+frontend/src/services/compact.ts decodes both; keep the two in step.
+
+Grid (binary, little-endian, every section padded to 4 bytes so it can be viewed as a typed array):
+
+    header   "EGRD" | u16 version | u16 grid_size | u32 bot_count | u32 order_count
+    nodes    u8[grid_size * grid_size], row-major (y * grid_size + x):
+             bits 0-1 node type (NODE, HOUSE, RESTAURANT, BOT_STATION)
+             bit 2 delivery point, bit 3 restaurant, bit 4 bot station
+             bits 5-7 restaurant type, 1-based in RESTAURANT_TYPES order, 0 = none
+    bots     u32 id[] | u16 x[] | u16 y[] | u8 status[] | u8 current_orders[] | u8 battery_level[]
+    orders   u32 id[] | u32 bot_id[] (0 = none) | u16 pickup_x[] | u16 pickup_y[]
+             | u16 delivery_x[] | u16 delivery_y[] | u8 status[] | u8 restaurant_type[]
+
+Route (inside JSON): {"start": [x, y], "steps": n, "runs": base64}, where every run byte is
+bits 0-1 direction (right, down, left, up) and bits 2-7 run length - 1.
+"""
+import base64
+import struct
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from services.map_data import RESTAURANT_TYPES
+
+COMPACT_MEDIA_TYPE = "application/vnd.eagroute.compact"
+GRID_MEDIA_TYPE = "application/vnd.eagroute.grid"
+COMPACT_JSON_MEDIA_TYPE = "application/vnd.eagroute.compact+json"
+
+GRID_MAGIC = b"EGRD"
+GRID_VERSION = 1
+_HEADER = struct.Struct("<4sHHII")
+
+NODE_TYPES = ['NODE', 'HOUSE', 'RESTAURANT', 'BOT_STATION']
+BOT_STATUSES = ['IDLE', 'BUSY', 'MAINTENANCE', 'CHARGING']
+ORDER_STATUSES = ['PENDING', 'ASSIGNED', 'PICKED_UP', 'DELIVERED', 'CANCELLED']
+UNKNOWN = 255
+
+DELIVERY_POINT = 1 << 2
+RESTAURANT = 1 << 3
+BOT_STATION = 1 << 4
+
+# (dx, dy) per 2-bit direction code
+DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+_DIRECTION_CODES = {step: code for code, step in enumerate(DIRECTIONS)}
+MAX_RUN = 64
+
+Cell = Tuple[int, int]
+
+
+def wants_compact(accept: Optional[str]) -> bool:
+    return bool(accept) and COMPACT_MEDIA_TYPE in accept
+
+
+def _index(values: Sequence[str], value: Optional[str]) -> int:
+    try:
+        return values.index(value)
+    except ValueError:
+        return UNKNOWN
+
+
+def _pad(buffer: bytearray):
+    buffer.extend(b"\0" * (-len(buffer) % 4))
+
+
+def _section(buffer: bytearray, typecode: str, values: Iterable[int]):
+    data = array(typecode, values)
+    if data.itemsize > 1 and struct.pack("=H", 1) != struct.pack("<H", 1):
+        data.byteswap()
+    buffer.extend(data.tobytes())
+    _pad(buffer)
+
+
+def encode_node_flags(cells: Dict[Cell, object], grid_size: int) -> bytes:
+    """One flag byte per cell; only the special nodes need writing, the rest stay NODE"""
+    flags = bytearray(grid_size * grid_size)
+    for (x, y), node in cells.items():
+        if not (0 <= x < grid_size and 0 <= y < grid_size):
+            continue
+        node_type = node.node_type.value if hasattr(node.node_type, "value") else node.node_type
+        value = _index(NODE_TYPES, node_type) & 0b11
+        if node.is_delivery_point:
+            value |= DELIVERY_POINT
+        if node.is_restaurant:
+            value |= RESTAURANT
+        if node.is_bot_station:
+            value |= BOT_STATION
+        if node.restaurant_type in RESTAURANT_TYPES:
+            value |= (RESTAURANT_TYPES.index(node.restaurant_type) + 1) << 5
+        flags[y * grid_size + x] = value
+    return bytes(flags)
+
+
+def encode_grid(grid_size: int, node_flags: bytes, bots: list, orders: list) -> bytes:
+    buffer = bytearray(_HEADER.pack(GRID_MAGIC, GRID_VERSION, grid_size, len(bots), len(orders)))
+    buffer.extend(node_flags)
+    _pad(buffer)
+
+    _section(buffer, "I", (b.id for b in bots))
+    _section(buffer, "H", (b.current_x for b in bots))
+    _section(buffer, "H", (b.current_y for b in bots))
+    _section(buffer, "B", (_index(BOT_STATUSES, b.status) for b in bots))
+    _section(buffer, "B", (min(b.current_orders, 255) for b in bots))
+    _section(buffer, "B", (max(0, min(b.battery_level, 255)) for b in bots))
+
+    _section(buffer, "I", (o.id for o in orders))
+    _section(buffer, "I", (o.bot_id or 0 for o in orders))
+    _section(buffer, "H", (o.pickup_x for o in orders))
+    _section(buffer, "H", (o.pickup_y for o in orders))
+    _section(buffer, "H", (o.delivery_x for o in orders))
+    _section(buffer, "H", (o.delivery_y for o in orders))
+    _section(buffer, "B", (_index(ORDER_STATUSES, o.status) for o in orders))
+    _section(buffer, "B", (_index(RESTAURANT_TYPES, o.restaurant_type) for o in orders))
+    return bytes(buffer)
+
+
+def encode_route(path: Sequence[Sequence[int]]) -> Optional[dict]:
+    """Start cell plus direction runs; paths are unit steps on the grid"""
+    if not path:
+        return None
+
+    runs = bytearray()
+    direction, length = None, 0
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        code = _DIRECTION_CODES.get((x1 - x0, y1 - y0))
+        if code is None:
+            raise ValueError(f"Route step {(x0, y0)} -> {(x1, y1)} is not between neighbouring cells")
+        if code == direction and length < MAX_RUN:
+            length += 1
+            continue
+        if direction is not None:
+            runs.append(direction | (length - 1) << 2)
+        direction, length = code, 1
+    if direction is not None:
+        runs.append(direction | (length - 1) << 2)
+
+    return {
+        "start": [path[0][0], path[0][1]],
+        "steps": len(path) - 1,
+        "runs": base64.b64encode(bytes(runs)).decode("ascii"),
+    }
+
+
+def decode_route(route: Optional[dict]) -> List[Cell]:
+    if not route:
+        return []
+    x, y = route["start"]
+    cells = [(x, y)]
+    for run in base64.b64decode(route["runs"]):
+        dx, dy = DIRECTIONS[run & 0b11]
+        for _ in range((run >> 2) + 1):
+            x, y = x + dx, y + dy
+            cells.append((x, y))
+    return cells
@@ -24,6 +24,76 @@ class Settings(BaseSettings):
     restaurant_order_limit: int = 3
     restaurant_time_window: int = 30  
 
+    export_batch_size: int = 1000
+
+    order_archive_age_hours: int = 24
+    order_archive_batch_size: int = 500
+    order_archive_interval: float = 60.0
+
+    # Logging: root level, per-logger overrides ("services.auto_movement=DEBUG,..."), "text" or "json"
+    log_level: str = "INFO"
+    log_levels: str = ""
+    log_format: str = "text"
+    # Repeated log records: at most burst per template (and bot) per interval seconds, any level
+    log_sample_burst: int = 5
+    log_sample_interval: float = 10.0
+    sql_echo: bool = False
+
+    # Longest a serialized /map/grid snapshot is reused for; bots move every move_interval
+    snapshot_ttl: float = 0.5
+
+    # Side of a map tile in cells: spatial index buckets and Socket.IO viewport rooms.
+    # /map/viewport refuses boxes larger than viewport_max_cells
+    tile_size: int = 16
+    viewport_max_cells: int = 65536
+
+    # Idle bots: "station" (nearest station) or "demand" (share of them wait near the restaurants
+    # with the most predicted demand, the rest return to stations)
+    idle_policy: str = "demand"
+    idle_demand_share: float = 0.75
+    idle_demand_targets: int = 8
+    # Demand model: decay half-life, time-of-day bucket and the order history loaded at startup
+    demand_half_life_hours: float = 168.0
+    demand_bucket_minutes: int = 60
+    demand_history_days: int = 7
+
+    # Order batching: same-restaurant orders with deliveries within batch_delivery_radius steps
+    # of each other go to one bot; while no bot is idle, partial batches wait up to
+    # batch_window_seconds for more (0, the default, assigns every group straight away)
+    batch_window_seconds: float = 0.0
+    batch_delivery_radius: int = 4
+
+    # Work stealing: every rebalance_interval_ticks movement ticks (0 = only via
+    # /routes/rebalance), ASSIGNED orders move to a bot that gains at least
+    # rebalance_min_gain steps on them
+    rebalance_interval_ticks: int = 5
+    rebalance_min_gain: int = 4
+
+    # Energy, in battery percentage points: cost per step moved and per delivery. A bot only
+    # takes work it can finish and still reach a station with battery_reserve left
+    battery_step_cost: float = 0.2
+    battery_delivery_cost: float = 0.5
+    battery_reserve: float = 10.0
+    # Charging: station_capacity bots charge at a station at once, gaining charge_per_tick each
+    # movement tick. Idle bots below charge_threshold charge when a charger is free. At peak
+    # (orders waiting, or no idle bot above charge_threshold) at most charge_peak_share of the
+    # fleet is out charging and bots leave once back above charge_threshold. Bots at or below
+    # charge_critical always go, queueing if needed
+    station_capacity: int = 2
+    charge_per_tick: float = 1.0
+    charge_threshold: float = 50.0
+    charge_critical: float = 25.0
+    charge_peak_share: float = 0.25
+
+    # Admin profiling: stack sampling period and the longest capture allowed, in seconds
+    profile_interval: float = 0.005
+    profile_max_seconds: float = 120.0
+
+    # "sql" (Postgres) or "memory" (process-local store seeded from map CSVs)
+    repository_backend: str = "sql"
+    map_csv_path: str = "./sample_data.csv"
+    blocked_paths_csv_path: str = "./BlockedPaths.csv"
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
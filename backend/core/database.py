@@ -1,5 +1,5 @@
 # app/core/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from core.config import settings
@@ -8,7 +8,7 @@ engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
     pool_recycle=300,
-    echo=settings.debug
+    echo=settings.sql_echo
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -22,6 +22,30 @@ def get_db():
     finally:
         db.close()
 
+# Columns added to tables that existing deployments already have. create_all() only creates
+# missing tables, so upgrade_tables() adds these (all nullable) where they are missing
+ADDED_COLUMNS = {
+    "orders": ("assigned_at", "picked_up_at", "delivered_at", "cancelled_at"),
+    "orders_archive": ("assigned_at", "picked_up_at", "delivered_at", "cancelled_at"),
+}
+
 def create_tables():
-    """Create all database tables"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Create all database tables and bring existing ones up to date"""
+    Base.metadata.create_all(bind=engine)
+    upgrade_tables(engine)
+
+def upgrade_tables(bind):
+    """Add missing columns and indexes to existing tables; safe to run on every start"""
+    with bind.begin() as connection:
+        inspector = inspect(connection)
+        for table_name, columns in ADDED_COLUMNS.items():
+            table = Base.metadata.tables[table_name]
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for name in columns:
+                if name not in existing:
+                    column_type = table.c[name].type.compile(dialect=connection.dialect)
+                    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {column_type}"))
+        # Indexes declared on tables that predate them
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
\ No newline at end of file
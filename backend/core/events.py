@@ -0,0 +1,37 @@
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# An order left the plan of bot_id (cancelled, reassigned, moved or closed from outside the
+# movement loop). Payload: order_id, bot_id
+ORDER_CHANGED = "order.changed"
+
+
+class EventBus:
+    """
+    In-process publish/subscribe. Handlers run synchronously inside publish(), in the order
+    they subscribed, so the effect is in place when the publisher returns. A failing handler
+    is logged and does not stop the others or the publisher.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[..., None]]] = defaultdict(list)
+
+    def subscribe(self, event: str, handler: Callable[..., None]):
+        self._handlers[event].append(handler)
+
+    def unsubscribe(self, event: str, handler: Callable[..., None]):
+        if handler in self._handlers.get(event, ()):
+            self._handlers[event].remove(handler)
+
+    def publish(self, event: str, **payload):
+        for handler in list(self._handlers.get(event, ())):
+            try:
+                handler(**payload)
+            except Exception:
+                logger.exception("Handler %r for %s failed", handler, event)
+
+
+events = EventBus()
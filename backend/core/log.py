@@ -0,0 +1,126 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+from core.config import settings
+
+# Attributes every LogRecord has; anything else came in through extra= and is a structured field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, object]:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """`time level logger: message key=value ...`"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, structured fields at the top level"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class LogSampler(logging.Filter):
+    """
+    Lets through at most `burst` records per logger, message template and bot (the bot_id
+    field, when given) every `interval` seconds, at any level; the next one that passes
+    carries the suppressed count. A per-tick condition thus can't flood the output whatever
+    its level, while each bot still gets its own allowance.
+    """
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        # (logger, template, bot id) -> [window start, passed in window, suppressed]
+        self._windows: Dict[Tuple[str, str, object], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+
+        key = (record.name, str(record.msg), getattr(record, "bot_id", None))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                window = self._windows[key] = [now, 0, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+        return True
+
+
+def parse_levels(value: str) -> Dict[str, str]:
+    """'services.auto_movement=DEBUG,sqlalchemy.engine=INFO' -> {logger: level}"""
+    levels = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, level = part.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: Optional[str] = None, levels: Optional[Dict[str, str]] = None):
+    """
+    Route every record through a queue to a background writer thread, so callers never
+    block on stdout. Safe to call again to change levels; the writer is started once.
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel((level or settings.log_level).upper())
+    for name, logger_level in {**parse_levels(settings.log_levels), **(levels or {})}.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if settings.log_format == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    # Sample before the record is queued, so dropped records cost no formatting at all
+    queue_handler.addFilter(LogSampler(settings.log_sample_burst, settings.log_sample_interval))
+
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
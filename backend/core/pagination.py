@@ -0,0 +1,85 @@
+import base64
+import datetime
+from typing import Iterable, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime.datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return datetime.datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    # Turn "id,status" into a validated column list, None means full objects
+    if not fields:
+        return None
+
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def keyset_page(
+    db: Session,
+    model,
+    filters: list,
+    cursor: Optional[str],
+    limit: int,
+    fields: Optional[List[str]] = None,
+    offset: int = 0
+) -> Tuple[list, Optional[str]]:
+    """Fetch one page ordered by (created_at, id), plus the cursor of the next page"""
+    if fields:
+        # Plain column select, rows come back as dicts without ORM hydration
+        columns = dict.fromkeys([*fields, "created_at", "id"])
+        stmt = select(*[getattr(model, name) for name in columns])
+    else:
+        stmt = select(model)
+
+    stmt = stmt.where(*filters)
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) > tuple_(created_at, row_id))
+    elif offset:
+        stmt = stmt.offset(offset)
+
+    stmt = stmt.order_by(model.created_at, model.id).limit(limit + 1)
+
+    if fields:
+        rows = [row._mapping for row in db.execute(stmt)]
+    else:
+        rows = list(db.scalars(stmt))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if fields:
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id)
+
+    if fields:
+        rows = [{name: row[name] for name in fields} for row in rows]
+
+    return rows, next_cursor
+
+
+def cursor_headers(next_cursor: Optional[str]) -> dict:
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
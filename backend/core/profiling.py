@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from types import CodeType
+from typing import Dict, Iterable, List, Optional
+
+# Trim paths in frame labels down to the part inside the backend or site-packages
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def _frame_label(code: CodeType) -> str:
+    filename = code.co_filename
+    if filename.startswith(_ROOT):
+        filename = filename[len(_ROOT):]
+    elif "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples the Python stacks of every thread from a background thread and keeps the ones
+    that pass through a marker function, rooted at that marker. Nothing is hooked into the
+    profiled code, so there is no cost outside a capture.
+    """
+
+    def __init__(self, markers: Iterable[CodeType], interval: float = 0.005):
+        self.markers = set(markers)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own:
+                    self._record(frame)
+
+    def _record(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(code)
+            if code in self.markers:
+                # Innermost marker wins, so nested captures root at the narrowest one
+                self.stacks[";".join(_frame_label(c) for c in reversed(stack))] += 1
+                self.samples += 1
+                return
+            frame = frame.f_back
+
+    @property
+    def duration(self) -> float:
+        end = self.stopped_at or time.perf_counter()
+        return end - self.started_at if self.started_at else 0.0
+
+    def folded(self) -> str:
+        """Brendan Gregg's folded format, one `frame;frame;frame count` line per stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int = 30) -> dict:
+        # Self time is the leaf frame, total time is any frame on the stack
+        self_samples: Counter = Counter()
+        total_samples: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+
+        def rows(counter: Counter) -> List[dict]:
+            return [
+                {"frame": frame, "samples": count, "share": round(count / self.samples, 3)}
+                for frame, count in counter.most_common(top)
+            ]
+
+        return {
+            "seconds": round(self.duration, 3),
+            "interval": self.interval,
+            "samples": self.samples,
+            "self": rows(self_samples),
+            "total": rows(total_samples),
+        }
+
+
+class MemoryTracer:
+    """tracemalloc baseline and diff; tracing only runs between start() and stop()"""
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 10) -> dict:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.baseline = self._snapshot()
+            return self.status()
+
+    def stop(self):
+        with self._lock:
+            self.baseline = None
+            tracemalloc.stop()
+
+    def status(self) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {"tracing": self.is_tracing, "traced_bytes": current, "peak_bytes": peak}
+
+    def diff(self, top: int = 25, group_by: str = "lineno", file_filter: Optional[str] = None) -> dict:
+        with self._lock:
+            if self.baseline is None:
+                raise RuntimeError("No baseline: start tracing first")
+            snapshot = self._snapshot()
+            if file_filter:
+                filters = [tracemalloc.Filter(True, f"*{file_filter}*")]
+                snapshot = snapshot.filter_traces(filters)
+                baseline = self.baseline.filter_traces(filters)
+            else:
+                baseline = self.baseline
+            stats = snapshot.compare_to(baseline, group_by)
+
+        return {
+            **self.status(),
+            "growth": [
+                {
+                    "location": stat.traceback.format()[-6:] if group_by == "traceback" else str(stat.traceback[0]),
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                }
+                for stat in stats[:top]
+            ],
+        }
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        # Leave out tracemalloc's own bookkeeping
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+
+
+def container_sizes(obj) -> Dict[str, dict]:
+    """Entry counts of the dict/set/list/deque attributes of an object, for spotting per-key growth"""
+    sizes = {}
+    for name, value in sorted(vars(obj).items()):
+        if not isinstance(value, (dict, set, list, deque)):
+            continue
+        entry = {"entries": len(value)}
+        if isinstance(value, dict):
+            # Per-bot routes and waypoint sets grow inside the values, not the key count
+            entry["nested"] = sum(len(v) for v in value.values() if isinstance(v, (dict, set, list, deque)))
+        sizes[name] = entry
+    return sizes
+
+
+memory_tracer = MemoryTracer()
@@ -0,0 +1,98 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Set
+from services.spatial_index import Cell, tiles_in_box
+
+logger = logging.getLogger(__name__)
+
+
+def tile_room(tile: Cell) -> str:
+    return f"tile:{tile[0]}:{tile[1]}"
+
+
+def bot_state(bot) -> dict:
+    """What a tile subscriber sees of a bot"""
+    return {
+        "id": bot.id,
+        "x": bot.current_x,
+        "y": bot.current_y,
+        "status": bot.status,
+        "current_orders": bot.current_orders,
+        "battery_level": bot.battery_level,
+    }
+
+
+class TileBroadcaster:
+    """
+    Socket.IO updates scoped to what clients are looking at. A client subscribes to a box
+    and joins one room per tile under it; after every movement tick each watched tile whose
+    bots changed gets one `tile_bots` event. Unwatched tiles cost nothing, so traffic follows
+    the viewed area rather than the fleet size.
+
+    Clients load the box once through /map/viewport and then apply `tile_bots` events,
+    each of which replaces the bot list of one tile.
+    """
+
+    def __init__(self, sio, tile_size: int, max_tiles: int):
+        self.sio = sio
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self._tiles_by_sid: Dict[str, Set[Cell]] = {}
+        # tile -> subscribed clients, and the bot list last sent to its room
+        self._watchers: Dict[Cell, int] = defaultdict(int)
+        self._last_sent: Dict[Cell, List[dict]] = {}
+
+    def watched_tiles(self) -> Set[Cell]:
+        return set(self._watchers)
+
+    async def subscribe(self, sid: str, x0: int, y0: int, x1: int, y1: int) -> Set[Cell]:
+        """Move the client's rooms to the tiles under the box; raises ValueError for bad boxes"""
+        if x1 < x0 or y1 < y0 or x0 < 0 or y0 < 0:
+            raise ValueError("Viewport needs 0 <= x0 <= x1 and 0 <= y0 <= y1")
+        tiles = set(tiles_in_box(x0, y0, x1, y1, self.tile_size))
+        if len(tiles) > self.max_tiles:
+            raise ValueError(f"Viewport covers {len(tiles)} tiles, at most {self.max_tiles} allowed")
+
+        current = self._tiles_by_sid.get(sid, set())
+        for tile in current - tiles:
+            await self.sio.leave_room(sid, tile_room(tile))
+            self._unwatch(tile)
+        for tile in tiles - current:
+            await self.sio.enter_room(sid, tile_room(tile))
+            self._watchers[tile] += 1
+        self._tiles_by_sid[sid] = tiles
+        return tiles
+
+    async def unsubscribe(self, sid: str):
+        for tile in self._tiles_by_sid.pop(sid, set()):
+            await self.sio.leave_room(sid, tile_room(tile))
+            self._unwatch(tile)
+
+    def forget(self, sid: str):
+        # On disconnect the server has already dropped the client's rooms
+        for tile in self._tiles_by_sid.pop(sid, set()):
+            self._unwatch(tile)
+
+    def _unwatch(self, tile: Cell):
+        self._watchers[tile] -= 1
+        if self._watchers[tile] <= 0:
+            del self._watchers[tile]
+            self._last_sent.pop(tile, None)
+
+    async def publish_bots(self, bots: List[dict]):
+        """Tick listener: bot states (see bot_state) after the tick was committed"""
+        if not self._watchers:
+            return
+
+        by_tile: Dict[Cell, List[dict]] = defaultdict(list)
+        for bot in bots:
+            tile = (bot["x"] // self.tile_size, bot["y"] // self.tile_size)
+            if tile in self._watchers:
+                by_tile[tile].append(bot)
+
+        for tile in list(self._watchers):
+            states = by_tile.get(tile, [])
+            if self._last_sent.get(tile, []) == states:
+                continue
+            self._last_sent[tile] = states
+            await self.sio.emit("tile_bots", {"tile": list(tile), "bots": states}, room=tile_room(tile))
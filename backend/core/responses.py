@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+# Int dict keys (bot ids in /routes/optimize) are allowed and written as strings, like json.dumps
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def model_rows(rows: Iterable, model: Type[BaseModel]) -> List[dict]:
+    """
+    Response-model shaped dicts from trusted rows (ORM objects, store records, or dicts from
+    a `fields` projection), without revalidating every row through pydantic.
+    """
+    # Attributes a row type lacks fall back to the field default, as with from_attributes
+    defaults = {
+        name: None if field.is_required() else field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+    }
+    return [
+        row if isinstance(row, dict) else {name: getattr(row, name, default) for name, default in defaults.items()}
+        for row in rows
+    ]
+
+
+def fast_json(content, headers: Optional[dict] = None, media_type: Optional[str] = None) -> ORJSONResponse:
+    # Returning a Response makes FastAPI skip response_model validation and jsonable_encoder
+    return ORJSONResponse(content, headers=headers, media_type=media_type)
+
+
+class SnapshotCache:
+    """
+    Serialized bodies of snapshot-style responses, reused while their version is unchanged
+    and, for live data, for at most `ttl` seconds. One request renders, concurrent ones wait.
+    """
+
+    def __init__(self):
+        # key -> (version, rendered at, body)
+        self._entries: Dict[str, Tuple[object, float, bytes]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: str, version, render: Callable[[], object], ttl: Optional[float] = None) -> bytes:
+        """`render` returns JSON content, or an already encoded body as bytes"""
+        body = self._fresh(key, version, ttl)
+        if body is not None:
+            return body
+
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            # Someone else may have rendered it while we waited
+            body = self._fresh(key, version, ttl)
+            if body is None:
+                content = render()
+                body = content if isinstance(content, bytes) else dumps(content)
+                self._entries[key] = (version, time.monotonic(), body)
+        return body
+
+    def response(
+        self, key: str, version, render: Callable[[], object], ttl: Optional[float] = None,
+        media_type: str = "application/json"
+    ) -> Response:
+        return Response(self.get(key, version, render, ttl), media_type=media_type)
+
+    def _fresh(self, key: str, version, ttl: Optional[float]) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        if ttl is not None and time.monotonic() - entry[1] > ttl:
+            return None
+        return entry[2]
+
+    def invalidate(self, key: Optional[str] = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+snapshot_cache = SnapshotCache()
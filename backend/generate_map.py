@@ -0,0 +1,57 @@
+# generate_map.py - Synthetic city maps for large-scale tests
+#
+#   python generate_map.py --size 500 --out ./sample_data.csv --blocked-out ./BlockedPaths.csv
+#   GRID_SIZE=500 python init_data.py
+import argparse
+import sys
+import time
+from services.map_generator import CityConfig, generate_city, parse_restaurant_mix, verify_connectivity, write_map_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a routable city map in the sample_data.csv formats")
+    parser.add_argument("--size", type=int, default=50, help="grid side length")
+    parser.add_argument("--poi-density", type=float, default=0.2, help="share of cells that are houses or restaurants")
+    parser.add_argument("--restaurant-share", type=float, default=0.1, help="share of POIs that are restaurants")
+    parser.add_argument("--mix", default=None, help="restaurant type weights, e.g. RAMEN=2,SUSHI=1")
+    parser.add_argument("--blocked-ratio", type=float, default=0.1, help="share of grid edges that are blocked")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="./sample_data.csv")
+    parser.add_argument("--blocked-out", default="./BlockedPaths.csv")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_restaurant_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    config = CityConfig(
+        grid_size=args.size,
+        poi_density=args.poi_density,
+        restaurant_share=args.restaurant_share,
+        restaurant_mix=mix,
+        blocked_ratio=args.blocked_ratio,
+        seed=args.seed
+    )
+
+    started = time.perf_counter()
+    map_data = generate_city(config)
+    generated = time.perf_counter()
+
+    unreachable = verify_connectivity(map_data)
+    if unreachable:
+        print(f"{len(unreachable)} POIs unreachable from the station, e.g. {unreachable[:5]}")
+        sys.exit(1)
+
+    write_map_csv(map_data, args.out, args.blocked_out)
+    written = time.perf_counter()
+
+    print(f"{args.size}x{args.size} grid: {len(map_data.houses)} houses, {len(map_data.restaurants)} restaurants, "
+          f"{len(map_data.blocked_paths)} blocked paths")
+    print(f"Generated in {generated - started:.2f}s, written in {written - generated:.2f}s "
+          f"to {args.out} and {args.blocked_out}")
+    print(f"Load it with: GRID_SIZE={args.size} python init_data.py")
+
+
+if __name__ == "__main__":
+    main()
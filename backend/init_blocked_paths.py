@@ -1,65 +1,29 @@
 # init_blocked_paths.py - Script to initialize blocked paths
 from sqlalchemy.orm import Session
+from core.config import settings
 from core.database import SessionLocal
 from models.blocked_path import BlockedPath
+from repositories import as_repositories
+from services.map_data import cell_for
+from services.map_importer import import_map
 from services.route_algorithm import RouteOptimizer
 
 def init_blocked_paths():
 
     db = SessionLocal()
+    blocked_paths_file = settings.blocked_paths_csv_path
     
     try:
-        blocked_paths_data = [
-            {"from_id": 4, "to_id": 12},
-            {"from_id": 6, "to_id": 14},
-            {"from_id": 8, "to_id": 16},
-            {"from_id": 9, "to_id": 17},
-            {"from_id": 10, "to_id": 18},
-            {"from_id": 17, "to_id": 18},
-            {"from_id": 23, "to_id": 24},
-            {"from_id": 26, "to_id": 27},
-            {"from_id": 27, "to_id": 28},
-            {"from_id": 35, "to_id": 36},
-            {"from_id": 38, "to_id": 39},
-            {"from_id": 43, "to_id": 44},
-            {"from_id": 49, "to_id": 50},
-            {"from_id": 50, "to_id": 51},
-            {"from_id": 54, "to_id": 55},
-            {"from_id": 55, "to_id": 56},
-            {"from_id": 52, "to_id": 61},
-            {"from_id": 54, "to_id": 63},
-            {"from_id": 72, "to_id": 73},
-        ]
-        
-        print(f" Initializing {len(blocked_paths_data)} blocked paths...")
+        print(f" Importing blocked paths from {blocked_paths_file}...")
         
-
-        db.query(BlockedPath).delete()
+        # Replaces the stored blocked paths with the file's, validated row by row
+        with open(blocked_paths_file, newline='', encoding='utf-8-sig') as f:
+            report = import_map(as_repositories(db), None, f, settings.grid_size, skip_invalid=True)
         
-
-        for path_data in blocked_paths_data:
-            
-            existing = db.query(BlockedPath).filter(
-                BlockedPath.from_node_id == path_data["from_id"],
-                BlockedPath.to_node_id == path_data["to_id"]
-            ).first()
-            
-            if not existing:
-                blocked_path = BlockedPath(
-                    from_node_id=path_data["from_id"],
-                    to_node_id=path_data["to_id"]
-                )
-                db.add(blocked_path)
-                
-                
-                from_x = (path_data["from_id"] - 1) % 9
-                from_y = (path_data["from_id"] - 1) // 9
-                to_x = (path_data["to_id"] - 1) % 9
-                to_y = (path_data["to_id"] - 1) // 9
-                
-                print(f" Added: ({from_x},{from_y}) ↔ ({to_x},{to_y}) [IDs: {path_data['from_id']} ↔ {path_data['to_id']}]")
+        for error in report.errors:
+            print(f"  Skipped line {error['line']}: {error['message']}")
         
-        db.commit()
+        print(f" Added {report.blocked_added}, removed {report.blocked_removed}")
         
         # Verify what was added
         total_blocked = db.query(BlockedPath).count()
@@ -68,8 +32,7 @@ def init_blocked_paths():
         # Show some examples of coordinate conversion
         print("\n Examples of ID to coordinate conversion:")
         for i in [4, 12, 27, 50, 73]:
-            x = (i - 1) % 9
-            y = (i - 1) // 9
+            x, y = cell_for(i, settings.grid_size)
             print(f"  ID {i} = ({x}, {y})")
         
     except Exception as e:
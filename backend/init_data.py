@@ -1,15 +1,20 @@
 from sqlalchemy.orm import Session
-from core.database import engine, SessionLocal, Base
+from core.database import engine, SessionLocal, Base, create_tables
 from models.node import Node
 from models.bot import Bot
 from models.blocked_path import BlockedPath
 from sqlalchemy import text
+from core.config import settings
+from services.map_data import MapData, cell_for, make_node
+from services.map_importer import read_map
+from services.map_loader import bulk_load_map
+import contextlib
 import csv
 import os
 
 def init_complete_database():
-    # Create tables first
-    Base.metadata.create_all(bind=engine)
+    # Create tables first, upgrading ones from older releases
+    create_tables()
     
     db = SessionLocal()
     
@@ -18,129 +23,29 @@ def init_complete_database():
         
         # Clear existing data
         db.execute(text("""
-        TRUNCATE TABLE blocked_paths, orders, bots, nodes
+        TRUNCATE TABLE blocked_paths, orders, orders_archive, bots, nodes
         RESTART IDENTITY CASCADE
         """))
         db.commit()
         
-        # Create all 81 nodes in 9x9 grid
-        print("Creating 9x9 grid nodes...")
-        for y in range(9):
-            for x in range(9):
-                node = Node(
-                    x=x,
-                    y=y,
-                    node_type='NODE',
-                    name=f"Node_{x}_{y}"
-                )
-                db.add(node)
-        
+        # Build the whole map in memory, then load it in one bulk pass
+        map_data = load_initial_map()
+        print(f"Loading {map_data.grid_size}x{map_data.grid_size} grid...")
+        bulk_load_map(db, map_data)
         db.commit()
-        print("Grid nodes created")
-
-        delivery_points = []
-        restaurants = []
-
-        # Load data from sample_data.csv if it exists, otherwise use defaults
-        sample_data_file = "./sample_data.csv"
-        if os.path.exists(sample_data_file):
-            print(f"Loading data from {sample_data_file}")
-            try:
-                with open(sample_data_file, newline='', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        try:
-                            x = int(row["x"])
-                            y = int(row["y"])
-                            
-                            is_ramen = row["RAMEN"].lower() == "true"
-                            if is_ramen:
-                                restaurants.append({"x": x, "y": y, "type": "RAMEN", "name": "Ramen Ichiran"})
-                            
-                            is_sushi = row["SUSHI"].lower() == "true"
-                            if is_sushi:
-                                restaurants.append({"x": x, "y": y, "type": "SUSHI", "name": "Sushiro"})
-                                
-                            is_curry = row["CURRY"].lower() == "true"
-                            if is_curry:
-                                restaurants.append({"x": x, "y": y, "type": "CURRY", "name": "Indian Curry"})
-                                
-                            is_pizza = row["PIZZA"].lower() == "true"
-                            if is_pizza:
-                                restaurants.append({"x": x, "y": y, "type": "PIZZA", "name": "Pizza Hut"})
-
-                            is_dest = row["delivery_point"].lower() == "true"
-                            if is_dest:
-                                delivery_points.append({"x": x, "y": y})
-                        except (KeyError, ValueError) as e:
-                            print(f"Warning: Skipping invalid row in sample_data.csv: {row} - {e}")
-                            continue
-                            
-            except Exception as e:
-                print(f"Error reading {sample_data_file}: {e}")
-                print("Falling back to default data...")
-                delivery_points, restaurants = get_default_data()
-        else:
-            print(f"File {sample_data_file} not found. Using default data...")
-            delivery_points, restaurants = get_default_data()
-
-        # Create delivery points (houses) - RESTRICTED FOR TRANSIT
-        print(" Setting up delivery points")
-        for i, point in enumerate(delivery_points):
-            node = db.query(Node).filter(
-                Node.x == point["x"],
-                Node.y == point["y"]
-            ).first()
-            if node:
-                node.node_type = 'HOUSE'
-                node.is_delivery_point = True
-                node.name = f"House_{i+1}"
-        
-        db.commit()
-        print(f" {len(delivery_points)} delivery points created")
-        
-        # Create restaurants - RESTRICTED FOR TRANSIT
-        print(" Setting up restaurants")
-        for restaurant in restaurants:
-            node = db.query(Node).filter(
-                Node.x == restaurant["x"],
-                Node.y == restaurant["y"]
-            ).first()
-            if node:
-                node.node_type = 'RESTAURANT'
-                node.is_restaurant = True
-                node.restaurant_type = restaurant["type"]
-                node.name = restaurant["name"]
+        print(f" {len(map_data.houses)} delivery points created")
+        print(f" {len(map_data.restaurants)} restaurants created (restricted for transit)")
+        print(f" {len(map_data.bot_stations)} bot stations created (allowed for transit)")
+        print(f" {len(map_data.blocked_paths)} blocked paths created")
         
-        db.commit()
-        print(f" {len(restaurants)} restaurants created (restricted for transit)")
-        
-        # Create bot stations - ALLOWED FOR TRANSIT
-        bot_stations = [
-            {"x": 4, "y": 4, "name": "Central Station"},
-        ]
-        
-        print(" Setting up bot stations (allowed for transit)...")
-        for station in bot_stations:
-            node = db.query(Node).filter(
-                Node.x == station["x"],
-                Node.y == station["y"]
-            ).first()
-            if node:
-                node.node_type = 'BOT_STATION'
-                node.is_bot_station = True
-                node.name = station["name"]
-        
-        db.commit()
-        print(f" {len(bot_stations)} bot stations created (allowed for transit)")
-        
-        # Create 5 delivery bots
+        # Create 5 delivery bots, at the station
+        station = map_data.bot_stations[0]
         bot_starting_positions = [
-            {"name": "Bot-Alpha", "x": 4, "y": 4},
+            {"name": "Bot-Alpha", "x": station.x, "y": station.y},
             {"name": "Bot-Beta", "x": 0, "y": 8},
-            {"name": "Bot-Gamma", "x": 4, "y": 4},
-            {"name": "Bot-Delta", "x": 4, "y": 4},
-            {"name": "Bot-Epsilon", "x": 4, "y": 4},
+            {"name": "Bot-Gamma", "x": station.x, "y": station.y},
+            {"name": "Bot-Delta", "x": station.x, "y": station.y},
+            {"name": "Bot-Epsilon", "x": station.x, "y": station.y},
         ]
         
         print(" Creating delivery bots...")
@@ -157,27 +62,6 @@ def init_complete_database():
         
         db.commit()
         print(f" {len(bot_starting_positions)} bots created")
-
-        # Load blocked paths from CSV if it exists, otherwise use defaults
-        blocked_paths_data = load_blocked_paths()
-        
-        print("Setting up blocked paths...")
-        for path in blocked_paths_data:
-            blocked_path = BlockedPath(
-                from_node_id=path["from_id"],
-                to_node_id=path["to_id"]
-            )
-            db.add(blocked_path)
-            
-            from_x = (path["from_id"] - 1) % 9
-            from_y = (path["from_id"] - 1) // 9
-            to_x = (path["to_id"] - 1) % 9
-            to_y = (path["to_id"] - 1) // 9
-            
-            print(f"  ({from_x},{from_y}) ↔ ({to_x},{to_y}) [IDs: {path['from_id']} ↔ {path['to_id']}]")
-        
-        db.commit()
-        print(f" {len(blocked_paths_data)} blocked paths created")
         
         # Print summary
         total_nodes = db.query(Node).count()
@@ -192,7 +76,7 @@ def init_complete_database():
         print(f"Total nodes: {total_nodes}")
         print(f"Houses (delivery points - restricted): {total_houses}")
         print(f"Restaurants (restricted for transit): {total_restaurants}")
-        print(f" Bot stations (allowed for transit): {len(bot_stations)}")
+        print(f" Bot stations (allowed for transit): {len(map_data.bot_stations)}")
         print(f" Delivery bots: {total_bots}")
         print(f" Blocked paths: {total_blocked}")
         print("="*60)
@@ -238,49 +122,62 @@ def get_default_data():
     
     return delivery_points, restaurants
 
-def load_blocked_paths():
-
-    blocked_paths_file = './BlockedPaths.csv'
+def load_initial_map() -> MapData:
+    # sample_data.csv / BlockedPaths.csv when present, otherwise the built-in defaults
+    sample_data_file = settings.map_csv_path
+    blocked_paths_file = settings.blocked_paths_csv_path
+    has_blocked_file = os.path.exists(blocked_paths_file)
     
-    if os.path.exists(blocked_paths_file):
-        print(f"Loading blocked paths from {blocked_paths_file}")
-        blocked_paths_data = []
-        
+    map_data = None
+    if os.path.exists(sample_data_file):
+        print(f"Loading data from {sample_data_file}")
         try:
-            with open(blocked_paths_file, newline="", encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f, skipinitialspace=True)
-                
-                for row_num, row in enumerate(reader, 1):
-                    # Clean up the keys and values
-                    norm = {(k or "").strip().lstrip("\ufeff").lower(): (v or "").strip()
-                        for k, v in row.items()}
-                    
-                    try:
-                        from_id = int(norm["from_id"])
-                        to_id = int(norm["to_id"])
-                        
-                        # Validate IDs are in valid range (1-81 for 9x9 grid)
-                        if not (1 <= from_id <= 81 and 1 <= to_id <= 81):
-                            print(f"Warning: Invalid node IDs in row {row_num}: from_id={from_id}, to_id={to_id}")
-                            continue
-                            
-                        blocked_paths_data.append({"from_id": from_id, "to_id": to_id})
-                        
-                    except (KeyError, ValueError) as e:
-                        print(f"Warning: Skipping invalid row {row_num} in {blocked_paths_file}: {row} - {e}")
-                        continue
-                        
-        except Exception as e:
-            print(f"Error reading {blocked_paths_file}: {e}")
-            print("Falling back to default blocked paths...")
-            return get_default_blocked_paths()
-            
-        print(f"✓ Loaded {len(blocked_paths_data)} blocked paths from CSV")
-        return blocked_paths_data
-    
+            with open(sample_data_file, newline='', encoding='utf-8-sig') as sample_lines, \
+                    (open(blocked_paths_file, newline='', encoding='utf-8-sig')
+                     if has_blocked_file else contextlib.nullcontext()) as blocked_lines:
+                map_data, report = read_map(sample_lines, blocked_lines, settings.grid_size)
+            # Invalid rows are skipped, the rest of the map still loads
+            for error in report.errors:
+                print(f"Warning: Skipping {error['file']} line {error['line']}: {error['message']}")
+        except OSError as e:
+            print(f"Error reading map CSVs: {e}")
+            print("Falling back to default data...")
     else:
+        print(f"File {sample_data_file} not found. Using default data...")
+    
+    if map_data is None:
+        map_data = default_map(settings.grid_size)
+    elif not has_blocked_file:
         print(f"File {blocked_paths_file} not found. Using default blocked paths...")
-        return get_default_blocked_paths()
+        add_default_blocked_paths(map_data)
+    
+    return map_data
+
+def default_map(grid_size: int) -> MapData:
+
+    delivery_points, restaurants = get_default_data()
+    map_data = MapData(grid_size=grid_size)
+    
+    for i, point in enumerate(delivery_points):
+        map_data.nodes[(point["x"], point["y"])] = make_node(
+            point["x"], point["y"], grid_size, 'HOUSE', f"House_{i+1}"
+        )
+    
+    for restaurant in restaurants:
+        map_data.nodes[(restaurant["x"], restaurant["y"])] = make_node(
+            restaurant["x"], restaurant["y"], grid_size, 'RESTAURANT', restaurant["name"], restaurant["type"]
+        )
+    
+    station = (grid_size // 2, grid_size // 2)
+    map_data.nodes[station] = make_node(station[0], station[1], grid_size, 'BOT_STATION', "Central Station")
+    
+    add_default_blocked_paths(map_data)
+    return map_data
+
+def add_default_blocked_paths(map_data: MapData):
+    # The default ids are on the original 9x9 grid
+    for path in get_default_blocked_paths():
+        map_data.blocked_paths.add((cell_for(path["from_id"], 9), cell_for(path["to_id"], 9)))
 
 def get_default_blocked_paths():
 
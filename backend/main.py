@@ -1,36 +1,84 @@
 
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from middleware.internal_secret import InternalSecretMiddleware
 from contextlib import asynccontextmanager
 import socketio
 from core.database import engine, create_tables
-from api.v1 import orders, bots, routes, map, auto_pilot
+from api.v1 import orders, bots, routes, map, auto_pilot, admin
 from core.config import settings
+from core.events import ORDER_CHANGED, events
+from core.log import setup_logging
+from core.metrics import CONTENT_TYPE, registry
+from core.realtime import TileBroadcaster
+from core.pagination import NEXT_CURSOR_HEADER
+from repositories import Repositories, get_repositories, memory_store, open_repositories, use_memory_backend
 import uvicorn
-from services.auto_movement import auto_movement
+from services.auto_movement import ORDERS_QUEUED, auto_movement
+from services.demand_model import demand_model
+from services.map_data import load_map_csv
+from services.node_index import node_index
+from services.order_archiver import order_archiver
 import asyncio
+import datetime
+import logging
 
+setup_logging()
+logger = logging.getLogger(__name__)
 
-if not auto_movement.is_running:
-        asyncio.create_task(auto_movement.start_auto_movement())
-        print("autopilot is running")
-else:
-    print("autopilot is already running")
-
+# CORS is handled by the middleware wrapping socket_app, for Socket.IO as well
 sio = socketio.AsyncServer(
     async_mode='asgi',
-    cors_allowed_origins="*"
+    cors_allowed_origins=[]
+)
+
+# Bot updates go only to the map tiles clients are viewing
+tile_broadcaster = TileBroadcaster(
+    sio, settings.tile_size, max_tiles=settings.viewport_max_cells // settings.tile_size ** 2
 )
+auto_movement.tick_listeners.append(tile_broadcaster.publish_bots)
+events.subscribe(ORDER_CHANGED, auto_movement.drop_order_from_plan)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 
-    create_tables()
-    print("Database tables created")
+    if use_memory_backend():
+        seed_memory_store()
+        logger.info("In-memory backend seeded from map CSVs")
+    else:
+        create_tables()
+        logger.info("Database tables created")
+
+    with open_repositories() as repos:
+        node_index.load(repos)
+        logger.info("Node index loaded")
+        demand_model.load(repos, repos.now() - datetime.timedelta(days=settings.demand_history_days))
+        logger.info("Demand model warmed from %d orders", demand_model.recorded)
+
+    # Started once the store is seeded, so the loop finds the stations
+    if not auto_movement.is_running:
+        asyncio.create_task(auto_movement.start_auto_movement())
+        logger.info("autopilot is running")
+    else:
+        logger.info("autopilot is already running")
+
+    # Archiving only applies to the SQL backend
+    if not use_memory_backend():
+        asyncio.create_task(order_archiver.start())
     yield
 
-    print("Application shutting down")
+    order_archiver.stop()
+    logger.info("Application shutting down")
+
+def seed_memory_store():
+    # Same map and fleet init_data.py writes to Postgres, held in process
+    map_data = load_map_csv(settings.map_csv_path, settings.blocked_paths_csv_path, settings.grid_size)
+    memory_store.load_map(map_data)
+    stations = sorted((n.x, n.y) for n in map_data.bot_stations)
+    for i in range(settings.max_bots):
+        x, y = stations[i % len(stations)]
+        memory_store.add_bot(name=f"Bot-{i + 1}", current_x=x, current_y=y,
+                             max_capacity=settings.max_orders_per_bot)
 
 app = FastAPI(
     title="EagRoute API",
@@ -38,18 +86,6 @@ app = FastAPI(
     version="1.5.0",
     lifespan=lifespan
 )
-app.add_middleware(
-    InternalSecretMiddleware
-)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 
 # auto_pilot = AutoPilotService()
 
@@ -63,9 +99,18 @@ app.include_router(bots.router, prefix="/api/v1", tags=["bots"])
 app.include_router(routes.router, prefix="/api/v1", tags=["routes"])
 app.include_router(map.router, prefix="/api/v1", tags=["map"])
 app.include_router(auto_pilot.router, prefix="/api/v1", tags=["auto_pilot"])
+app.include_router(admin.router, prefix="/api/v1", tags=["admin"])
 
 
-socket_app = socketio.ASGIApp(sio, app)
+# Socket.IO and the API share one middleware stack, so the secret check covers both
+socket_app = CORSMiddleware(
+    InternalSecretMiddleware(socketio.ASGIApp(sio, app)),
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
+)
 
 @app.get("/")
 async def root():
@@ -75,19 +120,47 @@ async def root():
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
+# Prometheus scrape target; send x-internal-secret from the scrape config
+@app.get("/metrics")
+def metrics(repos: Repositories = Depends(get_repositories)):
+    ORDERS_QUEUED.set(repos.orders.count_by_status(('PENDING',)))
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
 
 @sio.event
 async def connect(sid, environ):
-    print(f"Client {sid} connected")
+    logger.info("Client %s connected", sid)
 
 @sio.event
 async def disconnect(sid):
-    print(f"Client {sid} disconnected")
+    tile_broadcaster.forget(sid)
+    logger.info("Client %s disconnected", sid)
 
 @sio.event
 async def subscribe_updates(sid):
     await sio.emit('subscribed', {'status': 'success'}, room=sid)
 
+# Subscribe to bot updates for a box: {"x0": .., "y0": .., "x1": .., "y1": ..}, inclusive.
+# A new box replaces the previous one
+@sio.event
+async def subscribe_viewport(sid, data):
+    try:
+        tiles = await tile_broadcaster.subscribe(
+            sid, int(data["x0"]), int(data["y0"]), int(data["x1"]), int(data["y1"])
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        await sio.emit('subscribe_error', {'detail': str(e)}, room=sid)
+        return
+    await sio.emit('subscribed', {
+        'status': 'success',
+        'tile_size': settings.tile_size,
+        'tiles': sorted(list(tile) for tile in tiles)
+    }, room=sid)
+
+@sio.event
+async def unsubscribe_viewport(sid):
+    await tile_broadcaster.unsubscribe(sid)
+
 if __name__ == "__main__":
     
     uvicorn.run("main:socket_app", host="0.0.0.0", port=8000, reload=True)
@@ -1,18 +1,42 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+import hmac
 from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 from core.config import settings
 
 EXCLUDE_PATHS = {"/", "/health", "/docs"}
+SECRET_HEADER = b"x-internal-secret"
 
-class InternalSecretMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        if request.url.path not in EXCLUDE_PATHS:
-            secret = request.headers.get("x-internal-secret")
-            if not secret or secret != settings.secret_key:
-                return JSONResponse(
-                    {"detail": "Unauthorized: invalid or missing internal secret"},
-                    status_code=401
-                )
-        response = await call_next(request)
-        return response
+# Policy violation; before the handshake is accepted the server answers it with a 403
+WS_POLICY_VIOLATION = 1008
+
+_unauthorized = JSONResponse(
+    {"detail": "Unauthorized: invalid or missing internal secret"},
+    status_code=401
+)
+
+class InternalSecretMiddleware:
+    """
+    Plain ASGI middleware: checks the header and hands the untouched scope, receive and send
+    to the app, so responses stream straight through. Covers HTTP and WebSocket scopes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.secret = settings.secret_key.encode()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket") or scope["path"] in EXCLUDE_PATHS or self._authorized(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": WS_POLICY_VIOLATION})
+            return
+        await _unauthorized(scope, receive, send)
+
+    def _authorized(self, scope: Scope) -> bool:
+        # ASGI servers lower-case header names
+        for name, value in scope["headers"]:
+            if name == SECRET_HEADER:
+                return hmac.compare_digest(value, self.secret)
+        return False
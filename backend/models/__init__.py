@@ -2,5 +2,6 @@ from .node import Node
 from .bot import Bot
 from .order import Order
 from .blocked_path import BlockedPath
+from .order_archive import ArchivedOrder
 
-__all__ = ["Node", "Bot", "Order", "BlockedPath"]
\ No newline at end of file
+__all__ = ["Node", "Bot", "Order", "BlockedPath", "ArchivedOrder"]
\ No newline at end of file
@@ -1,8 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from core.database import Base
 
+ACTIVE_STATUSES = ('PENDING', 'ASSIGNED', 'PICKED_UP')
+IN_PROGRESS_STATUSES = ('ASSIGNED', 'PICKED_UP')
+FINISHED_STATUSES = ('DELIVERED', 'CANCELLED')
+
 class Order(Base):
     __tablename__ = "orders"
 
@@ -32,5 +36,34 @@ class Order(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(),onupdate=func.now())
 
+    # Lifecycle stamps, set by services.order_latency.set_order_status
+    assigned_at  = Column(DateTime(timezone=True), nullable=True)
+    picked_up_at = Column(DateTime(timezone=True), nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    cancelled_at = Column(DateTime(timezone=True), nullable=True)
+
     bot  = relationship("models.bot.Bot", backref="orders")
     node = relationship("models.node.Node", backref="orders")
+
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_bot_id_created_at_id", "bot_id", "created_at", "id"),
+        # Hot working set only: the movement loop and assigner never look at finished orders
+        Index(
+            "ix_orders_active_bot_id_status", "bot_id", "status",
+            postgresql_where=status.in_(ACTIVE_STATUSES)
+        ),
+        # Viewport queries: active orders by either end's cell
+        Index(
+            "ix_orders_active_pickup_xy", "pickup_x", "pickup_y",
+            postgresql_where=status.in_(ACTIVE_STATUSES)
+        ),
+        Index(
+            "ix_orders_active_delivery_xy", "delivery_x", "delivery_y",
+            postgresql_where=status.in_(ACTIVE_STATUSES)
+        ),
+        Index(
+            "ix_orders_finished_updated_at", "updated_at",
+            postgresql_where=status.in_(FINISHED_STATUSES)
+        ),
+    )
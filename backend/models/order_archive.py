@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+from core.database import Base
+
+class ArchivedOrder(Base):
+    """Completed orders moved out of the hot orders table by the archiver"""
+    __tablename__ = "orders_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    restaurant_type = Column(String(50), nullable=False)
+    restaurant_name = Column(String(100), nullable=False, default="")
+
+    customer_name = Column(String(100), nullable=False, default="Guest")
+    customer_phone = Column(String(20), nullable=True)
+
+    pickup_x = Column(Integer, nullable=False)
+    pickup_y = Column(Integer, nullable=False)
+    delivery_x = Column(Integer, nullable=False)
+    delivery_y = Column(Integer, nullable=False)
+
+    status = Column(String(50), nullable=False)
+
+    restaurant_id = Column(Integer, nullable=True)
+    bot_id        = Column(Integer, nullable=True)
+
+    estimated_distance = Column(Integer, nullable=True)
+    estimated_time     = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+    assigned_at  = Column(DateTime(timezone=True), nullable=True)
+    picked_up_at = Column(DateTime(timezone=True), nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    cancelled_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_orders_archive_created_at_id", "created_at", "id"),
+        Index("ix_orders_archive_bot_id_created_at_id", "bot_id", "created_at", "id"),
+    )
@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+from core.config import settings
+from core.database import SessionLocal
+from repositories.base import Repositories
+from repositories.memory import InMemoryStore, MemoryRepositories
+from repositories.sql import SqlRepositories
+
+# Shared state for the in-memory backend, filled at startup
+memory_store = InMemoryStore(tile_size=settings.tile_size)
+
+
+def use_memory_backend() -> bool:
+    return settings.repository_backend == "memory"
+
+
+def as_repositories(db) -> Repositories:
+    # Accept either a unit of work or a plain Session from older call sites
+    if db is None or isinstance(db, Repositories):
+        return db
+    return SqlRepositories(db)
+
+
+def create_repositories() -> Repositories:
+    if use_memory_backend():
+        return MemoryRepositories(memory_store)
+    return SqlRepositories(SessionLocal())
+
+
+@contextmanager
+def open_repositories():
+    repos = create_repositories()
+    try:
+        yield repos
+    finally:
+        repos.close()
+
+
+def get_repositories():
+    repos = create_repositories()
+    try:
+        yield repos
+    finally:
+        repos.close()
+
+
+__all__ = [
+    "Repositories", "SqlRepositories", "MemoryRepositories", "InMemoryStore",
+    "memory_store", "use_memory_backend", "as_repositories",
+    "create_repositories", "open_repositories", "get_repositories",
+]
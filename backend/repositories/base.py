@@ -0,0 +1,126 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+
+class NodeRepository(ABC):
+    @abstractmethod
+    def list_all(self) -> list: ...
+
+    @abstractmethod
+    def get_by_cell(self, x: int, y: int): ...
+
+    @abstractmethod
+    def list_restaurants(self, restaurant_type: Optional[str] = None) -> list: ...
+
+    @abstractmethod
+    def list_delivery_points(self) -> list: ...
+
+    @abstractmethod
+    def list_bot_stations(self) -> list: ...
+
+
+class BlockedPathRepository(ABC):
+    @abstractmethod
+    def list_pairs(self) -> List[Tuple[int, int]]:
+        """(from_node_id, to_node_id) for every blocked edge"""
+
+
+class BotRepository(ABC):
+    @abstractmethod
+    def get(self, bot_id: int): ...
+
+    @abstractmethod
+    def list_all(self) -> list: ...
+
+    @abstractmethod
+    def list_available(self) -> list:
+        """IDLE/BUSY bots with spare capacity"""
+
+    @abstractmethod
+    def create(self, data: dict): ...
+
+    @abstractmethod
+    def list_in_box(self, x0: int, y0: int, x1: int, y1: int) -> list:
+        """Bots whose current cell lies in the inclusive box"""
+
+    @abstractmethod
+    def page(self, cursor: Optional[str], limit: int, fields: Optional[List[str]] = None,
+             offset: int = 0) -> Tuple[list, Optional[str]]: ...
+
+
+class OrderRepository(ABC):
+    @abstractmethod
+    def get(self, order_id: int): ...
+
+    @abstractmethod
+    def get_archived(self, order_id: int): ...
+
+    @abstractmethod
+    def create(self, data: dict): ...
+
+    @abstractmethod
+    def create_many(self, rows: List[dict]) -> List[int]:
+        """Insert all rows at once, ids come back in row order"""
+
+    @abstractmethod
+    def list_by_ids(self, order_ids: List[int], status: Optional[str] = None) -> list: ...
+
+    @abstractmethod
+    def list_by_status(self, statuses: Tuple[str, ...]) -> list: ...
+
+    @abstractmethod
+    def list_active_in_box(self, x0: int, y0: int, x1: int, y1: int) -> list:
+        """Active orders with their pickup or delivery cell in the inclusive box"""
+
+    @abstractmethod
+    def list_in_progress_for_bot(self, bot_id: int) -> list:
+        """ASSIGNED/PICKED_UP orders of a bot, oldest first"""
+
+    @abstractmethod
+    def count_in_progress_for_bot(self, bot_id: int) -> int: ...
+
+    @abstractmethod
+    def count_for_bot(self, bot_id: int, status: Optional[str] = None) -> int: ...
+
+    @abstractmethod
+    def count_by_status(self, statuses: Tuple[str, ...]) -> int: ...
+
+    @abstractmethod
+    def count_recent_by_pickup(self, cells: List[Cell], since: datetime) -> Dict[Cell, int]:
+        """Active orders per pickup cell created at or after since"""
+
+    @abstractmethod
+    def page(self, cursor: Optional[str], limit: int, fields: Optional[List[str]] = None,
+             status: Optional[str] = None, bot_id: Optional[int] = None, offset: int = 0,
+             archived: bool = False) -> Tuple[list, Optional[str]]: ...
+
+    @abstractmethod
+    def stream(self, columns: List[str], status: Optional[str] = None,
+               created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+               bot_id: Optional[int] = None, archived: bool = False,
+               batch_size: int = 1000) -> Iterator[list]:
+        """Yield batches of row tuples ordered by (created_at, id)"""
+
+
+class Repositories(ABC):
+    """One unit of work over every repository"""
+    nodes: NodeRepository
+    blocked_paths: BlockedPathRepository
+    bots: BotRepository
+    orders: OrderRepository
+
+    def now(self) -> datetime:
+        """Clock for lifecycle timestamps; the in-memory store may run on simulated time"""
+        return datetime.now(timezone.utc)
+
+    @abstractmethod
+    def commit(self): ...
+
+    @abstractmethod
+    def rollback(self): ...
+
+    @abstractmethod
+    def close(self): ...
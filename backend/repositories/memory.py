@@ -0,0 +1,351 @@
+import datetime
+import itertools
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from core.pagination import decode_cursor, encode_cursor
+from models.order import ACTIVE_STATUSES, IN_PROGRESS_STATUSES
+from repositories.base import (
+    Cell, NodeRepository, BlockedPathRepository, BotRepository, OrderRepository, Repositories
+)
+from services.map_data import MapData, node_id_for
+from services.node_index import NodeEntry
+from services.spatial_index import GridBucketIndex
+
+
+def utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+@dataclass
+class BotRecord:
+    id: int
+    name: str
+    current_x: int = 0
+    current_y: int = 0
+    status: str = 'IDLE'
+    max_capacity: int = 3
+    current_orders: int = 0
+    battery_level: int = 100
+    is_active: bool = True
+    created_at: Optional[datetime.datetime] = None
+    updated_at: Optional[datetime.datetime] = None
+    _store: Optional["InMemoryStore"] = field(default=None, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        # Keep the store's spatial index on the bot's current cell
+        store = self.__dict__.get('_store')
+        if store is not None and name in ('current_x', 'current_y'):
+            store.bot_positions.move(self.id, self.current_x, self.current_y)
+
+
+@dataclass
+class OrderRecord:
+    id: int
+    restaurant_type: str
+    pickup_x: int
+    pickup_y: int
+    delivery_x: int
+    delivery_y: int
+    restaurant_name: str = ""
+    customer_name: str = "Guest"
+    customer_phone: Optional[str] = None
+    status: str = 'PENDING'
+    restaurant_id: Optional[int] = None
+    bot_id: Optional[int] = None
+    estimated_distance: Optional[int] = None
+    estimated_time: Optional[int] = None
+    created_at: Optional[datetime.datetime] = None
+    updated_at: Optional[datetime.datetime] = None
+    assigned_at: Optional[datetime.datetime] = None
+    picked_up_at: Optional[datetime.datetime] = None
+    delivered_at: Optional[datetime.datetime] = None
+    cancelled_at: Optional[datetime.datetime] = None
+    _store: Optional["InMemoryStore"] = field(default=None, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        # Keep the store's status/bot indexes in step with attribute writes
+        store = self.__dict__.get('_store')
+        if store is None or name not in ('status', 'bot_id'):
+            object.__setattr__(self, name, value)
+            return
+
+        old = getattr(self, name)
+        if old == value:
+            return
+        store._unindex_order(self)
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, 'updated_at', store.now())
+        store._index_order(self)
+        for listener in store.order_listeners:
+            listener(self, name, old, value)
+
+
+class InMemoryStore:
+    """Process-local state with indexed lookups, used instead of Postgres"""
+
+    def __init__(self, clock: Callable[[], datetime.datetime] = utc_now, tile_size: int = 16):
+        self.now = clock
+        self.grid_size = 0
+        self.nodes: Dict[Cell, NodeEntry] = {}
+        self.special_nodes: List[NodeEntry] = []
+        self.blocked_pairs: List[Tuple[int, int]] = []
+        self.bots: Dict[int, BotRecord] = {}
+        self.orders: Dict[int, OrderRecord] = {}
+        self.order_listeners: List[Callable] = []
+        self._orders_by_bot: Dict[Tuple[int, str], Dict[int, None]] = {}
+        self._orders_by_status: Dict[str, Dict[int, None]] = {}
+        self._orders_by_pickup: Dict[Cell, Dict[int, None]] = {}
+        # Spatial indexes for viewport queries: bots by position, active orders by both ends
+        self.bot_positions = GridBucketIndex(tile_size)
+        self.active_pickups = GridBucketIndex(tile_size)
+        self.active_deliveries = GridBucketIndex(tile_size)
+        self._bot_ids = itertools.count(1)
+        self._order_ids = itertools.count(1)
+
+    def load_map(self, map_data: MapData):
+        # Every cell exists as a node, like the grid created by init_data
+        # Build everything first and swap it in at the end, so a reload can replace a live map
+        size = map_data.grid_size
+        nodes = {}
+        for y in range(size):
+            for x in range(size):
+                nodes[(x, y)] = map_data.nodes.get((x, y)) or NodeEntry(
+                    id=node_id_for(x, y, size), x=x, y=y, node_type='NODE',
+                    is_delivery_point=False, is_restaurant=False, is_bot_station=False,
+                    restaurant_type=None, name=f"Node_{x}_{y}"
+                )
+        # Restaurants, houses and stations, so POI lookups don't scan every cell
+        special_nodes = list(map_data.nodes.values())
+        blocked_pairs = [
+            (node_id_for(a[0], a[1], size), node_id_for(b[0], b[1], size))
+            for a, b in map_data.blocked_paths
+        ]
+        self.grid_size, self.nodes, self.special_nodes, self.blocked_pairs = size, nodes, special_nodes, blocked_pairs
+
+    def add_bot(self, **data) -> BotRecord:
+        now = self.now()
+        bot = BotRecord(id=next(self._bot_ids), created_at=now, updated_at=now, **data)
+        self.bots[bot.id] = bot
+        self.bot_positions.move(bot.id, bot.current_x, bot.current_y)
+        bot._store = self
+        return bot
+
+    def add_order(self, **data) -> OrderRecord:
+        now = self.now()
+        order = OrderRecord(id=next(self._order_ids), created_at=now, updated_at=now, **data)
+        self.orders[order.id] = order
+        self._index_order(order)
+        order._store = self
+        return order
+
+    def _index_order(self, order: OrderRecord):
+        self._orders_by_status.setdefault(order.status, {})[order.id] = None
+        if order.bot_id is not None:
+            self._orders_by_bot.setdefault((order.bot_id, order.status), {})[order.id] = None
+        if order.status in ACTIVE_STATUSES:
+            self._orders_by_pickup.setdefault((order.pickup_x, order.pickup_y), {})[order.id] = None
+            self.active_pickups.move(order.id, order.pickup_x, order.pickup_y)
+            self.active_deliveries.move(order.id, order.delivery_x, order.delivery_y)
+
+    def _unindex_order(self, order: OrderRecord):
+        self._orders_by_status.get(order.status, {}).pop(order.id, None)
+        if order.bot_id is not None:
+            self._orders_by_bot.get((order.bot_id, order.status), {}).pop(order.id, None)
+        self._orders_by_pickup.get((order.pickup_x, order.pickup_y), {}).pop(order.id, None)
+        self.active_pickups.remove(order.id)
+        self.active_deliveries.remove(order.id)
+
+    def orders_for_bot(self, bot_id: int, statuses) -> List[OrderRecord]:
+        return [
+            self.orders[order_id]
+            for status in statuses
+            for order_id in self._orders_by_bot.get((bot_id, status), {})
+        ]
+
+    def orders_with_status(self, statuses) -> List[OrderRecord]:
+        return [
+            self.orders[order_id]
+            for status in statuses
+            for order_id in self._orders_by_status.get(status, {})
+        ]
+
+
+def _page_records(records, cursor, limit, fields, offset) -> Tuple[list, Optional[str]]:
+    # Same contract as core.pagination.keyset_page, over already-filtered records
+    records = sorted(records, key=lambda r: (r.created_at, r.id))
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        records = [r for r in records if (r.created_at, r.id) > (created_at, row_id)]
+    elif offset:
+        records = records[offset:]
+
+    page = records[:limit + 1]
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
+
+    if fields:
+        page = [{name: getattr(r, name) for name in fields} for r in page]
+    return page, next_cursor
+
+
+class MemoryNodeRepository(NodeRepository):
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+
+    def list_all(self) -> list:
+        return list(self.store.nodes.values())
+
+    def get_by_cell(self, x: int, y: int):
+        return self.store.nodes.get((x, y))
+
+    def list_restaurants(self, restaurant_type: Optional[str] = None) -> list:
+        return [
+            n for n in self.store.special_nodes
+            if n.is_restaurant and (not restaurant_type or n.restaurant_type == restaurant_type.upper())
+        ]
+
+    def list_delivery_points(self) -> list:
+        return [n for n in self.store.special_nodes if n.is_delivery_point]
+
+    def list_bot_stations(self) -> list:
+        return [n for n in self.store.special_nodes if n.is_bot_station]
+
+
+class MemoryBlockedPathRepository(BlockedPathRepository):
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+
+    def list_pairs(self) -> List[Tuple[int, int]]:
+        return list(self.store.blocked_pairs)
+
+
+class MemoryBotRepository(BotRepository):
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+
+    def get(self, bot_id: int):
+        return self.store.bots.get(bot_id)
+
+    def list_all(self) -> list:
+        return list(self.store.bots.values())
+
+    def list_available(self) -> list:
+        return [
+            b for b in self.store.bots.values()
+            if b.status in ('IDLE', 'BUSY') and b.current_orders < b.max_capacity
+        ]
+
+    def create(self, data: dict):
+        return self.store.add_bot(**data)
+
+    def list_in_box(self, x0: int, y0: int, x1: int, y1: int) -> list:
+        return [self.store.bots[bot_id] for bot_id in sorted(self.store.bot_positions.query(x0, y0, x1, y1))]
+
+    def page(self, cursor, limit, fields=None, offset=0):
+        return _page_records(self.store.bots.values(), cursor, limit, fields, offset)
+
+
+class MemoryOrderRepository(OrderRepository):
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+
+    def get(self, order_id: int):
+        return self.store.orders.get(order_id)
+
+    def get_archived(self, order_id: int):
+        return None
+
+    def create(self, data: dict):
+        return self.store.add_order(**data)
+
+    def create_many(self, rows: List[dict]) -> List[int]:
+        return [self.store.add_order(**row).id for row in rows]
+
+    def list_by_ids(self, order_ids: List[int], status: Optional[str] = None) -> list:
+        orders = (self.store.orders.get(order_id) for order_id in sorted(order_ids))
+        return [o for o in orders if o and (status is None or o.status == status)]
+
+    def list_by_status(self, statuses: Tuple[str, ...]) -> list:
+        return self.store.orders_with_status(statuses)
+
+    def list_active_in_box(self, x0: int, y0: int, x1: int, y1: int) -> list:
+        order_ids = set(self.store.active_pickups.query(x0, y0, x1, y1))
+        order_ids.update(self.store.active_deliveries.query(x0, y0, x1, y1))
+        return [self.store.orders[order_id] for order_id in sorted(order_ids)]
+
+    def list_in_progress_for_bot(self, bot_id: int) -> list:
+        return sorted(
+            self.store.orders_for_bot(bot_id, IN_PROGRESS_STATUSES),
+            key=lambda o: (o.created_at, o.id)
+        )
+
+    def count_in_progress_for_bot(self, bot_id: int) -> int:
+        return len(self.store.orders_for_bot(bot_id, IN_PROGRESS_STATUSES))
+
+    def count_for_bot(self, bot_id: int, status: Optional[str] = None) -> int:
+        if status:
+            return len(self.store.orders_for_bot(bot_id, (status,)))
+        return sum(1 for o in self.store.orders.values() if o.bot_id == bot_id)
+
+    def count_by_status(self, statuses: Tuple[str, ...]) -> int:
+        return len(self.store.orders_with_status(statuses))
+
+    def count_recent_by_pickup(self, cells: List[Cell], since: datetime.datetime) -> Dict[Cell, int]:
+        counts = {}
+        for cell in cells:
+            count = sum(
+                1 for order_id in self.store._orders_by_pickup.get(cell, {})
+                if self.store.orders[order_id].created_at >= since
+            )
+            if count:
+                counts[cell] = count
+        return counts
+
+    def page(self, cursor, limit, fields=None, status=None, bot_id=None, offset=0, archived=False):
+        if archived:
+            return [], None
+        records = self.store.orders_with_status((status,)) if status else self.store.orders.values()
+        if bot_id is not None:
+            records = [o for o in records if o.bot_id == bot_id]
+        return _page_records(records, cursor, limit, fields, offset)
+
+    def stream(self, columns, status=None, created_from=None, created_to=None,
+               bot_id=None, archived=False, batch_size=1000) -> Iterator[list]:
+        if archived:
+            return
+        records = self.store.orders_with_status((status,)) if status else list(self.store.orders.values())
+        records = sorted(
+            (o for o in records
+             if (created_from is None or o.created_at >= created_from)
+             and (created_to is None or o.created_at < created_to)
+             and (bot_id is None or o.bot_id == bot_id)),
+            key=lambda o: (o.created_at, o.id)
+        )
+        for start in range(0, len(records), batch_size):
+            yield [tuple(getattr(o, name) for name in columns) for o in records[start:start + batch_size]]
+
+
+class MemoryRepositories(Repositories):
+    """Writes apply immediately; commit and rollback are no-ops"""
+
+    def __init__(self, store: InMemoryStore):
+        self.store = store
+        self.nodes = MemoryNodeRepository(store)
+        self.blocked_paths = MemoryBlockedPathRepository(store)
+        self.bots = MemoryBotRepository(store)
+        self.orders = MemoryOrderRepository(store)
+
+    def now(self) -> datetime.datetime:
+        return self.store.now()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,206 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import and_, func, insert, or_, select, tuple_
+from sqlalchemy.orm import Session
+from core.pagination import keyset_page
+from models.blocked_path import BlockedPath
+from models.bot import Bot
+from models.node import Node
+from models.order import Order, ACTIVE_STATUSES, IN_PROGRESS_STATUSES
+from models.order_archive import ArchivedOrder
+from repositories.base import (
+    Cell, NodeRepository, BlockedPathRepository, BotRepository, OrderRepository, Repositories
+)
+
+
+class SqlNodeRepository(NodeRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_all(self) -> list:
+        return self.db.query(Node).all()
+
+    def get_by_cell(self, x: int, y: int):
+        return self.db.query(Node).filter(Node.x == x, Node.y == y).first()
+
+    def list_restaurants(self, restaurant_type: Optional[str] = None) -> list:
+        query = self.db.query(Node).filter(Node.is_restaurant == True)
+        if restaurant_type:
+            query = query.filter(Node.restaurant_type == restaurant_type.upper())
+        return query.all()
+
+    def list_delivery_points(self) -> list:
+        return self.db.query(Node).filter(Node.is_delivery_point == True).all()
+
+    def list_bot_stations(self) -> list:
+        return self.db.query(Node).filter(Node.is_bot_station == True).all()
+
+
+class SqlBlockedPathRepository(BlockedPathRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_pairs(self) -> List[Tuple[int, int]]:
+        return [
+            (row.from_node_id, row.to_node_id)
+            for row in self.db.query(BlockedPath.from_node_id, BlockedPath.to_node_id)
+        ]
+
+
+class SqlBotRepository(BotRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, bot_id: int):
+        return self.db.query(Bot).filter(Bot.id == bot_id).first()
+
+    def list_all(self) -> list:
+        return self.db.query(Bot).all()
+
+    def list_available(self) -> list:
+        return self.db.query(Bot).filter(
+            Bot.status.in_(['IDLE', 'BUSY']),
+            Bot.current_orders < Bot.max_capacity
+        ).all()
+
+    def create(self, data: dict):
+        bot = Bot(**data)
+        self.db.add(bot)
+        self.db.flush()
+        return bot
+
+    def list_in_box(self, x0: int, y0: int, x1: int, y1: int) -> list:
+        # Range scan on ix_bots_position
+        return self.db.query(Bot).filter(
+            Bot.current_x.between(x0, x1), Bot.current_y.between(y0, y1)
+        ).order_by(Bot.id).all()
+
+    def page(self, cursor, limit, fields=None, offset=0):
+        return keyset_page(self.db, Bot, [], cursor, limit, fields, offset=offset)
+
+
+class SqlOrderRepository(OrderRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, order_id: int):
+        return self.db.query(Order).filter(Order.id == order_id).first()
+
+    def get_archived(self, order_id: int):
+        return self.db.query(ArchivedOrder).filter(ArchivedOrder.id == order_id).first()
+
+    def create(self, data: dict):
+        order = Order(**data)
+        self.db.add(order)
+        self.db.flush()
+        return order
+
+    def create_many(self, rows: List[dict]) -> List[int]:
+        # Single multi-row INSERT ... RETURNING, ids come back in parameter order
+        return list(self.db.scalars(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True),
+            rows
+        ))
+
+    def list_by_ids(self, order_ids: List[int], status: Optional[str] = None) -> list:
+        query = self.db.query(Order).filter(Order.id.in_(order_ids))
+        if status:
+            query = query.filter(Order.status == status)
+        return query.order_by(Order.id).all()
+
+    def list_by_status(self, statuses: Tuple[str, ...]) -> list:
+        return self.db.query(Order).filter(Order.status.in_(statuses)).all()
+
+    def list_active_in_box(self, x0: int, y0: int, x1: int, y1: int) -> list:
+        # Each side of the OR is a range scan on its partial (x, y) index
+        return self.db.query(Order).filter(
+            Order.status.in_(ACTIVE_STATUSES),
+            or_(
+                and_(Order.pickup_x.between(x0, x1), Order.pickup_y.between(y0, y1)),
+                and_(Order.delivery_x.between(x0, x1), Order.delivery_y.between(y0, y1)),
+            )
+        ).order_by(Order.id).all()
+
+    def list_in_progress_for_bot(self, bot_id: int) -> list:
+        return self.db.query(Order).filter(
+            Order.bot_id == bot_id,
+            Order.status.in_(IN_PROGRESS_STATUSES)
+        ).order_by(Order.created_at).all()
+
+    def count_in_progress_for_bot(self, bot_id: int) -> int:
+        return self.db.query(Order).filter(
+            Order.bot_id == bot_id,
+            Order.status.in_(IN_PROGRESS_STATUSES)
+        ).count()
+
+    def count_for_bot(self, bot_id: int, status: Optional[str] = None) -> int:
+        query = self.db.query(Order).filter(Order.bot_id == bot_id)
+        if status:
+            query = query.filter(Order.status == status)
+        return query.count()
+
+    def count_by_status(self, statuses: Tuple[str, ...]) -> int:
+        count = self.db.query(Order).filter(Order.status.in_(statuses)).count()
+        if 'DELIVERED' in statuses or 'CANCELLED' in statuses:
+            count += self.db.query(ArchivedOrder).filter(ArchivedOrder.status.in_(statuses)).count()
+        return count
+
+    def count_recent_by_pickup(self, cells: List[Cell], since: datetime) -> Dict[Cell, int]:
+        if not cells:
+            return {}
+        return {
+            (x, y): count
+            for x, y, count in self.db.query(Order.pickup_x, Order.pickup_y, func.count(Order.id)).filter(
+                tuple_(Order.pickup_x, Order.pickup_y).in_(cells),
+                Order.status.in_(ACTIVE_STATUSES),
+                Order.created_at >= since
+            ).group_by(Order.pickup_x, Order.pickup_y).all()
+        }
+
+    def page(self, cursor, limit, fields=None, status=None, bot_id=None, offset=0, archived=False):
+        model = ArchivedOrder if archived else Order
+        filters = []
+        if status:
+            filters.append(model.status == status)
+        if bot_id is not None:
+            filters.append(model.bot_id == bot_id)
+        return keyset_page(self.db, model, filters, cursor, limit, fields, offset=offset)
+
+    def stream(self, columns, status=None, created_from=None, created_to=None,
+               bot_id=None, archived=False, batch_size=1000) -> Iterator[list]:
+        # Server-side cursor, one partition of rows at a time
+        model = ArchivedOrder if archived else Order
+        filters = []
+        if status:
+            filters.append(model.status == status)
+        if created_from:
+            filters.append(model.created_at >= created_from)
+        if created_to:
+            filters.append(model.created_at < created_to)
+        if bot_id is not None:
+            filters.append(model.bot_id == bot_id)
+
+        stmt = select(*[getattr(model, name) for name in columns]).where(
+            *filters
+        ).order_by(model.created_at, model.id).execution_options(yield_per=batch_size)
+
+        for partition in self.db.execute(stmt).partitions():
+            yield partition
+
+
+class SqlRepositories(Repositories):
+    def __init__(self, db: Session):
+        self.db = db
+        self.nodes = SqlNodeRepository(db)
+        self.blocked_paths = SqlBlockedPathRepository(db)
+        self.bots = SqlBotRepository(db)
+        self.orders = SqlOrderRepository(db)
+
+    def commit(self):
+        self.db.commit()
+
+    def rollback(self):
+        self.db.rollback()
+
+    def close(self):
+        self.db.close()
@@ -1,23 +1,24 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, Literal
+from schemas.coordinates import GridCoordinate
 
 
-BotStatus = Literal['IDLE', 'BUSY', 'MAINTENANCE']
+BotStatus = Literal['IDLE', 'BUSY', 'MAINTENANCE', 'CHARGING']
 
 
 class BotBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
-    current_x: int = Field(default=0, ge=0, le=8)
-    current_y: int = Field(default=0, ge=0, le=8)
+    current_x: GridCoordinate = 0
+    current_y: GridCoordinate = 0
     max_capacity: int = Field(default=3, ge=1, le=5)
 
 class BotCreate(BotBase):
     pass
 
 class BotUpdate(BaseModel):
-    current_x: Optional[int] = Field(None, ge=0, le=8)
-    current_y: Optional[int] = Field(None, ge=0, le=8)
+    current_x: Optional[GridCoordinate] = None
+    current_y: Optional[GridCoordinate] = None
     status: Optional[str] = BotStatus
     current_orders: Optional[int] = Field(None, ge=0, le=5)
     battery_level: Optional[int] = Field(None, ge=0, le=100)
@@ -0,0 +1,14 @@
+from typing import Annotated
+from pydantic import AfterValidator, Field
+from core.config import settings
+
+
+def _on_grid(value: int) -> int:
+    # The bound follows the configured map; generated and imported maps go well past 9x9
+    if value >= settings.grid_size:
+        raise ValueError(f"must be less than the grid size ({settings.grid_size})")
+    return value
+
+
+# A cell coordinate on the configured grid. Whether the cell is a node is checked against the node index
+GridCoordinate = Annotated[int, Field(ge=0), AfterValidator(_on_grid)]
@@ -2,14 +2,15 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 from typing import Literal
+from schemas.coordinates import GridCoordinate
 
 RestaurantType = Literal['RAMEN', 'CURRY', 'PIZZA', 'SUSHI']
 
 NodeType = Literal['NODE', 'HOUSE', 'RESTAURANT', 'BOT_STATION']
 
 class NodeBase(BaseModel):
-    x: int = Field(..., ge=0, le=8)
-    y: int = Field(..., ge=0, le=8)
+    x: GridCoordinate
+    y: GridCoordinate
     node_type: str = NodeType
     is_delivery_point: bool = False
     is_restaurant: bool = False
@@ -22,7 +23,7 @@ class NodeCreate(NodeBase):
 
 class NodeResponse(NodeBase):
     id: int
-    created_at: datetime
+    created_at: datetime | None = None
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 from typing import Literal
+from schemas.coordinates import GridCoordinate
 
 
 RestaurantType = Literal['RAMEN', 'CURRY', 'PIZZA', 'SUSHI']
@@ -12,10 +13,10 @@ class OrderBase(BaseModel):
     customer_name: str = Field(..., min_length=1, max_length=100)
     customer_phone: Optional[str] = Field(None, max_length=20)
     restaurant_type: str = RestaurantType
-    pickup_x: int = Field(..., ge=0, le=8)
-    pickup_y: int = Field(..., ge=0, le=8)
-    delivery_x: int = Field(..., ge=0, le=8)
-    delivery_y: int = Field(..., ge=0, le=8)
+    pickup_x: GridCoordinate
+    pickup_y: GridCoordinate
+    delivery_x: GridCoordinate
+    delivery_y: GridCoordinate
 
 class OrderCreate(OrderBase):
     pass
@@ -34,7 +35,26 @@ class OrderResponse(OrderBase):
     estimated_time: Optional[int] = None
     created_at: datetime
     updated_at: datetime
+    assigned_at: Optional[datetime] = None
+    picked_up_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+    cancelled_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+
+class OrderBulkCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_length=1, max_length=1000)
+
+class OrderBulkResult(BaseModel):
+    index: int
+    status: Literal['CREATED', 'REJECTED']
+    status_code: int
+    order_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class OrderBulkResponse(BaseModel):
+    created: int
+    rejected: int
+    results: List[OrderBulkResult]
@@ -1,11 +1,40 @@
 import asyncio
-from typing import Dict, List, Tuple, Optional
-from sqlalchemy.orm import Session
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Tuple, Optional
+from core.config import settings
+from core.metrics import PhaseTimer, registry
+from core.realtime import bot_state
 from models.bot import Bot
 from models.order import Order
-from models.node import Node
+from repositories import Repositories, open_repositories
+from services.bot_index import bot_index
+from services.bot_manager import BotManager
+from services.charging import ChargingScheduler
+from services.energy import EnergyModel, energy_model, station_distance
+from services.idle_positioning import IdlePositioner, create_idle_positioner
+from services.order_batcher import OrderBatcher, order_batcher
+from services.order_latency import set_order_status
+from services.order_rebalancer import OrderRebalancer
+from services.plan_costs import LegDistances, arrival, cheapest_insertion
 from services.route_algorithm import RouteOptimizer
-from core.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+TICK_SECONDS = registry.histogram("movement_tick_seconds", "Duration of a movement tick")
+TICK_PHASE_SECONDS = registry.histogram(
+    "movement_tick_phase_seconds", "Time per tick spent in each phase: load, dispatch, rebalance, charge, position, plan, route, move, persist, publish", ("phase",)
+)
+TICK_OVERRUNS = registry.counter("movement_tick_overruns_total", "Ticks that took longer than move_interval")
+TICK_LAG = registry.gauge("movement_tick_lag_seconds", "How late the last tick started against its schedule")
+ROUTE_CACHE_HITS = registry.counter("route_cache_hits_total", "Moves that reused a cached route")
+ROUTE_REPLANS = registry.counter("route_replans_total", "Multi-order plans computed from scratch for a bot")
+ORDERS_TRANSFERRED = registry.counter("orders_transferred_total", "ASSIGNED orders moved to a bot that reaches them sooner")
+PLAN_REPAIRS = registry.counter("plan_repairs_total", "Waypoints inserted into or removed from an existing plan")
+BOTS_ACTIVE = registry.gauge("bots_active", "Bots that had orders in the last tick")
+ORDERS_QUEUED = registry.gauge("orders_queued", "PENDING orders waiting for a bot")
+BOTS_CHARGING = registry.gauge("bots_charging", "Bots charging or on their way to a charger")
 
 class AutoMovementService:
     def __init__(self):
@@ -13,26 +42,60 @@ class AutoMovementService:
         self.move_interval = 2.0  
         self.bot_routes: Dict[int, List[Tuple[int, int]]] = {} 
         self.bot_route_index: Dict[int, int] = {} 
+        # Destination each bot last failed to find a route to
+        self.unroutable: Dict[int, Tuple[int, int]] = {}
         self.bot_returning_to_station: Dict[int, bool] = {} 
         self.bot_stations = []  
         self.bot_planned_routes: Dict[int, List[dict]] = {}  
         self.bot_completed_waypoints: Dict[int, set] = {}  
+        # Fixed optimizer for a static map (simulator); otherwise built per tick
+        self.route_optimizer: Optional[RouteOptimizer] = None
+        self.tick_durations = deque(maxlen=300)
+        self.phases = PhaseTimer(TICK_PHASE_SECONDS)
+        # Set when a new map is imported; picked up at the start of the next tick
+        self.map_reload_requested = False
+        # Nearest-bot search for assignment follows the bots as they step
+        self.bot_index = bot_index
+        # Demand-driven waiting cells for idle bots; None sends every idle bot to a station
+        self.idle_positioner: Optional[IdlePositioner] = create_idle_positioner()
+        self.idle_targets: Dict[int, Tuple[int, int]] = {}
+        # Pending orders are dispatched through it at the start of every tick
+        self.order_batcher: OrderBatcher = order_batcher
+        self.rebalancer = OrderRebalancer(settings.rebalance_min_gain, settings.rebalance_interval_ticks)
+        # Battery use per step and delivery; shared with assignment through the committed ledger
+        self.energy: EnergyModel = energy_model
+        self.charging = ChargingScheduler(
+            self.energy, settings.station_capacity, settings.charge_per_tick, settings.charge_threshold,
+            settings.charge_critical, settings.charge_peak_share
+        )
+        # Bots whose plan lost an order outside _repair_plan; their committed energy is recomputed
+        self.energy_stale: set = set()
+        # Awaited after each committed tick with every bot's core.realtime.bot_state
+        self.tick_listeners: List[Callable[[List[dict]], Awaitable[None]]] = []
     
     async def start_auto_movement(self):
         # Start automatic bot movement system
         self.is_running = True
         self._load_bot_stations()
-        print("Auto-movement system started!")
-        print(f"Found {len(self.bot_stations)} bot stations")
+        logger.info("Auto-movement system started")
+        logger.info("Found %d bot stations", len(self.bot_stations))
         
+        scheduled = time.perf_counter()
         while self.is_running:
             try:
+                started = time.perf_counter()
+                # Event loop stalls show up as a late start
+                TICK_LAG.set(max(0.0, started - scheduled))
                 await self._process_all_bots()
+                duration = time.perf_counter() - started
+                self.tick_durations.append(duration)
+                TICK_SECONDS.observe(duration)
+                if duration > self.move_interval:
+                    TICK_OVERRUNS.inc()
+                scheduled = time.perf_counter() + self.move_interval
                 await asyncio.sleep(self.move_interval)
             except Exception as e:
-                print(f"Auto-movement error: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("Auto-movement error: %s", e)
                 await asyncio.sleep(1)
     
     def stop_auto_movement(self):
@@ -43,24 +106,23 @@ class AutoMovementService:
         self.bot_returning_to_station.clear()
         self.bot_planned_routes.clear()
         self.bot_completed_waypoints.clear()
-        print("Auto-movement system stopped!")
+        logger.info("Auto-movement system stopped")
     
     def _load_bot_stations(self):
-        # Load all bot stations from database
-        db = SessionLocal()
-        try:
-            stations = db.query(Node).filter(Node.is_bot_station == True).all()
-            self.bot_stations = [(station.x, station.y, station.name) for station in stations]
-            print(f"Loaded bot stations: {[(s[0], s[1]) for s in self.bot_stations]}")
-        finally:
-            db.close()
-    
-    def _find_nearest_station(self, bot_position: Tuple[int, int], db: Session) -> Optional[Tuple[int, int]]:
+        # Load all bot stations from the configured backend
+        with open_repositories() as repos:
+            self.load_bot_stations(repos)
+    
+    def load_bot_stations(self, repos: Repositories):
+        stations = repos.nodes.list_bot_stations()
+        self.bot_stations = [(station.x, station.y, station.name) for station in stations]
+        logger.info("Loaded bot stations: %s", [(s[0], s[1]) for s in self.bot_stations])
+    
+    def _find_nearest_station(self, bot_position: Tuple[int, int], route_optimizer: RouteOptimizer) -> Optional[Tuple[int, int]]:
         # Find the nearest bot station to the given position
         if not self.bot_stations:
             return None
         
-        route_optimizer = RouteOptimizer(db)
         nearest_station = None
         min_distance = float('inf')
         
@@ -75,12 +137,11 @@ class AutoMovementService:
         
         return nearest_station
     
-    def _plan_multi_order_route(self, bot: Bot, orders: List[Order], db: Session) -> List[dict]:
+    def plan_multi_order_route(self, bot: Bot, orders: List[Order], route_optimizer: RouteOptimizer) -> List[dict]:
         # Plan optimal route for multiple orders using pickup-first strategy
         if not orders:
             return []
         
-        route_optimizer = RouteOptimizer(db)
         current_pos = (bot.current_x, bot.current_y)
         planned_waypoints = []
         
@@ -88,11 +149,11 @@ class AutoMovementService:
         pickup_orders = [o for o in orders if o.status == 'ASSIGNED']
         delivery_orders = [o for o in orders if o.status == 'PICKED_UP']
         
-        print(f"Bot {bot.id} planning route: {len(pickup_orders)} pickups, {len(delivery_orders)} deliveries")
+        logger.debug("Bot %s planning route: %d pickups, %d deliveries", bot.id, len(pickup_orders), len(delivery_orders))
         
         # Get completed waypoints for this bot
         completed = self.bot_completed_waypoints.get(bot.id, set())
-        print(f"Bot {bot.id} completed waypoints: {completed}")
+        logger.debug("Bot %s completed waypoints: %s", bot.id, completed)
         
         # First Phase: Add all remaining pickups
         remaining_pickups = pickup_orders.copy()
@@ -106,7 +167,7 @@ class AutoMovementService:
                 
                 # Skip if already completed
                 if waypoint_key in completed:
-                    print(f"Skipping completed pickup: {waypoint_key}")
+                    logger.debug("Skipping completed pickup: %s", waypoint_key)
                     continue
                 
                 path = route_optimizer.dijkstra(current_pos, pickup_pos)
@@ -122,16 +183,9 @@ class AutoMovementService:
                 
                 # Only add if not completed
                 if waypoint_key not in completed:
-                    planned_waypoints.append({
-                        'position': pickup_pos,
-                        'type': 'pickup',
-                        'order_id': nearest_order.id,
-                        'restaurant_type': nearest_order.restaurant_type,
-                        'customer_name': nearest_order.customer_name,
-                        'waypoint_key': waypoint_key
-                    })
+                    planned_waypoints.append(self._pickup_waypoint(nearest_order))
                     current_pos = pickup_pos
-                    print(f" Added pickup waypoint: {waypoint_key}")
+                    logger.debug("Added pickup waypoint: %s", waypoint_key)
                 
                 remaining_pickups.remove(nearest_order)
             else:
@@ -151,7 +205,7 @@ class AutoMovementService:
                 
                 # Skip if already completed
                 if waypoint_key in completed:
-                    print(f"Skipping completed delivery: {waypoint_key}")
+                    logger.debug("Skipping completed delivery: %s", waypoint_key)
                     continue
                 
                 # Check if pickup is completed for this order (CRITICAL FIX)
@@ -159,7 +213,7 @@ class AutoMovementService:
                 
                 # For ASSIGNED orders, pickup must be completed OR order status must be PICKED_UP
                 if order.status == 'ASSIGNED' and pickup_key not in completed:
-                    print(f"Skipping delivery {waypoint_key}, pickup {pickup_key} not completed yet")
+                    logger.debug("Skipping delivery %s, pickup %s not completed yet", waypoint_key, pickup_key)
                     continue  # Pickup not done yet
                 
                 path = route_optimizer.dijkstra(current_pos, delivery_pos)
@@ -175,119 +229,323 @@ class AutoMovementService:
                 
                 # Only add if not completed
                 if waypoint_key not in completed:
-                    planned_waypoints.append({
-                        'position': delivery_pos,
-                        'type': 'delivery',
-                        'order_id': nearest_order.id,
-                        'customer_name': nearest_order.customer_name,
-                        'waypoint_key': waypoint_key
-                    })
+                    planned_waypoints.append(self._delivery_waypoint(nearest_order))
                     current_pos = delivery_pos
-                    print(f"Added delivery waypoint: {waypoint_key}")
+                    logger.debug("Added delivery waypoint: %s", waypoint_key)
                 
                 remaining_deliveries.remove(nearest_order)
             else:
                 break  
         
-        print(f"Bot {bot.id} final plan: {len(planned_waypoints)} waypoints")
+        logger.debug("Bot %s final plan: %d waypoints", bot.id, len(planned_waypoints))
         return planned_waypoints
     
     async def _process_all_bots(self):
         # Process movement for all active bots
-        db = SessionLocal()
-        try:
+        with open_repositories() as repos:
+            await self.process_tick(repos)
+    
+    async def process_tick(self, repos: Repositories):
+        # Advance every bot one step and commit the unit of work
+        with self.phases.phase("load"):
+            if self.map_reload_requested:
+                self._reload_map(repos)
+            route_optimizer = self.route_optimizer or RouteOptimizer(repos)
+        
+        # Dispatch and rebalance commit, so they run before the bots are loaded (a commit expires them)
+        with self.phases.phase("dispatch"):
+            self._dispatch_pending_orders(repos, route_optimizer)
+        
+        if self.rebalancer.due():
+            with self.phases.phase("rebalance"):
+                self.rebalance_assigned_orders(repos, route_optimizer)
+        
+        with self.phases.phase("load"):
             # Get all bots (including idle ones that might need to return to station)
-            all_bots = db.query(Bot).all()
-            
-            for bot in all_bots:
-                await self._process_single_bot(bot, db)
-            
-            db.commit()
-        finally:
-            db.close()
+            bots = repos.bots.list_all()
+        
+        with self.phases.phase("charge"):
+            # Peak: orders waiting, or no charged bot idle to take the next one
+            peak = repos.orders.count_by_status(('PENDING',)) > 0 or not any(
+                bot.status == 'IDLE' and not bot.current_orders and bot.battery_level >= self.charging.threshold
+                for bot in bots
+            )
+            self.charging.update(bots, [(x, y) for x, y, _ in self.bot_stations], peak, route_optimizer)
+            BOTS_CHARGING.set(sum(1 for bot in bots if bot.status == 'CHARGING'))
+        
+        if self.idle_positioner:
+            with self.phases.phase("position"):
+                idle = [bot for bot in bots if bot.current_orders == 0 and bot.status not in ('MAINTENANCE', 'CHARGING')]
+                self.idle_targets = self.idle_positioner.plan(idle, repos.now(), route_optimizer)
+        
+        active = 0
+        for bot in bots:
+            active += await self._process_single_bot(bot, repos, route_optimizer)
+        
+        # Plain values: committed ORM rows are expired and would reload one query per bot
+        states = [bot_state(bot) for bot in bots] if self.tick_listeners else None
+        
+        with self.phases.phase("persist"):
+            repos.commit()
+        
+        if states is not None:
+            with self.phases.phase("publish"):
+                for listener in self.tick_listeners:
+                    try:
+                        await listener(states)
+                    except Exception:
+                        # A failing subscriber must not stall movement
+                        logger.exception("Tick listener %r failed", listener)
+        
+        self.phases.observe()
+        BOTS_ACTIVE.set(active)
     
-    async def _process_single_bot(self, bot: Bot, db: Session):
-        # Process movement for a single bot
+    def _dispatch_pending_orders(self, repos: Repositories, route_optimizer: RouteOptimizer):
+        # Assigns held batches once their window runs out, and retries orders no bot could take
+        pending = repos.orders.list_by_status(('PENDING',))
+        if pending:
+            BotManager(repos, route_optimizer, self.bot_index, self.order_batcher, self.energy).assign_orders_to_best_bots(
+                pending, hold=True
+            )
+    
+    def rebalance_assigned_orders(self, repos: Repositories, route_optimizer: RouteOptimizer) -> List[dict]:
+        """Move not-yet-picked-up orders to bots that reach them sooner, in the DB and in the plans"""
+        bots = {bot.id: bot for bot in repos.bots.list_all()}
+        orders = {order.id: order for order in repos.orders.list_by_status(('ASSIGNED',))}
+        transfers = self.rebalancer.find_transfers(
+            bots, list(orders.values()), self.bot_planned_routes, route_optimizer, self.bot_index, self.energy
+        )
+        if not transfers:
+            return []
+        
+        waypoints = {}
+        for transfer in transfers:
+            order, source, target = orders[transfer.order_id], bots[transfer.from_bot_id], bots[transfer.to_bot_id]
+            order.bot_id = target.id
+            order.estimated_distance = order.estimated_time = int(transfer.arrival)
+            source.current_orders -= 1
+            if source.current_orders == 0:
+                source.status = 'IDLE'
+            target.current_orders += 1
+            target.status = 'BUSY'
+            waypoints[order.id] = self._pickup_waypoint(order)
+        # All transfers land together or none do; plans and energy follow only a successful commit
+        repos.commit()
+        
+        for transfer in transfers:
+            self.energy.commit(transfer.to_bot_id, transfer.energy)
+            self.drop_order_from_plan(transfer.order_id, transfer.from_bot_id)
+            plan = self.bot_planned_routes.get(transfer.to_bot_id)
+            if plan is not None:
+                plan.insert(min(transfer.index, len(plan)), waypoints[transfer.order_id])
+                self.energy_stale.add(transfer.to_bot_id)
+            logger.info("Order %s moved from bot %s to bot %s (gain: %s steps)", transfer.order_id,
+                        transfer.from_bot_id, transfer.to_bot_id, transfer.gain,
+                        extra={"order_id": transfer.order_id, "bot_id": transfer.to_bot_id})
+        ORDERS_TRANSFERRED.inc(len(transfers))
+        return [
+            {"order_id": t.order_id, "from_bot_id": t.from_bot_id, "to_bot_id": t.to_bot_id, "gain": t.gain}
+            for t in transfers
+        ]
+    
+    async def _process_single_bot(self, bot: Bot, repos: Repositories, route_optimizer: RouteOptimizer) -> bool:
+        # Process movement for a single bot, True if it has orders
         # Get bot's current orders
-        orders = db.query(Order).filter(
-            Order.bot_id == bot.id,
-            Order.status.in_(['ASSIGNED', 'PICKED_UP'])
-        ).order_by(Order.created_at).all()
+        with self.phases.phase("load"):
+            orders = repos.orders.list_in_progress_for_bot(bot.id)
         
-        print(f"Processing Bot {bot.id} at ({bot.current_x},{bot.current_y}) - {len(orders)} orders")
+        logger.debug("Processing Bot %s at (%s,%s) - %d orders", bot.id, bot.current_x, bot.current_y, len(orders))
         
         # If bot has orders, handle delivery tasks
         if orders:
             self.bot_returning_to_station[bot.id] = False
-            await self._move_bot_with_multi_order_plan(bot, orders, db)
+            await self._move_bot_with_multi_order_plan(bot, orders, repos, route_optimizer)
+        elif bot.status == 'CHARGING':
+            await self._move_to_charger(bot, repos, route_optimizer)
         else:
             # No orders - clear completed waypoints and check if bot needs to return to station
             self.bot_completed_waypoints[bot.id] = set()
-            await self._handle_idle_bot(bot, db)
+            await self._handle_idle_bot(bot, repos, route_optimizer)
+        return bool(orders)
     
-    async def _move_bot_with_multi_order_plan(self, bot: Bot, orders: List[Order], db: Session):
+    async def _move_bot_with_multi_order_plan(self, bot: Bot, orders: List[Order], repos: Repositories,
+                                              route_optimizer: RouteOptimizer):
         # Move bot according to multi-order plan
         bot_id = bot.id
         
-        # ALWAYS recalculate plan to ensure we have current state
-        print(f"Bot {bot_id} recalculating multi-order plan")
-        new_plan = self._plan_multi_order_route(bot, orders, db)
-        self.bot_planned_routes[bot_id] = new_plan
+        # Plans persist across ticks; only the waypoints whose orders changed are edited
+        with self.phases.phase("plan"):
+            new_plan = self._repair_plan(bot, orders, route_optimizer)
         
-        # Clear current route to force recalculation
-        self._clear_bot_route(bot_id)
+        if not new_plan:
+            logger.debug("Bot %s has no waypoints to plan", bot_id)
+            return
         
-        if new_plan:
-            print(f"🗺️ Bot {bot_id} multi-order plan:")
+        if logger.isEnabledFor(logging.DEBUG):
+            completed = self.bot_completed_waypoints.get(bot_id, set())
             for i, waypoint in enumerate(new_plan):
-                completed = self.bot_completed_waypoints.get(bot_id, set())
-                status = "OK" if waypoint['waypoint_key'] in completed else "⏳"
-                print(f"   {i+1}. {status} {waypoint['type'].upper()} at {waypoint['position']} (Order #{waypoint['order_id']})")
-        else:
-            print(f"Failed Bot {bot_id} has no waypoints to plan")
-            return
+                status = "OK" if waypoint['waypoint_key'] in completed else "pending"
+                logger.debug("Bot %s plan %d. %s %s at %s (Order #%s)", bot_id, i + 1, status,
+                             waypoint['type'].upper(), waypoint['position'], waypoint['order_id'])
         
         # Get next destination from plan
-        next_destination = self._get_next_destination_from_plan(bot, db)
+        with self.phases.phase("plan"):
+            next_destination = self._get_next_destination_from_plan(bot, repos)
         if not next_destination:
-            print(f"Failed Bot {bot_id} has no more destinations")
+            logger.debug("Bot %s has no more destinations", bot_id)
             return
         
-        print(f"Bot {bot_id} next destination: {next_destination}")
+        logger.debug("Bot %s next destination: %s", bot_id, next_destination)
+        
+        # Already standing on the waypoint (e.g. second order from the same
+        # restaurant): handle it now instead of waiting for a route to form
+        if next_destination == (bot.current_x, bot.current_y):
+            with self.phases.phase("move"):
+                await self._handle_destination_reached(bot, repos)
+            return
         
         # Calculate or get cached route to next destination
-        route = await self._get_or_calculate_route(bot, next_destination, db, "multi_order")
+        with self.phases.phase("route"):
+            route = await self._get_or_calculate_route(bot, next_destination, route_optimizer, "multi_order")
         if not route or len(route) <= 1:
-            print(f"Bot {bot_id} no valid route to {next_destination}")
+            logger.debug("Bot %s no valid route to %s", bot_id, next_destination, extra={"bot_id": bot_id})
             return
         
         # Move bot one step along the route
-        await self._execute_next_move(bot, route, db)
+        with self.phases.phase("move"):
+            await self._execute_next_move(bot, route, repos)
+    
+    def _repair_plan(self, bot: Bot, orders: List[Order], route_optimizer: RouteOptimizer) -> List[dict]:
+        """Bring the bot's plan in line with its orders: drop dead waypoints, insert new ones"""
+        plan = self.bot_planned_routes.get(bot.id)
+        if plan is None:
+            plan = self.plan_multi_order_route(bot, orders, route_optimizer)
+            ROUTE_REPLANS.inc()
+            self.bot_planned_routes[bot.id] = plan
+            self._commit_plan_energy(bot, plan, orders, LegDistances(route_optimizer))
+            return plan
+        
+        completed = self.bot_completed_waypoints.get(bot.id, set())
+        live = {order.id: order for order in orders}
+        
+        # Done, cancelled or reassigned; a pickup is also dead once the order is on board
+        kept = [
+            waypoint for waypoint in plan
+            if waypoint['order_id'] in live and waypoint['waypoint_key'] not in completed
+            and (waypoint['type'] == 'delivery' or live[waypoint['order_id']].status == 'ASSIGNED')
+        ]
+        removed = len(plan) - len(kept)
+        
+        planned = {(waypoint['type'], waypoint['order_id']) for waypoint in kept}
+        distance = LegDistances(route_optimizer)
+        inserted = 0
+        for order in orders:
+            picked_up = (order.status == 'PICKED_UP'
+                         or f"pickup_{order.id}_{order.pickup_x}_{order.pickup_y}" in completed)
+            if ('delivery' if picked_up else 'pickup', order.id) in planned:
+                continue
+            # Cheapest insertion anywhere: deliveries only enter once picked up, so precedence
+            # holds and a carried order no longer waits behind every new pickup
+            waypoint = self._delivery_waypoint(order) if picked_up else self._pickup_waypoint(order)
+            index, _ = cheapest_insertion(kept, (bot.current_x, bot.current_y), waypoint['position'], distance)
+            kept.insert(index, waypoint)
+            inserted += 1
+        
+        if removed or inserted:
+            PLAN_REPAIRS.inc(removed + inserted)
+            logger.debug("Bot %s plan repaired: %d waypoints removed, %d inserted", bot.id, removed, inserted)
+        self.bot_planned_routes[bot.id] = kept
+        if removed or inserted or bot.id in self.energy_stale or bot.id not in self.energy.committed:
+            self._commit_plan_energy(bot, kept, orders, distance)
+        return kept
+    
+    def _commit_plan_energy(self, bot: Bot, plan: List[dict], orders: List[Order], distance: LegDistances):
+        # Battery the plan still needs: its legs, the delivery leg of every order still to be
+        # picked up, the drop-offs, then the way to a station
+        self.energy_stale.discard(bot.id)
+        steps, end = 0.0, (bot.current_x, bot.current_y)
+        if plan:
+            steps = arrival(plan, end, len(plan) - 1, distance)
+            end = plan[-1]['position']
+        by_id = {order.id: order for order in orders}
+        for waypoint in plan:
+            order = by_id.get(waypoint['order_id'])
+            if waypoint['type'] == 'pickup' and order:
+                steps += distance(waypoint['position'], (order.delivery_x, order.delivery_y))
+        steps += station_distance(end, [(x, y) for x, y, _ in self.bot_stations], distance)
+        self.energy.committed[bot.id] = self.energy.cost(steps, len(orders))
+    
+    @staticmethod
+    def _pickup_waypoint(order: Order) -> dict:
+        return {
+            'position': (order.pickup_x, order.pickup_y),
+            'type': 'pickup',
+            'order_id': order.id,
+            'restaurant_type': order.restaurant_type,
+            'customer_name': order.customer_name,
+            'waypoint_key': f"pickup_{order.id}_{order.pickup_x}_{order.pickup_y}"
+        }
+    
+    @staticmethod
+    def _delivery_waypoint(order: Order) -> dict:
+        return {
+            'position': (order.delivery_x, order.delivery_y),
+            'type': 'delivery',
+            'order_id': order.id,
+            'customer_name': order.customer_name,
+            'waypoint_key': f"delivery_{order.id}_{order.delivery_x}_{order.delivery_y}"
+        }
     
-    def _get_next_destination_from_plan(self, bot: Bot, db: Session) -> Optional[Tuple[int, int]]:
+    def drop_order_from_plan(self, order_id: int, bot_id: Optional[int]):
+        """
+        ORDER_CHANGED handler: take the order's waypoints out of the bot's plan right away, and
+        drop the current leg if it was heading for one of them. Anything the order still needs
+        (it may only have moved) is inserted again on the bot's next tick.
+        """
+        plan = self.bot_planned_routes.get(bot_id)
+        if not plan:
+            return
+        kept = [waypoint for waypoint in plan if waypoint['order_id'] != order_id]
+        if len(kept) == len(plan):
+            return
+        
+        # The current leg leads nowhere useful any more: reroute on the next move
+        route = self.bot_routes.get(bot_id)
+        if route and all(waypoint['position'] != route[-1] for waypoint in kept):
+            self._clear_bot_route(bot_id)
+        
+        completed = self.bot_completed_waypoints.get(bot_id)
+        if completed:
+            completed -= {key for key in completed if key.startswith((f"pickup_{order_id}_", f"delivery_{order_id}_"))}
+        self.bot_planned_routes[bot_id] = kept
+        self.energy_stale.add(bot_id)
+        PLAN_REPAIRS.inc(len(plan) - len(kept))
+        logger.debug("Bot %s dropped order %s from its plan", bot_id, order_id, extra={"bot_id": bot_id, "order_id": order_id})
+    
+    def _get_next_destination_from_plan(self, bot: Bot, repos: Repositories) -> Optional[Tuple[int, int]]:
         # Get next destination from planned route 
         bot_id = bot.id
         
         if bot_id not in self.bot_planned_routes or not self.bot_planned_routes[bot_id]:
-            print(f"Bot {bot_id} has no planned routes")
+            logger.debug("Bot %s has no planned routes", bot_id)
             return None
         
         current_pos = (bot.current_x, bot.current_y)
         completed = self.bot_completed_waypoints.get(bot_id, set())
         
-        print(f"Bot {bot_id} searching next destination from {len(self.bot_planned_routes[bot_id])} waypoints")
-        print(f"Bot {bot_id} completed waypoints: {completed}")
+        logger.debug("Bot %s searching next destination from %d waypoints, completed: %s",
+                     bot_id, len(self.bot_planned_routes[bot_id]), completed)
         
         # Find next unvisited waypoint
         for i, waypoint in enumerate(self.bot_planned_routes[bot_id]):
             waypoint_key = waypoint['waypoint_key']
             waypoint_pos = waypoint['position']
             
-            print(f"Checking waypoint {i+1}: {waypoint_key} at {waypoint_pos}")
+            logger.debug("Checking waypoint %d: %s at %s", i + 1, waypoint_key, waypoint_pos)
             
             # Skip if already completed
             if waypoint_key in completed:
-                print(f" Skipping completed waypoint: {waypoint_key}")
+                logger.debug("Skipping completed waypoint: %s", waypoint_key)
                 continue
             
             # For delivery waypoints, check if pickup is completed
@@ -295,7 +553,7 @@ class AutoMovementService:
                 pickup_key = f"pickup_{waypoint['order_id']}_{waypoint_pos[0]}_{waypoint_pos[1]}"
                 
                 # Get the actual pickup coordinates from the order
-                order = db.query(Order).filter(Order.id == waypoint['order_id']).first()
+                order = repos.orders.get(waypoint['order_id'])
                 if order:
                     # Use actual pickup coordinates from order
                     actual_pickup_key = f"pickup_{order.id}_{order.pickup_x}_{order.pickup_y}"
@@ -304,15 +562,16 @@ class AutoMovementService:
                     pickup_completed = (actual_pickup_key in completed) or (order.status == 'PICKED_UP')
                     
                     if not pickup_completed:
-                        print(f"Skipping delivery {waypoint_key}, pickup {actual_pickup_key} not completed yet (order status: {order.status})")
+                        logger.debug("Skipping delivery %s, pickup %s not completed yet (order status: %s)",
+                                     waypoint_key, actual_pickup_key, order.status)
                         continue  # Pickup not done yet
                     else:
-                        print(f" Pickup completed for delivery {waypoint_key}")
+                        logger.debug("Pickup completed for delivery %s", waypoint_key)
             
-            print(f"Next destination found: {waypoint_pos} (waypoint: {waypoint_key})")
+            logger.debug("Next destination found: %s (waypoint: %s)", waypoint_pos, waypoint_key)
             return waypoint_pos
         
-        print(f" No valid next destination found for Bot {bot_id}")
+        logger.debug("No valid next destination found for Bot %s", bot_id)
         return None
     
     def _mark_waypoint_completed(self, bot: Bot, position: Tuple[int, int], waypoint_type: str, order_id: int):
@@ -324,16 +583,20 @@ class AutoMovementService:
             self.bot_completed_waypoints[bot_id] = set()
         
         self.bot_completed_waypoints[bot_id].add(waypoint_key)
-        print(f"ot {bot_id} completed waypoint: {waypoint_key}")
+        logger.debug("Bot %s completed waypoint: %s", bot_id, waypoint_key)
         
         # Clear the current route to force recalculation on next move
         self._clear_bot_route(bot_id)
-        print(f"Bot {bot_id} cleared route cache after waypoint completion")
     
-    async def _handle_idle_bot(self, bot: Bot, db: Session):
-        """Handle bot that has no orders - return to nearest station"""
+    async def _handle_idle_bot(self, bot: Bot, repos: Repositories, route_optimizer: RouteOptimizer):
+        """Handle bot that has no orders - wait where demand is expected, else return to nearest station"""
         current_pos = (bot.current_x, bot.current_y)
         
+        waiting_cell = self.idle_targets.get(bot.id)
+        if waiting_cell:
+            await self._move_to_waiting_cell(bot, waiting_cell, repos, route_optimizer)
+            return
+        
         # Check if bot is already at a station
         if self._is_at_bot_station(current_pos):
             bot.status = 'IDLE'
@@ -343,32 +606,75 @@ class AutoMovementService:
         
         # If not returning to station yet, start the return journey
         if not self.bot_returning_to_station.get(bot.id, False):
-            nearest_station = self._find_nearest_station(current_pos, db)
+            with self.phases.phase("route"):
+                nearest_station = self._find_nearest_station(current_pos, route_optimizer)
             if nearest_station:
                 self.bot_returning_to_station[bot.id] = True
-                print(f"Bot {bot.id} starting return to station {nearest_station}")
+                logger.debug("Bot %s starting return to station %s", bot.id, nearest_station)
         
         # Move towards station if returning
         if self.bot_returning_to_station.get(bot.id, False):
-            nearest_station = self._find_nearest_station(current_pos, db)
+            with self.phases.phase("route"):
+                nearest_station = self._find_nearest_station(current_pos, route_optimizer)
             if nearest_station:
-                route = await self._get_or_calculate_route(bot, nearest_station, db, "station")
+                with self.phases.phase("route"):
+                    route = await self._get_or_calculate_route(bot, nearest_station, route_optimizer, "station")
                 if route and len(route) > 1:
-                    await self._execute_next_move(bot, route, db)
+                    with self.phases.phase("move"):
+                        await self._execute_next_move(bot, route, repos)
                     
                     # Check if reached station
                     if (bot.current_x, bot.current_y) == nearest_station:
-                        print(f"Bot {bot.id} returned to station {nearest_station}")
+                        logger.info("Bot %s returned to station %s", bot.id, nearest_station, extra={"bot_id": bot.id})
                         bot.status = 'IDLE'
-                        bot.battery_level = min(100, bot.battery_level + 10)
                         self.bot_returning_to_station[bot.id] = False
                         self._clear_bot_route(bot.id)
     
+    async def _move_to_waiting_cell(self, bot: Bot, waiting_cell: Tuple[int, int], repos: Repositories,
+                                    route_optimizer: RouteOptimizer):
+        """Step an idle bot towards the waiting cell the positioner gave it"""
+        bot.status = 'IDLE'
+        self.bot_returning_to_station[bot.id] = False
+        if (bot.current_x, bot.current_y) == waiting_cell:
+            self._clear_bot_route(bot.id)
+            return
+        
+        with self.phases.phase("route"):
+            route = await self._get_or_calculate_route(bot, waiting_cell, route_optimizer, "waiting")
+        if route and len(route) > 1:
+            with self.phases.phase("move"):
+                await self._execute_next_move(bot, route, repos)
+    
+    async def _move_to_charger(self, bot: Bot, repos: Repositories, route_optimizer: RouteOptimizer):
+        """Step a CHARGING bot to the station the scheduler gave it; it charges or queues there"""
+        self.bot_returning_to_station[bot.id] = False
+        station = self.charging.station_for(bot.id)
+        if station is None or (bot.current_x, bot.current_y) == station:
+            self._clear_bot_route(bot.id)
+            return
+        
+        with self.phases.phase("route"):
+            route = await self._get_or_calculate_route(bot, station, route_optimizer, "charging")
+        if route and len(route) > 1:
+            with self.phases.phase("move"):
+                await self._execute_next_move(bot, route, repos)
+    
+    def request_map_reload(self):
+        # Safe to call from any thread; the movement loop does the actual reload
+        self.map_reload_requested = True
+    
+    def _reload_map(self, repos: Repositories):
+        # Stations may have moved and cached routes may cross newly blocked edges
+        self.map_reload_requested = False
+        self.load_bot_stations(repos)
+        self.bot_routes.clear()
+        self.bot_route_index.clear()
+    
     def _is_at_bot_station(self, position: Tuple[int, int]) -> bool:
         """Check if position is at a bot station"""
         return any(position == (station[0], station[1]) for station in self.bot_stations)
     
-    async def _get_or_calculate_route(self, bot: Bot, destination: Tuple[int, int], db: Session, route_type: str = "delivery") -> List[Tuple[int, int]]:
+    async def _get_or_calculate_route(self, bot: Bot, destination: Tuple[int, int], route_optimizer: RouteOptimizer, route_type: str = "delivery") -> List[Tuple[int, int]]:
         """Get cached route or calculate new one"""
         bot_id = bot.id
         current_pos = (bot.current_x, bot.current_y)
@@ -387,32 +693,35 @@ class AutoMovementService:
         
         if needs_new_route:
             # Calculate new route
-            route_optimizer = RouteOptimizer(db)
             new_route = route_optimizer.dijkstra(current_pos, destination)
             
             if new_route:
                 self.bot_routes[bot_id] = new_route
                 self.bot_route_index[bot_id] = 0
+                self.unroutable.pop(bot_id, None)
                 
-                if route_type == "station":
-                    print(f"Bot {bot_id} new route to station: {current_pos} → {destination} ({len(new_route)-1} steps)")
-                else:
-                    print(f"Bot {bot_id} new route to waypoint: {current_pos} → {destination} ({len(new_route)-1} steps)")
+                logger.debug("Bot %s new route to %s: %s -> %s (%d steps)",
+                             bot_id, route_type, current_pos, destination, len(new_route) - 1)
             else:
-                print(f"No route found for Bot {bot_id} from {current_pos} to {destination}")
+                # Retried every tick; warn once per destination, not once per tick
+                if self.unroutable.get(bot_id) != destination:
+                    self.unroutable[bot_id] = destination
+                    logger.warning("No route found for Bot %s from %s to %s", bot_id, current_pos, destination, extra={"bot_id": bot_id})
                 return []
+        else:
+            ROUTE_CACHE_HITS.inc()
         
         return self.bot_routes.get(bot_id, [])
     
-    async def _execute_next_move(self, bot: Bot, route: List[Tuple[int, int]], db: Session):
+    async def _execute_next_move(self, bot: Bot, route: List[Tuple[int, int]], repos: Repositories):
         """Move bot to next position in route"""
         bot_id = bot.id
         current_index = self.bot_route_index.get(bot_id, 0)
         
         # Check if at destination
         if current_index >= len(route) - 1:
-            print(f"Bot {bot_id} reached destination!")
-            await self._handle_destination_reached(bot, db)
+            logger.debug("Bot %s reached destination", bot_id)
+            await self._handle_destination_reached(bot, repos)
             self._clear_bot_route(bot_id)
             return
         
@@ -422,81 +731,72 @@ class AutoMovementService:
         
         old_pos = (bot.current_x, bot.current_y)
         bot.current_x, bot.current_y = next_position[0], next_position[1]
+        self.bot_index.update(bot)
+        self.energy.spend(bot, self.energy.cost(1))
         self.bot_route_index[bot_id] = next_index
         
-        # Show current orders in movement log
-        orders_info = f"({bot.current_orders} orders)"
-        
-        if self.bot_returning_to_station.get(bot_id, False):
-            print(f"Bot {bot_id}: {old_pos} → ({bot.current_x},{bot.current_y}) [returning to station {next_index}/{len(route)-1}]")
-        else:
-            print(f"Bot {bot_id}: {old_pos} → ({bot.current_x},{bot.current_y}) [multi-order {next_index}/{len(route)-1}] {orders_info}")
+        logger.debug("Bot %s: %s -> %s [%s %d/%d] (%s orders)", bot_id, old_pos, next_position,
+                     "returning to station" if self.bot_returning_to_station.get(bot_id, False) else "multi-order",
+                     next_index, len(route) - 1, bot.current_orders)
         
         # Check if reached pickup/delivery location
-        await self._check_location_events(bot, db)
+        await self._check_location_events(bot, repos)
     
-    async def _handle_destination_reached(self, bot: Bot, db: Session):
+    async def _handle_destination_reached(self, bot: Bot, repos: Repositories):
         """Handle when bot reaches its destination"""
         current_pos = (bot.current_x, bot.current_y)
         
-        print(f"Bot {bot.id} handling destination reached at {current_pos}")
+        logger.debug("Bot %s handling destination reached at %s", bot.id, current_pos)
         
         # Check if reached a bot station
         if self._is_at_bot_station(current_pos):
             if self.bot_returning_to_station.get(bot.id, False):
-                print(f"Bot {bot.id} arrived at station {current_pos}")
+                logger.info("Bot %s arrived at station %s", bot.id, current_pos, extra={"bot_id": bot.id})
                 bot.status = 'IDLE'
-                bot.battery_level = min(100, bot.battery_level + 20)
                 self.bot_returning_to_station[bot.id] = False
                 self._clear_planned_route(bot.id)
                 return
         
         # Check orders at this location
-        orders = db.query(Order).filter(
-            Order.bot_id == bot.id,
-            Order.status.in_(['ASSIGNED', 'PICKED_UP'])
-        ).all()
+        orders = repos.orders.list_in_progress_for_bot(bot.id)
         
-        print(f"Bot {bot.id} checking {len(orders)} orders at {current_pos}")
+        logger.debug("Bot %s checking %d orders at %s", bot.id, len(orders), current_pos)
         
+        # Every order due here is handled in this stop: a batch from one restaurant is loaded
+        # together, and orders for the same house are dropped off together
+        delivered = 0
         for order in orders:
             # Check if this is a pickup location
             if (order.status == 'ASSIGNED' and 
                 current_pos == (order.pickup_x, order.pickup_y)):
                 
-                print(f"Bot {bot.id} executing pickup for order {order.id}")
-                order.status = 'PICKED_UP'
+                set_order_status(order, 'PICKED_UP', repos.now())
                 self._mark_waypoint_completed(bot, current_pos, "pickup", order.id)
-                print(f"Bot {bot.id} picked up order {order.id} at {current_pos} [total: {bot.current_orders} orders]")
-                break
+                logger.info("Bot %s picked up order %s at %s [total: %s orders]", bot.id, order.id, current_pos,
+                            bot.current_orders, extra={"bot_id": bot.id, "order_id": order.id})
             
             # Check if this is a delivery location
             elif (order.status == 'PICKED_UP' and 
                 current_pos == (order.delivery_x, order.delivery_y)):
                 
-                print(f"Bot {bot.id} executing delivery for order {order.id}")
-                order.status = 'DELIVERED'
+                set_order_status(order, 'DELIVERED', repos.now())
                 bot.current_orders -= 1
-                bot.battery_level = max(1, bot.battery_level - 5)
+                self.energy.spend(bot, self.energy.cost(0, deliveries=1))
                 self._mark_waypoint_completed(bot, current_pos, "delivery", order.id)
+                delivered += 1
                 
-                print(f"Bot {bot.id} delivered order {order.id} at {current_pos} [remaining: {bot.current_orders} orders]")
-                
-                # Check if all orders are completed
-                remaining_orders = db.query(Order).filter(
-                    Order.bot_id == bot.id,
-                    Order.status.in_(['ASSIGNED', 'PICKED_UP'])
-                ).count()
-                
-                if remaining_orders == 0:
-                    bot.status = 'IDLE'
-                    self._clear_planned_route(bot.id)
-                    print(f"Bot {bot.id} completed all orders, will return to station")
-                break
+                logger.info("Bot %s delivered order %s at %s [remaining: %s orders]", bot.id, order.id, current_pos,
+                            bot.current_orders, extra={"bot_id": bot.id, "order_id": order.id})
+        
+        # Check if all orders are completed
+        if delivered and repos.orders.count_in_progress_for_bot(bot.id) == 0:
+            bot.status = 'IDLE'
+            self._clear_planned_route(bot.id)
+            logger.debug("Bot %s completed all orders, will return to station", bot.id)
     
-    async def _check_location_events(self, bot: Bot, db: Session):
+    async def _check_location_events(self, bot: Bot, repos: Repositories):
         """Check if bot has reached any significant locations"""
-        await self._handle_destination_reached(bot, db)
+        await self._handle_destination_reached(bot, repos)
     
     def _clear_bot_route(self, bot_id: int):
         """Clear cached route for a bot"""
@@ -511,6 +811,7 @@ class AutoMovementService:
             del self.bot_planned_routes[bot_id]
         if bot_id in self.bot_completed_waypoints:
             del self.bot_completed_waypoints[bot_id]
+        self.energy.forget(bot_id)
         self._clear_bot_route(bot_id)
     
     def get_bot_progress(self, bot_id: int) -> Dict:
@@ -552,16 +853,28 @@ class AutoMovementService:
         
         return progress
     
+    def get_tick_stats(self) -> Dict:
+        """Duration of recent movement ticks, in milliseconds"""
+        durations = list(self.tick_durations)
+        if not durations:
+            return {"samples": 0, "last_ms": None, "avg_ms": None, "max_ms": None}
+        return {
+            "samples": len(durations),
+            "last_ms": round(durations[-1] * 1000, 2),
+            "avg_ms": round(sum(durations) / len(durations) * 1000, 2),
+            "max_ms": round(max(durations) * 1000, 2)
+        }
+    
     def get_system_status(self) -> Dict:
         """Get comprehensive system status"""
-        db = SessionLocal()
-        try:
-            bots = db.query(Bot).all()
+        with open_repositories() as repos:
+            bots = repos.bots.list_all()
             
             status = {
                 "total_bots": len(bots),
                 "idle_bots": 0,
                 "busy_bots": 0,
+                "charging_bots": 0,
                 "returning_to_station": 0,
                 "at_stations": 0,
                 "bot_details": []
@@ -574,6 +887,8 @@ class AutoMovementService:
                 
                 if bot.status == 'IDLE':
                     status["idle_bots"] += 1
+                elif bot.status == 'CHARGING':
+                    status["charging_bots"] += 1
                 else:
                     status["busy_bots"] += 1
                 
@@ -595,6 +910,7 @@ class AutoMovementService:
                     "current_orders": bot.current_orders,
                     "battery_level": bot.battery_level,
                     "at_station": at_station,
+                    "charging_at": self.charging.station_for(bot.id),
                     "returning_to_station": returning,
                     "planned_waypoints": len(planned_waypoints),
                     "completed_waypoints": completed_waypoints,
@@ -602,8 +918,6 @@ class AutoMovementService:
                 })
             
             return status
-        finally:
-            db.close()
 
 
 auto_movement = AutoMovementService()
\ No newline at end of file
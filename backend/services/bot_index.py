@@ -0,0 +1,30 @@
+from typing import Hashable, Iterable, Iterator, Tuple
+from core.config import settings
+from services.spatial_index import Cell, GridBucketIndex
+
+
+class BotIndex:
+    """
+    Bot positions in grid buckets, for nearest-bot search during assignment. The movement
+    loop moves entries as bots step; sync() catches bots created or moved anywhere else.
+    """
+
+    def __init__(self, tile_size: int):
+        self.positions = GridBucketIndex(tile_size)
+
+    def update(self, bot):
+        self.positions.move(bot.id, bot.current_x, bot.current_y)
+
+    def sync(self, bots: Iterable):
+        # Cheap when the loop has kept up: unchanged entries return immediately
+        for bot in bots:
+            self.positions.move(bot.id, bot.current_x, bot.current_y)
+
+    def remove(self, bot_id: int):
+        self.positions.remove(bot_id)
+
+    def nearest(self, x: int, y: int) -> Iterator[Tuple[int, Hashable, Cell]]:
+        return self.positions.nearest(x, y)
+
+
+bot_index = BotIndex(settings.tile_size)
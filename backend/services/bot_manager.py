@@ -1,80 +1,178 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+import logging
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
 from models.bot import Bot
 from models.order import Order
+from repositories import Repositories, as_repositories
+from services.bot_index import BotIndex, bot_index
+from services.energy import EnergyModel, energy_model, station_distance
+from services.order_batcher import OrderBatcher, order_batcher
+from services.order_latency import set_order_status
+from services.plan_costs import LegDistances
 from services.route_algorithm import RouteOptimizer
 
+logger = logging.getLogger(__name__)
+
 class BotManager:
-    def __init__(self, db: Session):
-        self.db = db
-        self.route_optimizer = RouteOptimizer(db)
+    def __init__(self, db, route_optimizer: Optional[RouteOptimizer] = None, bot_positions: Optional[BotIndex] = None,
+                 batcher: Optional[OrderBatcher] = None, energy: Optional[EnergyModel] = None):
+        # db is a Session or a Repositories unit of work
+        self.repos: Repositories = as_repositories(db)
+        self.route_optimizer = route_optimizer or RouteOptimizer(self.repos)
+        self.bot_index = bot_positions or bot_index
+        self.batcher = batcher or order_batcher
+        self.energy = energy or energy_model
+        self._stations: Optional[List[Tuple[int, int]]] = None
     
     def get_available_bots(self) -> List[Bot]:
 
-        return self.db.query(Bot).filter(
-            Bot.status.in_(['IDLE', 'BUSY']),
-            Bot.current_orders < Bot.max_capacity
-        ).all()
+        return self.repos.bots.list_available()
     
     def assign_order_to_best_bot(self, order: Order) -> Optional[Bot]:
 
         available_bots = self.get_available_bots()
         
         if not available_bots:
-            print(f"No available bots for order {order.id}")
+            logger.info("No available bots for order %s", order.id, extra={"order_id": order.id})
             return None
         
+        trip = self.trip_cost([order])
+        best_bot, min_cost = self.select_best_bot(order, available_bots, trip)
+        
+        if best_bot:
+            self.apply_assignment(best_bot, order, min_cost)
+            self.energy.commit(best_bot.id, self.energy.cost(min_cost) + trip)
+            self.repos.commit()
+            logger.info("Order %s assigned to bot %s (distance: %s)", order.id, best_bot.id, min_cost,
+                        extra={"order_id": order.id, "bot_id": best_bot.id})
+        
+        return best_bot
+    
+    def assign_orders_to_best_bots(self, orders: List[Order], hold: bool = False) -> Dict[int, Optional[Bot]]:
+        # Assign a whole batch with one bot query and one commit. Same-restaurant orders with
+        # nearby deliveries go to one bot together. With hold, partial groups younger than the batch
+        # window stay PENDING, out of the result, for the next dispatch: at peak (no bot idle) to wait
+        # for more orders, otherwise only for a pending order outside this call that can join them
+
+        available_bots = self.get_available_bots()
+        if hold and not available_bots:
+            return {}
+        self.bot_index.sync(available_bots)
+        candidates = {bot.id: bot for bot in available_bots}
+        max_size = max((bot.max_capacity for bot in available_bots), default=settings.max_orders_per_bot)
+        if hold:
+            joinable = None
+            if any(bot.current_orders == 0 for bot in available_bots):
+                ids = {order.id for order in orders}
+                joinable = [order for order in self.repos.orders.list_by_status(('PENDING',)) if order.id not in ids]
+            groups, held = self.batcher.split(orders, self.repos.now(), max_size, self.route_optimizer, joinable)
+            if held:
+                logger.debug("Holding %d orders for batching", len(held))
+        else:
+            groups = self.batcher.group(orders, max_size, self.route_optimizer)
+        assignments = {}
+        
+        for group in groups:
+            # One bot for the whole group if any has room (and battery) for it, else order by order
+            trip = self.trip_cost(group)
+            best_bot, min_cost = self.select_nearest_bot(group[0], candidates, room=len(group), trip=trip)
+            if best_bot or len(group) == 1:
+                assignments.update(self._assign_group(best_bot, group, min_cost, trip, candidates))
+                continue
+            for order in group:
+                trip = self.trip_cost([order])
+                best_bot, min_cost = self.select_nearest_bot(order, candidates, trip=trip)
+                assignments.update(self._assign_group(best_bot, [order], min_cost, trip, candidates))
+        
+        self.repos.commit()
+        return assignments
+    
+    def _assign_group(self, bot: Optional[Bot], orders: List[Order], cost: float, trip: float,
+                      candidates: Dict[int, Bot]) -> Dict[int, Optional[Bot]]:
+        
+        if bot:
+            self.energy.commit(bot.id, self.energy.cost(cost) + trip)
+        for order in orders:
+            if bot:
+                self.apply_assignment(bot, order, cost)
+                logger.info("Order %s assigned to bot %s (distance: %s)", order.id, bot.id, cost,
+                        extra={"order_id": order.id, "bot_id": bot.id})
+            else:
+                logger.info("No available bots for order %s", order.id, extra={"order_id": order.id})
+        
+        if bot and bot.current_orders >= bot.max_capacity:
+            del candidates[bot.id]
+        return {order.id: bot for order in orders}
+    
+    def select_best_bot(self, order: Order, bots: List[Bot], trip: float = 0.0) -> Tuple[Optional[Bot], float]:
+
+        self.bot_index.sync(bots)
+        return self.select_nearest_bot(order, {bot.id: bot for bot in bots}, trip=trip)
+    
+    def select_nearest_bot(self, order: Order, candidates: Dict[int, Bot], room: int = 1,
+                           trip: float = 0.0) -> Tuple[Optional[Bot], float]:
+        # Candidates must be in the bot index at their current cells (sync them first);
+        # only bots with room for `room` more orders count, and only those with the battery to
+        # reach the pickup, do the `trip` from there (see trip_cost) and keep their reserve
+        
         best_bot = None
         min_cost = float('inf')
+        pickup_pos = (order.pickup_x, order.pickup_y)
         
-        for bot in available_bots:
-
-            pickup_pos = (order.pickup_x, order.pickup_y)
-            bot_pos = (bot.current_x, bot.current_y)
+        # Nearest bots first. A path is never shorter than the Manhattan distance and the cost
+        # never below the path, so once that bound passes the best cost nobody farther can win
+        for lower_bound, bot_id, bot_pos in self.bot_index.nearest(*pickup_pos):
+            if lower_bound > min_cost:
+                break
+            bot = candidates.get(bot_id)
+            if bot is None or bot.max_capacity - bot.current_orders < room:
+                continue
             
             path = self.route_optimizer.dijkstra(bot_pos, pickup_pos)
             distance = len(path) - 1 if path else float('inf')
-            
+            if not self.energy.can_take(bot, self.energy.cost(distance) + trip):
+                continue
 
             cost = distance
             if bot.status == 'BUSY':
                 cost += 2  
             
-            if cost < min_cost:
+            # Ties go to the lowest id, whatever order the index yields them in
+            if cost < min_cost or (cost == min_cost and best_bot is not None and bot.id < best_bot.id):
                 min_cost = cost
                 best_bot = bot
         
-        if best_bot:
-
-            best_bot.current_orders += 1
-            if best_bot.current_orders >= best_bot.max_capacity:
-                best_bot.status = 'BUSY'
-            else:
-                best_bot.status = 'BUSY'  
+        return best_bot, min_cost
+    
+    def trip_cost(self, orders: List[Order]) -> float:
+        # Battery for a group once its bot is at the pickup: the deliveries in turn, then the
+        # nearest station
+        if self._stations is None:
+            self._stations = [(station.x, station.y) for station in self.repos.nodes.list_bot_stations()]
+        distance = LegDistances(self.route_optimizer)
+        steps, position = 0.0, (orders[0].pickup_x, orders[0].pickup_y)
+        for order in orders:
+            steps += distance(position, (order.delivery_x, order.delivery_y))
+            position = (order.delivery_x, order.delivery_y)
+        steps += station_distance(position, self._stations, distance)
+        return self.energy.cost(steps, len(orders))
+    
+    def apply_assignment(self, bot: Bot, order: Order, cost: float):
 
-            
-            order.bot_id = best_bot.id
-            order.status = 'ASSIGNED'
-            order.estimated_distance = min_cost
-            order.estimated_time = min_cost
-            
-            self.db.commit()
-            print(f"Order {order.id} assigned to bot {best_bot.id} (distance: {min_cost})")
+        bot.current_orders += 1
+        bot.status = 'BUSY'
         
-        return best_bot
+        order.bot_id = bot.id
+        set_order_status(order, 'ASSIGNED', self.repos.now())
+        order.estimated_distance = cost
+        order.estimated_time = cost
     
     def get_bot_efficiency(self, bot: Bot) -> dict:
 
-        total_orders = self.db.query(Order).filter(Order.bot_id == bot.id).count()
-        delivered_orders = self.db.query(Order).filter(
-            Order.bot_id == bot.id,
-            Order.status == 'DELIVERED'
-        ).count()
+        total_orders = self.repos.orders.count_for_bot(bot.id)
+        delivered_orders = self.repos.orders.count_for_bot(bot.id, 'DELIVERED')
         
-        current_orders = self.db.query(Order).filter(
-            Order.bot_id == bot.id,
-            Order.status.in_(['ASSIGNED', 'PICKED_UP'])
-        ).all()
+        current_orders = self.repos.orders.list_in_progress_for_bot(bot.id)
         
         total_distance = 0
         if current_orders:
@@ -92,9 +190,9 @@ class BotManager:
         }
     
     def rebalance_orders(self) -> dict:
-        # Redistribute orders among bots for better efficiency
+        # Assign PENDING orders; ASSIGNED ones are moved by AutoMovementService.rebalance_assigned_orders
 
-        pending_orders = self.db.query(Order).filter(Order.status == 'PENDING').all()
+        pending_orders = self.repos.orders.list_by_status(('PENDING',))
         
         results = {
             "reassigned_orders": 0,
@@ -0,0 +1,104 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+from models.bot import Bot
+from services.energy import EnergyModel
+from services.plan_costs import LegDistances
+from services.route_algorithm import RouteOptimizer
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+
+
+class ChargingScheduler:
+    """
+    Decides which bots charge and where. A station has `capacity` chargers; a bot holds one
+    from the moment it is sent until it leaves, so two bots never race for the last one.
+    Bots sent while no charger is free (critical ones only) queue at the nearest station and
+    take the next charger there, lowest battery first. Bots that are charging or queued have
+    status CHARGING, which keeps them out of assignment.
+
+    Off-peak, idle bots below `threshold` charge to full. At peak (orders waiting, or no charged bot idle) charging
+    is staggered: no bot above `critical` is sent while `peak_share` of the fleet is already
+    out, and bots leave as soon as they are back above `threshold`.
+    """
+
+    def __init__(self, energy: EnergyModel, capacity: int, charge_per_tick: float, threshold: float,
+                 critical: float, peak_share: float):
+        self.energy = energy
+        self.capacity = capacity
+        self.charge_per_tick = charge_per_tick
+        self.threshold = threshold
+        self.critical = critical
+        self.peak_share = peak_share
+        # Bot id -> the station whose charger it holds / it waits at
+        self.chargers: Dict[int, Cell] = {}
+        self.queued: Dict[int, Cell] = {}
+
+    def station_for(self, bot_id: int) -> Optional[Cell]:
+        return self.chargers.get(bot_id) or self.queued.get(bot_id)
+
+    def update(self, bots: List[Bot], stations: Sequence[Cell], peak: bool, route_optimizer: RouteOptimizer):
+        """One tick: charge docked bots, release the charged ones, then send the ones that need it"""
+        by_id = {bot.id: bot for bot in bots}
+        # Orders given to a charging bot by hand win over the charge
+        for bot in bots:
+            if bot.status == 'CHARGING' and bot.current_orders:
+                bot.status = 'BUSY'
+        # Taken out of service, given work or deleted
+        for bot_id in list(self.chargers) + list(self.queued):
+            bot = by_id.get(bot_id)
+            if bot is None or bot.status != 'CHARGING':
+                self._leave(bot_id)
+
+        for bot_id, station in list(self.chargers.items()):
+            bot = by_id[bot_id]
+            if (bot.current_x, bot.current_y) == station:
+                self.energy.charge(bot, self.charge_per_tick)
+            if bot.battery_level >= 100 or (peak and bot.battery_level > self.threshold):
+                self._leave(bot_id)
+                bot.status = 'IDLE'
+                logger.info("Bot %s done charging at %s (battery: %s)", bot_id, station, bot.battery_level,
+                            extra={"bot_id": bot_id})
+
+        for bot_id, station in sorted(self.queued.items(), key=lambda item: (by_id[item[0]].battery_level, item[0])):
+            if self._free(station):
+                del self.queued[bot_id]
+                self.chargers[bot_id] = station
+
+        fleet = sum(1 for bot in bots if bot.status != 'MAINTENANCE')
+        limit = max(1, round(self.peak_share * fleet)) if peak else fleet
+        # CHARGING bots we don't track were sent before a restart
+        waiting = sorted(
+            (bot for bot in bots if bot.id not in self.chargers and bot.id not in self.queued and (
+                bot.status == 'CHARGING' or (bot.status == 'IDLE' and not bot.current_orders and bot.battery_level < self.threshold)
+            )),
+            key=lambda bot: (bot.battery_level, bot.id)
+        )
+        distance = LegDistances(route_optimizer)
+        for bot in waiting:
+            critical = bot.status == 'CHARGING' or bot.battery_level <= self.critical
+            if not critical and len(self.chargers) + len(self.queued) >= limit:
+                continue
+            position = (bot.current_x, bot.current_y)
+            reachable = sorted(
+                (distance(position, station), station) for station in stations
+                if distance(position, station) != float('inf')
+            )
+            free = next((station for _, station in reachable if self._free(station)), None)
+            if free:
+                self.chargers[bot.id] = free
+            elif critical and reachable:
+                self.queued[bot.id] = reachable[0][1]
+            else:
+                continue
+            bot.status = 'CHARGING'
+            logger.info("Bot %s sent to charge at %s (battery: %s)", bot.id, self.station_for(bot.id),
+                        bot.battery_level, extra={"bot_id": bot.id})
+
+    def _free(self, station: Cell) -> bool:
+        return sum(1 for held in self.chargers.values() if held == station) < self.capacity
+
+    def _leave(self, bot_id: int):
+        self.chargers.pop(bot_id, None)
+        self.queued.pop(bot_id, None)
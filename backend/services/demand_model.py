@@ -0,0 +1,95 @@
+import datetime
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+
+Cell = Tuple[int, int]
+
+
+def _utc(value: datetime.datetime) -> datetime.datetime:
+    # SQLite and older rows may come back naive; every stamp we write is UTC
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+class DemandModel:
+    """
+    Order demand per restaurant cell and time-of-day bucket, from order creation events.
+    Every order adds 1 to its (cell, bucket) and weights decay with `half_life`, applied
+    lazily on the next touch, so recording is O(1) and old days fade without a sweep.
+    """
+
+    def __init__(self, half_life: datetime.timedelta, bucket_minutes: int = 60):
+        self.half_life = half_life.total_seconds()
+        self.bucket_minutes = bucket_minutes
+        self.buckets_per_day = (24 * 60) // bucket_minutes
+        self._lock = threading.Lock()
+        # (cell, bucket) -> (weight, as of this timestamp)
+        self._weights: Dict[Tuple[Cell, int], Tuple[float, float]] = {}
+        self.recorded = 0
+
+    def bucket(self, at: datetime.datetime) -> int:
+        at = _utc(at)
+        return (at.hour * 60 + at.minute) // self.bucket_minutes
+
+    def _decayed(self, weight: float, since: float, now: float) -> float:
+        return weight * math.exp2(-max(0.0, now - since) / self.half_life)
+
+    def record(self, cell: Cell, at: datetime.datetime, count: int = 1):
+        key = (cell, self.bucket(at))
+        now = _utc(at).timestamp()
+        with self._lock:
+            weight, since = self._weights.get(key, (0.0, now))
+            # Orders replayed out of order (warm start) decay forward to the newest stamp
+            if now >= since:
+                self._weights[key] = (self._decayed(weight, since, now) + count, now)
+            else:
+                self._weights[key] = (weight + self._decayed(count, now, since), since)
+            self.recorded += count
+
+    def load(self, repos, since: datetime.datetime, batch_size: int = 1000):
+        """Warm start from stored orders created at or after since, live and archived"""
+        for archived in (True, False):
+            for batch in repos.orders.stream(
+                ["pickup_x", "pickup_y", "created_at"], created_from=since,
+                archived=archived, batch_size=batch_size
+            ):
+                for pickup_x, pickup_y, created_at in batch:
+                    self.record((pickup_x, pickup_y), created_at)
+
+    def predict(self, at: datetime.datetime) -> Dict[Cell, float]:
+        """
+        Expected relative demand per cell around `at`: the current bucket, blended into the
+        next one as the bucket runs out so positions shift before the change, not after.
+        """
+        at = _utc(at)
+        now = at.timestamp()
+        current = self.bucket(at)
+        upcoming = (current + 1) % self.buckets_per_day
+        elapsed = ((at.hour * 60 + at.minute) % self.bucket_minutes + at.second / 60) / self.bucket_minutes
+        shares = {current: 1.0 - elapsed, upcoming: elapsed}
+
+        demand: Dict[Cell, float] = {}
+        with self._lock:
+            for (cell, bucket), (weight, since) in self._weights.items():
+                share = shares.get(bucket)
+                if share:
+                    demand[cell] = demand.get(cell, 0.0) + share * self._decayed(weight, since, now)
+        return demand
+
+    def heatmap(self, at: datetime.datetime, limit: Optional[int] = None) -> List[dict]:
+        cells = sorted(self.predict(at).items(), key=lambda item: (-item[1], item[0]))
+        return [
+            {"x": x, "y": y, "weight": round(weight, 3)}
+            for (x, y), weight in cells[:limit]
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._weights.clear()
+            self.recorded = 0
+
+
+demand_model = DemandModel(
+    datetime.timedelta(hours=settings.demand_half_life_hours), settings.demand_bucket_minutes
+)
@@ -0,0 +1,61 @@
+from typing import Callable, Dict, Iterable, Tuple
+from core.config import settings
+
+Cell = Tuple[int, int]
+
+
+class EnergyModel:
+    """
+    Battery use in percentage points: `step_cost` per cell moved and `delivery_cost` per
+    drop-off. Bots only take work they can finish and still reach a station with `reserve`
+    left. battery_level is a whole number, so fractions carry over per bot until they add up
+    to a point.
+
+    `committed` is the battery each bot's current plan still needs, its trip to a station
+    included. The movement loop sets it when a plan changes; assignment adds to it so several
+    orders handed out in one pass see each other.
+    """
+
+    def __init__(self, step_cost: float, delivery_cost: float, reserve: float):
+        self.step_cost = step_cost
+        self.delivery_cost = delivery_cost
+        self.reserve = reserve
+        self.committed: Dict[int, float] = {}
+        self._carry: Dict[int, float] = {}
+
+    def cost(self, steps: float, deliveries: int = 0) -> float:
+        return steps * self.step_cost + deliveries * self.delivery_cost
+
+    def can_take(self, bot, cost: float) -> bool:
+        """True if the bot can do `cost` more on top of its plan and keep the reserve"""
+        return bot.battery_level - self.committed.get(bot.id, 0.0) - cost >= self.reserve
+
+    def commit(self, bot_id: int, cost: float):
+        self.committed[bot_id] = self.committed.get(bot_id, 0.0) + cost
+
+    def spend(self, bot, cost: float):
+        # Work done comes off the plan's commitment as well as the battery
+        self._apply(bot, -cost)
+        if bot.id in self.committed:
+            self.committed[bot.id] = max(0.0, self.committed[bot.id] - cost)
+
+    def charge(self, bot, amount: float):
+        self._apply(bot, amount)
+
+    def forget(self, bot_id: int):
+        self.committed.pop(bot_id, None)
+
+    def _apply(self, bot, delta: float):
+        carry = self._carry.get(bot.id, 0.0) + delta
+        whole = int(carry)
+        if whole:
+            bot.battery_level = max(0, min(100, bot.battery_level + whole))
+        self._carry[bot.id] = carry - whole
+
+
+def station_distance(cell: Cell, stations: Iterable[Cell], distance: Callable[[Cell, Cell], float]) -> float:
+    """Steps from cell to the nearest reachable station; 0 without one, as there is nowhere to keep a reserve for"""
+    return min((d for d in (distance(cell, station) for station in stations) if d != float('inf')), default=0)
+
+
+energy_model = EnergyModel(settings.battery_step_cost, settings.battery_delivery_cost, settings.battery_reserve)
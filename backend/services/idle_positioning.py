@@ -0,0 +1,149 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+from core.config import settings
+from services.demand_model import DemandModel, demand_model
+from services.route_algorithm import RouteOptimizer
+
+logger = logging.getLogger(__name__)
+
+Cell = Tuple[int, int]
+
+# Idle bots considered per waiting slot, nearest first; keeps the assignment problem small
+CANDIDATES_PER_SLOT = 4
+
+
+def assign_min_cost(cost: Sequence[Sequence[float]]) -> List[int]:
+    """
+    Hungarian algorithm (shortest augmenting paths with row/column potentials) for a matrix
+    with no more rows than columns: the column given to each row, minimising the total cost.
+    O(rows^2 * columns).
+    """
+    rows = len(cost)
+    if not rows:
+        return []
+    columns = len(cost[0])
+    inf = float('inf')
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (columns + 1)
+    # owner[j]: row holding column j (1-based, 0 = free); way[j]: previous column on the path
+    owner = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+
+    for row in range(1, rows + 1):
+        owner[0] = row
+        j0 = 0
+        min_reduced = [inf] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = owner[j0], inf, 0
+            for j in range(1, columns + 1):
+                if used[j]:
+                    continue
+                reduced = cost[i0 - 1][j - 1] - u[i0] - v[j]
+                if reduced < min_reduced[j]:
+                    min_reduced[j], way[j] = reduced, j0
+                if min_reduced[j] < delta:
+                    delta, j1 = min_reduced[j], j
+            for j in range(columns + 1):
+                if used[j]:
+                    u[owner[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_reduced[j] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    assignment = [0] * rows
+    for j in range(1, columns + 1):
+        if owner[j]:
+            assignment[owner[j] - 1] = j - 1
+    return assignment
+
+
+def _manhattan(a: Cell, b: Cell) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+class IdlePositioner:
+    """
+    Where idle bots wait. A share of the idle fleet is spread over the restaurants with the
+    most predicted demand, in proportion to it, each slot at a free cell next to the
+    restaurant. Every tick the idle bots are matched to those slots by a min-cost assignment
+    on distance; bots without a slot return to a station as before.
+    """
+
+    def __init__(self, demand: DemandModel, share: float, max_targets: int, stickiness: int = 2):
+        self.demand = demand
+        self.share = share
+        self.max_targets = max_targets
+        # Discount for keeping last tick's slot, so near-ties don't swap bots back and forth
+        self.stickiness = stickiness
+        self.targets: Dict[int, Cell] = {}
+
+    def plan(self, bots: list, now, route_optimizer: RouteOptimizer) -> Dict[int, Cell]:
+        """Waiting cell per idle bot id; bots left out should head for a station"""
+        slot_count = int(len(bots) * self.share + 0.5)
+        demand = self.demand.predict(now) if slot_count else {}
+        if not demand:
+            self.targets = {}
+            return self.targets
+
+        top = sorted(demand.items(), key=lambda item: (-item[1], item[0]))[:self.max_targets]
+        slots = [
+            self._waiting_cell(cell, route_optimizer)
+            for cell, count in zip((cell for cell, _ in top), self._split(top, slot_count))
+            for _ in range(count)
+        ]
+
+        # Only the bots nearest to some slot can matter
+        def nearest_slot(bot) -> int:
+            return min(_manhattan((bot.current_x, bot.current_y), slot) for slot in slots)
+        candidates = sorted(bots, key=lambda bot: (nearest_slot(bot), bot.id))[:len(slots) * CANDIDATES_PER_SLOT]
+
+        cost = [
+            [
+                _manhattan((bot.current_x, bot.current_y), slot)
+                - (self.stickiness if self.targets.get(bot.id) == slot else 0)
+                for bot in candidates
+            ]
+            for slot in slots
+        ]
+        self.targets = {candidates[column].id: slots[row] for row, column in enumerate(assign_min_cost(cost))}
+        logger.debug("Idle positioning: %d bots over %d slots at %d restaurants",
+                     len(self.targets), len(slots), len(top))
+        return self.targets
+
+    @staticmethod
+    def _split(weights: List[Tuple[Cell, float]], total: int) -> List[int]:
+        # Largest remainder: slot counts proportional to demand that add up to total
+        weight_sum = sum(weight for _, weight in weights)
+        quotas = [total * weight / weight_sum for _, weight in weights]
+        counts = [int(quota) for quota in quotas]
+        by_remainder = sorted(range(len(quotas)), key=lambda i: counts[i] - quotas[i])
+        for i in by_remainder[:total - sum(counts)]:
+            counts[i] += 1
+        return counts
+
+    @staticmethod
+    def _waiting_cell(restaurant: Cell, route_optimizer: RouteOptimizer) -> Cell:
+        # A neighbouring cell bots may stand on and reach the restaurant from in one step
+        restricted = route_optimizer.restricted_nodes
+        for neighbour in route_optimizer.get_neighbors(*restaurant):
+            if (neighbour in restricted['restaurants'] or neighbour in restricted['houses']
+                    or route_optimizer.is_path_blocked(neighbour, restaurant)):
+                continue
+            return neighbour
+        return restaurant
+
+
+def create_idle_positioner(demand: DemandModel = demand_model) -> Optional[IdlePositioner]:
+    if settings.idle_policy != "demand":
+        return None
+    return IdlePositioner(demand, settings.idle_demand_share, settings.idle_demand_targets)
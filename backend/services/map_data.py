@@ -0,0 +1,109 @@
+import csv
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+from services.node_index import NodeEntry
+
+RESTAURANT_TYPES = ['RAMEN', 'SUSHI', 'CURRY', 'PIZZA']
+RESTAURANT_NAMES = {
+    'RAMEN': "Ramen Ichiran",
+    'SUSHI': "Sushiro",
+    'CURRY': "Indian Curry",
+    'PIZZA': "Pizza Hut",
+}
+
+Cell = Tuple[int, int]
+
+
+def node_id_for(x: int, y: int, grid_size: int) -> int:
+    # Node ids follow the grid formula used by BlockedPaths.csv
+    return y * grid_size + x + 1
+
+
+def cell_for(node_id: int, grid_size: int) -> Cell:
+    return ((node_id - 1) % grid_size, (node_id - 1) // grid_size)
+
+
+def make_node(x: int, y: int, grid_size: int, node_type: str, name: str,
+              restaurant_type: Optional[str] = None) -> NodeEntry:
+    return NodeEntry(
+        id=node_id_for(x, y, grid_size),
+        x=x,
+        y=y,
+        node_type=node_type,
+        is_delivery_point=node_type == 'HOUSE',
+        is_restaurant=node_type == 'RESTAURANT',
+        is_bot_station=node_type == 'BOT_STATION',
+        restaurant_type=restaurant_type,
+        name=name
+    )
+
+
+@dataclass
+class MapData:
+    """Static map held in memory: special cells and blocked edges"""
+    grid_size: int
+    nodes: Dict[Cell, NodeEntry] = field(default_factory=dict)
+    blocked_paths: Set[Tuple[Cell, Cell]] = field(default_factory=set)
+
+    @property
+    def restaurants(self) -> List[NodeEntry]:
+        return [n for n in self.nodes.values() if n.is_restaurant]
+
+    @property
+    def houses(self) -> List[NodeEntry]:
+        return [n for n in self.nodes.values() if n.is_delivery_point]
+
+    @property
+    def bot_stations(self) -> List[NodeEntry]:
+        return [n for n in self.nodes.values() if n.is_bot_station]
+
+    def restricted_nodes(self) -> Dict[str, Set[Cell]]:
+        return {
+            'restaurants': {(n.x, n.y) for n in self.restaurants},
+            'houses': {(n.x, n.y) for n in self.houses},
+            'bot_stations': {(n.x, n.y) for n in self.bot_stations},
+        }
+
+
+def load_map_csv(
+    sample_data_file: str,
+    blocked_paths_file: Optional[str],
+    grid_size: int,
+    bot_stations: Optional[List[Cell]] = None
+) -> MapData:
+    """Read sample_data.csv / BlockedPaths.csv into MapData, skipping cells outside the grid"""
+    map_data = MapData(grid_size=grid_size)
+    house_count = 0
+
+    with open(sample_data_file, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            x, y = int(row["x"]), int(row["y"])
+            if not (0 <= x < grid_size and 0 <= y < grid_size):
+                continue
+
+            restaurant_type = next(
+                (t for t in RESTAURANT_TYPES if (row.get(t) or "").lower() == "true"), None
+            )
+            if restaurant_type:
+                node_type, name = 'RESTAURANT', RESTAURANT_NAMES[restaurant_type]
+            elif (row.get("delivery_point") or "").lower() == "true":
+                house_count += 1
+                node_type, name = 'HOUSE', f"House_{house_count}"
+            else:
+                continue
+
+            map_data.nodes[(x, y)] = make_node(x, y, grid_size, node_type, name, restaurant_type)
+
+    # Stations default to the grid centre, like the Central Station of init_data
+    for x, y in bot_stations or [(grid_size // 2, grid_size // 2)]:
+        map_data.nodes[(x, y)] = make_node(x, y, grid_size, 'BOT_STATION', "Central Station")
+
+    if not blocked_paths_file:
+        return map_data
+
+    with open(blocked_paths_file, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f, skipinitialspace=True):
+            from_id, to_id = int(row["from_id"]), int(row["to_id"])
+            map_data.blocked_paths.add((cell_for(from_id, grid_size), cell_for(to_id, grid_size)))
+
+    return map_data
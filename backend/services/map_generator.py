@@ -0,0 +1,168 @@
+import csv
+import logging
+import random
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from services.map_data import Cell, MapData, RESTAURANT_TYPES, RESTAURANT_NAMES, cell_for, make_node, node_id_for
+
+logger = logging.getLogger(__name__)
+
+# Column order of sample_data.csv
+CSV_RESTAURANT_COLUMNS = ['RAMEN', 'CURRY', 'PIZZA', 'SUSHI']
+
+
+@dataclass
+class CityConfig:
+    grid_size: int = 50
+    poi_density: float = 0.2        # share of cells that are houses or restaurants
+    restaurant_share: float = 0.1   # share of POIs that are restaurants
+    restaurant_mix: Dict[str, float] = field(default_factory=lambda: {t: 1.0 for t in RESTAURANT_TYPES})
+    blocked_ratio: float = 0.1      # share of all grid edges that are blocked
+    seed: int = 42
+
+
+def _random_spanning_tree(grid_size: int, rng: random.Random) -> Tuple[List[int], set]:
+    # Randomised Kruskal over cell indices (y * grid_size + x); returns degrees and tree edges
+    parent = list(range(grid_size * grid_size))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    edges = []
+    for y in range(grid_size):
+        for x in range(grid_size):
+            i = y * grid_size + x
+            if x + 1 < grid_size:
+                edges.append((i, i + 1))
+            if y + 1 < grid_size:
+                edges.append((i, i + grid_size))
+    rng.shuffle(edges)
+
+    degree = [0] * (grid_size * grid_size)
+    tree = set()
+    for a, b in edges:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_a] = root_b
+            tree.add((a, b))
+            degree[a] += 1
+            degree[b] += 1
+            if len(tree) == grid_size * grid_size - 1:
+                break
+    return degree, tree
+
+
+def generate_city(config: CityConfig) -> MapData:
+    """
+    Random city that is always routable: houses and restaurants are leaves of a random
+    spanning tree, so every POI hangs off transit cells that stay connected, and only
+    edges outside the tree are blocked.
+    """
+    size = config.grid_size
+    rng = random.Random(config.seed)
+    degree, tree = _random_spanning_tree(size, rng)
+
+    station = (size // 2, size // 2)
+    station_index = station[1] * size + station[0]
+    leaves = [i for i, d in enumerate(degree) if d == 1 and i != station_index]
+
+    wanted = int(size * size * config.poi_density)
+    if wanted > len(leaves):
+        logger.warning("POI density %s capped at %.3f (tree leaves)", config.poi_density, len(leaves) / (size * size))
+    pois = rng.sample(leaves, min(wanted, len(leaves)))
+
+    mix = {t: w for t, w in config.restaurant_mix.items() if w > 0}
+    restaurant_count = min(len(pois), max(len(mix), int(len(pois) * config.restaurant_share)))
+    # Every type in the mix gets at least one restaurant, the rest follow the weights
+    restaurant_types = list(mix)[:restaurant_count]
+    restaurant_types += rng.choices(list(mix), weights=list(mix.values()), k=restaurant_count - len(restaurant_types))
+
+    map_data = MapData(grid_size=size)
+    for n, index in enumerate(pois):
+        x, y = cell_for(index + 1, size)
+        restaurant_type = restaurant_types[n] if n < restaurant_count else None
+        if restaurant_type:
+            map_data.nodes[(x, y)] = make_node(x, y, size, 'RESTAURANT', RESTAURANT_NAMES[restaurant_type], restaurant_type)
+        else:
+            map_data.nodes[(x, y)] = make_node(x, y, size, 'HOUSE', f"House_{n - restaurant_count + 1}")
+
+    map_data.nodes[station] = make_node(station[0], station[1], size, 'BOT_STATION', "Central Station")
+
+    total_edges = 2 * size * (size - 1)
+    spare = [
+        (i, i + 1) for i in range(size * size) if (i + 1) % size and (i, i + 1) not in tree
+    ] + [
+        (i, i + size) for i in range(size * (size - 1)) if (i, i + size) not in tree
+    ]
+    for a, b in rng.sample(spare, min(len(spare), int(total_edges * config.blocked_ratio))):
+        map_data.blocked_paths.add((cell_for(a + 1, size), cell_for(b + 1, size)))
+
+    return map_data
+
+
+def verify_connectivity(map_data: MapData) -> List[Cell]:
+    """POIs that can't be reached from the first station under the transit rules"""
+    size = map_data.grid_size
+    stations = map_data.bot_stations
+    if not stations:
+        return [(n.x, n.y) for n in map_data.nodes.values()]
+
+    restricted = {(n.x, n.y) for n in map_data.nodes.values() if n.is_restaurant or n.is_delivery_point}
+    blocked = map_data.blocked_paths | {(b, a) for a, b in map_data.blocked_paths}
+    start = (stations[0].x, stations[0].y)
+    seen = {start}
+    queue = deque([start])
+
+    while queue:
+        x, y = queue.popleft()
+        for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            cell = (nx, ny)
+            if not (0 <= nx < size and 0 <= ny < size) or cell in seen or ((x, y), cell) in blocked:
+                continue
+            seen.add(cell)
+            # POIs can be entered but not crossed
+            if cell not in restricted:
+                queue.append(cell)
+
+    return sorted(restricted - seen)
+
+
+def write_map_csv(map_data: MapData, sample_data_file: str, blocked_paths_file: str):
+    """Write the map in the sample_data.csv / BlockedPaths.csv formats, one row per cell"""
+    size = map_data.grid_size
+    with open(sample_data_file, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "x", "y", "delivery_point", *CSV_RESTAURANT_COLUMNS])
+        for y in range(size):
+            for x in range(size):
+                node = map_data.nodes.get((x, y))
+                restaurant_type = node.restaurant_type if node else None
+                writer.writerow([
+                    node_id_for(x, y, size), x, y,
+                    "TRUE" if node and node.is_delivery_point else "FALSE",
+                    *("TRUE" if restaurant_type == t else "FALSE" for t in CSV_RESTAURANT_COLUMNS)
+                ])
+
+    with open(blocked_paths_file, "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["from_id", "to_id"])
+        for a, b in sorted(map_data.blocked_paths, key=lambda p: (p[0][1], p[0][0], p[1][1], p[1][0])):
+            writer.writerow([node_id_for(*a, size), node_id_for(*b, size)])
+
+
+def parse_restaurant_mix(value: Optional[str]) -> Dict[str, float]:
+    """'RAMEN=2,SUSHI=1' -> {'RAMEN': 2.0, 'SUSHI': 1.0}"""
+    if not value:
+        return {t: 1.0 for t in RESTAURANT_TYPES}
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().upper()
+        if name not in RESTAURANT_TYPES:
+            raise ValueError(f"Unknown restaurant type: {name}")
+        mix[name] = float(weight or 1)
+    return mix
@@ -0,0 +1,311 @@
+import csv
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import String, cast, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models.blocked_path import BlockedPath
+from models.node import Node
+from repositories import MemoryRepositories, Repositories, SqlRepositories
+from services.map_data import MapData, RESTAURANT_TYPES, RESTAURANT_NAMES, cell_for, make_node, node_id_for
+from services.map_loader import NODE_COLUMNS, chunked, iter_node_rows
+from services.node_index import NodeEntry
+
+# Only the first errors are kept in the report, the rest are counted
+MAX_REPORTED_ERRORS = 100
+
+
+class GridMismatchError(ValueError):
+    """The stored map was laid out for another grid size, so its node ids don't fit this one"""
+
+
+@dataclass
+class ImportReport:
+    grid_size: int
+    node_rows: int = 0
+    blocked_rows: int = 0
+    nodes_upserted: int = 0
+    nodes_reset: int = 0
+    blocked_added: int = 0
+    blocked_removed: int = 0
+    error_count: int = 0
+    errors: List[dict] = field(default_factory=list)
+    skip_invalid: bool = False
+    applied: bool = False
+    map_version: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error_count == 0
+
+    @property
+    def can_apply(self) -> bool:
+        # With skip_invalid the bad rows are left out and the rest still goes in
+        return self.ok or self.skip_invalid
+
+    def error(self, source: str, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"file": source, "line": line, "message": message})
+
+
+def _flag(value: Optional[str]) -> bool:
+    return (value or "").strip().lower() == "true"
+
+
+def iter_sample_data(lines: Iterable[str], grid_size: int, report: ImportReport) -> Iterator[NodeEntry]:
+    """
+    Validate sample_data.csv rows as they stream in and yield the special cells,
+    followed by the station at the grid centre. Bad rows are reported and skipped.
+    Cells are keyed by x,y; the id column is only a row number.
+    """
+    reader = csv.DictReader(lines, skipinitialspace=True)
+    missing = {"x", "y"} - set(reader.fieldnames or [])
+    if missing:
+        report.error("sample_data", 1, f"missing columns: {', '.join(sorted(missing))}")
+        return
+
+    # 1 = seen, 2 = seen and a POI; one byte per cell keeps large grids cheap
+    seen = bytearray(grid_size * grid_size)
+    house_count = 0
+
+    for row in reader:
+        line = reader.line_num
+        report.node_rows += 1
+        try:
+            x, y = int(row["x"]), int(row["y"])
+        except (TypeError, ValueError):
+            report.error("sample_data", line, f"x and y must be integers, got {row['x']!r}, {row['y']!r}")
+            continue
+
+        if not (0 <= x < grid_size and 0 <= y < grid_size):
+            report.error("sample_data", line, f"({x},{y}) is outside the {grid_size}x{grid_size} grid")
+            continue
+
+        index = y * grid_size + x
+        if seen[index]:
+            report.error("sample_data", line, f"duplicate cell ({x},{y})")
+            continue
+        seen[index] = 1
+
+        restaurant_types = [t for t in RESTAURANT_TYPES if _flag(row.get(t))]
+        is_house = _flag(row.get("delivery_point"))
+        if len(restaurant_types) + is_house > 1:
+            report.error("sample_data", line, f"cell ({x},{y}) is marked as more than one POI")
+            continue
+
+        if restaurant_types:
+            seen[index] = 2
+            restaurant_type = restaurant_types[0]
+            yield make_node(x, y, grid_size, 'RESTAURANT', RESTAURANT_NAMES[restaurant_type], restaurant_type)
+        elif is_house:
+            seen[index] = 2
+            house_count += 1
+            yield make_node(x, y, grid_size, 'HOUSE', f"House_{house_count}")
+
+    # Stations aren't part of the CSV, the Central Station sits at the grid centre
+    x = y = grid_size // 2
+    if seen[y * grid_size + x] == 2:
+        report.error("sample_data", reader.line_num, f"the station cell ({x},{y}) can't be a POI")
+        return
+    yield make_node(x, y, grid_size, 'BOT_STATION', "Central Station")
+
+
+def iter_blocked_paths(lines: Iterable[str], grid_size: int, report: ImportReport) -> Iterator[Tuple[int, int]]:
+    """Validate BlockedPaths.csv rows as they stream in: ids on the grid, grid-adjacent, no repeats"""
+    reader = csv.DictReader(lines, skipinitialspace=True)
+    missing = {"from_id", "to_id"} - set(reader.fieldnames or [])
+    if missing:
+        report.error("blocked_paths", 1, f"missing columns: {', '.join(sorted(missing))}")
+        return
+
+    node_count = grid_size * grid_size
+    seen: Set[Tuple[int, int]] = set()
+
+    for row in reader:
+        line = reader.line_num
+        report.blocked_rows += 1
+        try:
+            from_id, to_id = int(row["from_id"]), int(row["to_id"])
+        except (TypeError, ValueError):
+            report.error("blocked_paths", line, f"ids must be integers, got {row['from_id']!r}, {row['to_id']!r}")
+            continue
+
+        if not (1 <= from_id <= node_count and 1 <= to_id <= node_count):
+            report.error("blocked_paths", line, f"ids must be between 1 and {node_count}")
+            continue
+
+        (from_x, from_y), (to_x, to_y) = cell_for(from_id, grid_size), cell_for(to_id, grid_size)
+        if abs(from_x - to_x) + abs(from_y - to_y) != 1:
+            report.error("blocked_paths", line, f"({from_x},{from_y}) and ({to_x},{to_y}) are not adjacent")
+            continue
+
+        pair = (min(from_id, to_id), max(from_id, to_id))
+        if pair in seen:
+            report.error("blocked_paths", line, f"duplicate blocked path {from_id} - {to_id}")
+            continue
+        seen.add(pair)
+        yield from_id, to_id
+
+
+def read_map(sample_lines: Iterable[str], blocked_lines: Optional[Iterable[str]], grid_size: int) -> Tuple[MapData, ImportReport]:
+    """Validated MapData for callers that hold the whole map in memory anyway"""
+    report = ImportReport(grid_size=grid_size, skip_invalid=True)
+    map_data = MapData(grid_size=grid_size)
+    for node in iter_sample_data(sample_lines, grid_size, report):
+        map_data.nodes[(node.x, node.y)] = node
+    if blocked_lines is not None:
+        for from_id, to_id in iter_blocked_paths(blocked_lines, grid_size, report):
+            map_data.blocked_paths.add((cell_for(from_id, grid_size), cell_for(to_id, grid_size)))
+    return map_data, report
+
+
+def _insert(db: Session):
+    # ON CONFLICT needs the dialect's own insert
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def _check_layout(db: Session, grid_size: int):
+    # Node ids are y * grid_size + x + 1; rows from another grid size would clash with the new
+    # cells and put blocked paths (stored by id) on the wrong edges
+    node = db.execute(
+        select(Node.id, Node.x, Node.y).where(Node.id != Node.y * grid_size + Node.x + 1).limit(1)
+    ).first()
+    if node:
+        raise GridMismatchError(
+            f"Stored node {node.id} at ({node.x},{node.y}) doesn't fit a {grid_size}x{grid_size} grid; "
+            f"the map was seeded with another GRID_SIZE, re-seed it before importing"
+        )
+
+
+def _ensure_grid(db: Session, grid_size: int, chunk_size: int):
+    # Blocked paths reference node ids, so every cell of the grid has to exist first
+    inside = db.scalar(select(func.count(Node.id)).where(Node.x < grid_size, Node.y < grid_size))
+    if inside == grid_size * grid_size:
+        return
+    stmt = _insert(db)(Node).on_conflict_do_nothing(index_elements=["x", "y"])
+    for chunk in chunked(iter_node_rows(MapData(grid_size=grid_size)), chunk_size):
+        db.execute(stmt, [dict(zip(NODE_COLUMNS, row)) for row in chunk])
+
+
+def _upsert_nodes(db: Session, nodes: Iterator[NodeEntry], report: ImportReport, chunk_size: int):
+    stmt = _insert(db)(Node)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["x", "y"],
+        set_={column: stmt.excluded[column] for column in NODE_COLUMNS if column not in ("id", "x", "y")}
+    )
+    imported = set()
+    for chunk in chunked(nodes, chunk_size):
+        imported.update(node.id for node in chunk)
+        # Keep validating after the first error, but stop writing
+        if report.can_apply:
+            db.execute(stmt, [
+                {column: getattr(node, column) for column in NODE_COLUMNS} for node in chunk
+            ])
+            report.nodes_upserted += len(chunk)
+    if not report.can_apply:
+        return
+
+    # Special cells the new map no longer has go back to plain nodes
+    stale = [node_id for node_id in db.scalars(select(Node.id).where(Node.node_type != 'NODE'))
+             if node_id not in imported]
+    for ids in chunked(iter(stale), chunk_size):
+        db.execute(update(Node).where(Node.id.in_(ids)).values(
+            node_type='NODE', name="Node_" + cast(Node.x, String) + "_" + cast(Node.y, String),
+            is_delivery_point=False, is_restaurant=False, is_bot_station=False, restaurant_type=None
+        ))
+    report.nodes_reset = len(stale)
+
+
+def _upsert_blocked_paths(db: Session, pairs: Iterator[Tuple[int, int]], report: ImportReport, chunk_size: int):
+    stmt = _insert(db)(BlockedPath).on_conflict_do_nothing(index_elements=["from_node_id", "to_node_id"])
+    before = db.scalar(select(func.count(BlockedPath.id)))
+    imported = set()
+    for chunk in chunked(pairs, chunk_size):
+        imported.update(chunk)
+        if report.can_apply:
+            db.execute(stmt, [{"from_node_id": a, "to_node_id": b} for a, b in chunk])
+    if not report.can_apply:
+        return
+
+    existing = db.execute(select(BlockedPath.id, BlockedPath.from_node_id, BlockedPath.to_node_id)).all()
+    stale = [row.id for row in existing if (row.from_node_id, row.to_node_id) not in imported]
+    for ids in chunked(iter(stale), chunk_size):
+        db.execute(delete(BlockedPath).where(BlockedPath.id.in_(ids)))
+    report.blocked_removed = len(stale)
+    report.blocked_added = len(existing) - before
+
+
+def _import_sql(db: Session, sample_lines, blocked_lines, report: ImportReport, chunk_size: int):
+    try:
+        _check_layout(db, report.grid_size)
+        _ensure_grid(db, report.grid_size, chunk_size)
+        if sample_lines is not None:
+            _upsert_nodes(db, iter_sample_data(sample_lines, report.grid_size, report), report, chunk_size)
+        if blocked_lines is not None:
+            _upsert_blocked_paths(db, iter_blocked_paths(blocked_lines, report.grid_size, report), report, chunk_size)
+    except Exception:
+        db.rollback()
+        raise
+
+    if not report.can_apply:
+        db.rollback()
+        return
+
+    # Dialect inserts skip the ORM flush, flag the change so the node index reloads on commit
+    db.info["nodes_changed"] = True
+    db.commit()
+    report.applied = True
+
+
+def _import_memory(store, sample_lines, blocked_lines, report: ImportReport):
+    size = report.grid_size
+    if store.grid_size and store.grid_size != size:
+        raise GridMismatchError(
+            f"Stored map is {store.grid_size}x{store.grid_size}, not {size}x{size}; re-seed it before importing"
+        )
+    map_data = MapData(grid_size=size)
+
+    if sample_lines is not None:
+        for node in iter_sample_data(sample_lines, size, report):
+            map_data.nodes[(node.x, node.y)] = node
+    else:
+        map_data.nodes = {(n.x, n.y): n for n in store.special_nodes}
+
+    if blocked_lines is not None:
+        for from_id, to_id in iter_blocked_paths(blocked_lines, size, report):
+            map_data.blocked_paths.add((cell_for(from_id, size), cell_for(to_id, size)))
+    else:
+        map_data.blocked_paths = {(cell_for(a, size), cell_for(b, size)) for a, b in store.blocked_pairs}
+
+    if not report.can_apply:
+        return
+
+    if sample_lines is not None:
+        report.nodes_upserted = len(map_data.nodes)
+        report.nodes_reset = len({(n.x, n.y) for n in store.special_nodes} - set(map_data.nodes))
+    old = set(store.blocked_pairs)
+    new = {(node_id_for(*a, size), node_id_for(*b, size)) for a, b in map_data.blocked_paths}
+    report.blocked_added, report.blocked_removed = len(new - old), len(old - new)
+
+    # The store swaps the whole map in one go
+    store.load_map(map_data)
+    report.applied = True
+
+
+def import_map(repos: Repositories, sample_lines: Optional[Iterable[str]], blocked_lines: Optional[Iterable[str]],
+               grid_size: int, skip_invalid: bool = False, chunk_size: int = 5000) -> ImportReport:
+    """
+    Replace the map from sample_data.csv / BlockedPaths.csv lines, either file optional.
+    Rows are validated and upserted in chunks inside one transaction; nothing is applied
+    if a row is invalid, unless skip_invalid. No TRUNCATE, so readers keep the old map until commit.
+    Raises GridMismatchError if the stored map was seeded at another grid size.
+    """
+    report = ImportReport(grid_size=grid_size, skip_invalid=skip_invalid)
+    if isinstance(repos, MemoryRepositories):
+        _import_memory(repos.store, sample_lines, blocked_lines, report)
+    elif isinstance(repos, SqlRepositories):
+        _import_sql(repos.db, sample_lines, blocked_lines, report, chunk_size)
+    else:
+        raise TypeError(f"Unsupported repositories: {type(repos).__name__}")
+    return report
@@ -0,0 +1,86 @@
+import csv
+import io
+from typing import Iterator, List
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+from models.blocked_path import BlockedPath
+from models.node import Node
+from services.map_data import MapData, node_id_for
+
+NODE_COLUMNS = [
+    "id", "x", "y", "name", "node_type",
+    "is_delivery_point", "is_restaurant", "is_bot_station", "restaurant_type"
+]
+BLOCKED_PATH_COLUMNS = ["from_node_id", "to_node_id"]
+
+
+def iter_node_rows(map_data: MapData) -> Iterator[tuple]:
+    # Every grid cell, special cells carry their POI data; ids follow the grid formula
+    size = map_data.grid_size
+    for y in range(size):
+        for x in range(size):
+            node = map_data.nodes.get((x, y))
+            if node:
+                yield (node.id, x, y, node.name, node.node_type, node.is_delivery_point,
+                       node.is_restaurant, node.is_bot_station, node.restaurant_type)
+            else:
+                yield (node_id_for(x, y, size), x, y, f"Node_{x}_{y}", 'NODE', False, False, False, None)
+
+
+def iter_blocked_rows(map_data: MapData) -> Iterator[tuple]:
+    size = map_data.grid_size
+    for a, b in map_data.blocked_paths:
+        yield (node_id_for(a[0], a[1], size), node_id_for(b[0], b[1], size))
+
+
+def chunked(rows: Iterator[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy_rows(db: Session, table: str, columns: List[str], rows: Iterator[tuple], chunk_size: int):
+    # COPY ... FROM STDIN in CSV form; empty unquoted fields load as NULL
+    cursor = db.connection().connection.cursor()
+    try:
+        for chunk in chunked(rows, chunk_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                writer.writerow(["" if value is None else value for value in row])
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _insert_rows(db: Session, model, columns: List[str], rows: Iterator[tuple], chunk_size: int):
+    for chunk in chunked(rows, chunk_size):
+        db.execute(insert(model), [dict(zip(columns, row)) for row in chunk])
+
+
+def bulk_load_map(db: Session, map_data: MapData, chunk_size: int = 50000):
+    """
+    Load a whole map into empty nodes/blocked_paths tables: COPY on Postgres,
+    multi-row INSERTs elsewhere. The caller commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_rows(db, Node.__tablename__, NODE_COLUMNS, iter_node_rows(map_data), chunk_size)
+        _copy_rows(db, BlockedPath.__tablename__, BLOCKED_PATH_COLUMNS, iter_blocked_rows(map_data), chunk_size)
+        # Ids were written explicitly, move the sequences past them
+        for table in (Node.__tablename__, BlockedPath.__tablename__):
+            db.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+            ))
+    else:
+        _insert_rows(db, Node, NODE_COLUMNS, iter_node_rows(map_data), chunk_size)
+        _insert_rows(db, BlockedPath, BLOCKED_PATH_COLUMNS, iter_blocked_rows(map_data), chunk_size)
+
+    # COPY bypasses the ORM events, flag the change so the node index reloads on commit
+    db.info["nodes_changed"] = True
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models.node import Node
+
+
+@dataclass(frozen=True)
+class NodeEntry:
+    id: int
+    x: int
+    y: int
+    node_type: str
+    is_delivery_point: bool
+    is_restaurant: bool
+    is_bot_station: bool
+    restaurant_type: Optional[str]
+    name: Optional[str]
+
+
+class NodeIndex:
+    """In-memory cell -> node lookup, rebuilt lazily after any node change"""
+
+    def __init__(self):
+        self._cells: Dict[Tuple[int, int], NodeEntry] = {}
+        self._loaded = False
+        self.version = 0
+
+    def load(self, db):
+        # Build the whole index in one query and swap it in atomically
+        if isinstance(db, Session):
+            rows = db.query(
+                Node.id, Node.x, Node.y, Node.node_type,
+                Node.is_delivery_point, Node.is_restaurant, Node.is_bot_station,
+                Node.restaurant_type, Node.name
+            ).all()
+        else:
+            rows = db.nodes.list_all()
+
+        cells = {}
+        for row in rows:
+            node_type = row.node_type.value if hasattr(row.node_type, "value") else row.node_type
+            cells[(row.x, row.y)] = NodeEntry(
+                id=row.id,
+                x=row.x,
+                y=row.y,
+                node_type=node_type,
+                is_delivery_point=row.is_delivery_point,
+                is_restaurant=row.is_restaurant,
+                is_bot_station=row.is_bot_station,
+                restaurant_type=row.restaurant_type,
+                name=row.name
+            )
+
+        self._cells = cells
+        self._loaded = True
+        self.version += 1
+
+    def invalidate(self):
+        self._loaded = False
+
+    def ensure_loaded(self, db):
+        if not self._loaded:
+            self.load(db)
+
+    def cells(self, db) -> Dict[Tuple[int, int], NodeEntry]:
+        """Every node by cell; the dict is replaced on reload, never mutated"""
+        self.ensure_loaded(db)
+        return self._cells
+
+    def get(self, db, x: int, y: int) -> Optional[NodeEntry]:
+        self.ensure_loaded(db)
+        return self._cells.get((x, y))
+
+    def find_restaurant(self, db, x: int, y: int, restaurant_type: str) -> Optional[NodeEntry]:
+        node = self.get(db, x, y)
+        if node and node.is_restaurant and node.restaurant_type == restaurant_type.upper():
+            return node
+        return None
+
+    def find_delivery_point(self, db, x: int, y: int) -> Optional[NodeEntry]:
+        node = self.get(db, x, y)
+        if node and node.is_delivery_point:
+            return node
+        return None
+
+
+node_index = NodeIndex()
+
+
+# Invalidate the index whenever a transaction touching nodes is committed
+@event.listens_for(Session, "after_flush")
+def _track_node_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Node):
+            session.info["nodes_changed"] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_node_changes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is Node:
+            orm_execute_state.session.info["nodes_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop("nodes_changed", False):
+        node_index.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop("nodes_changed", None)
@@ -0,0 +1,85 @@
+import asyncio
+import datetime
+import logging
+from sqlalchemy import delete, insert, select
+from core.config import settings
+from core.database import SessionLocal
+from models.order import Order, FINISHED_STATUSES
+from models.order_archive import ArchivedOrder
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLUMNS = [
+    "id", "restaurant_type", "restaurant_name", "customer_name", "customer_phone",
+    "pickup_x", "pickup_y", "delivery_x", "delivery_y", "status",
+    "restaurant_id", "bot_id", "estimated_distance", "estimated_time",
+    "created_at", "updated_at", "assigned_at", "picked_up_at", "delivered_at", "cancelled_at"
+]
+
+class OrderArchiver:
+    def __init__(self):
+        self.is_running = False
+        self.interval = settings.order_archive_interval
+        self.total_archived = 0
+        self.last_run_archived = 0
+
+    async def start(self):
+        # Periodically move finished orders out of the hot table
+        self.is_running = True
+        logger.info("Order archiver started")
+
+        while self.is_running:
+            try:
+                self.last_run_archived = await asyncio.to_thread(self.archive_finished_orders)
+                if self.last_run_archived:
+                    logger.info("Archived %d finished orders", self.last_run_archived)
+            except Exception as e:
+                logger.exception("Order archiver error: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def stop(self):
+        self.is_running = False
+        logger.info("Order archiver stopped")
+
+    def archive_finished_orders(self, max_batches: int = 100) -> int:
+        # Move finished orders older than the configured age, one batch per transaction
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            hours=settings.order_archive_age_hours
+        )
+        archived = 0
+
+        for _ in range(max_batches):
+            moved = self.archive_batch(cutoff, settings.order_archive_batch_size)
+            archived += moved
+            if moved < settings.order_archive_batch_size:
+                break
+
+        self.total_archived += archived
+        return archived
+
+    def archive_batch(self, cutoff: datetime.datetime, batch_size: int) -> int:
+        # DELETE ... RETURNING feeds INSERT ... SELECT in a single statement
+        batch_ids = select(Order.id).where(
+            Order.status.in_(FINISHED_STATUSES),
+            Order.updated_at < cutoff
+        ).order_by(Order.id).limit(batch_size).with_for_update(skip_locked=True)
+
+        moved = delete(Order).where(Order.id.in_(batch_ids.scalar_subquery())).returning(
+            *[getattr(Order, name) for name in ARCHIVE_COLUMNS]
+        ).cte("moved")
+
+        stmt = insert(ArchivedOrder).from_select(ARCHIVE_COLUMNS, select(moved))
+
+        db = SessionLocal()
+        try:
+            result = db.execute(stmt)
+            db.commit()
+            return result.rowcount
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+order_archiver = OrderArchiver()
@@ -0,0 +1,80 @@
+import datetime
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+from models.order import Order
+from services.route_algorithm import RouteOptimizer
+
+Cell = Tuple[int, int]
+
+
+def _utc(value: datetime.datetime) -> datetime.datetime:
+    # SQLite and older rows may come back naive; every stamp we write is UTC
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+class OrderBatcher:
+    """
+    Batching stage in front of assignment. Pending orders from the same pickup cell whose
+    deliveries lie within `delivery_radius` steps (graph distance) of the group's oldest
+    order are grouped, up to one bot's capacity, so a single bot collects them in one stop.
+    Partial groups can be held for up to `window` after their oldest order so later orders
+    can join; full groups are released straight away. Given `joinable`, a partial group is only
+    held while one of those orders could join it, and otherwise released at once.
+    """
+
+    def __init__(self, window: datetime.timedelta, delivery_radius: int):
+        self.window = window
+        self.delivery_radius = delivery_radius
+
+    def group(self, orders: List[Order], max_size: int, route_optimizer: RouteOptimizer) -> List[List[Order]]:
+        """Groups in oldest-first order, each led by its oldest order"""
+        by_pickup: Dict[Cell, List[Order]] = defaultdict(list)
+        for order in sorted(orders, key=lambda o: (_utc(o.created_at), o.id)):
+            by_pickup[(order.pickup_x, order.pickup_y)].append(order)
+
+        groups = []
+        for remaining in by_pickup.values():
+            while remaining:
+                lead = remaining.pop(0)
+                nearby = []
+                for i, order in enumerate(remaining):
+                    distance = self._delivery_distance(lead, order, route_optimizer)
+                    if distance <= self.delivery_radius:
+                        nearby.append((distance, i))
+                taken = sorted(i for _, i in sorted(nearby)[:max_size - 1])
+                groups.append([lead] + [remaining[i] for i in taken])
+                for i in reversed(taken):
+                    del remaining[i]
+        groups.sort(key=lambda group: (_utc(group[0].created_at), group[0].id))
+        return groups
+
+    def split(self, orders: List[Order], now: datetime.datetime, max_size: int, route_optimizer: RouteOptimizer,
+              joinable: Optional[List[Order]] = None) -> Tuple[List[List[Order]], List[Order]]:
+        """Groups to assign now, and the orders held back for a fuller group"""
+        ready, held = [], []
+        for group in self.group(orders, max_size, route_optimizer):
+            if len(group) >= max_size or now - _utc(group[0].created_at) >= self.window or (
+                joinable is not None and not any(self._joins(group[0], order, route_optimizer) for order in joinable)
+            ):
+                ready.append(group)
+            else:
+                held.extend(group)
+        return ready, held
+
+    def _joins(self, lead: Order, order: Order, route_optimizer: RouteOptimizer) -> bool:
+        return ((lead.pickup_x, lead.pickup_y) == (order.pickup_x, order.pickup_y)
+                and self._delivery_distance(lead, order, route_optimizer) <= self.delivery_radius)
+
+    def _delivery_distance(self, a: Order, b: Order, route_optimizer: RouteOptimizer) -> float:
+        start, end = (a.delivery_x, a.delivery_y), (b.delivery_x, b.delivery_y)
+        # Manhattan distance never exceeds the path, so most pairs never reach Dijkstra
+        if abs(start[0] - end[0]) + abs(start[1] - end[1]) > self.delivery_radius:
+            return float('inf')
+        path = route_optimizer.dijkstra(start, end)
+        return len(path) - 1 if path else float('inf')
+
+
+order_batcher = OrderBatcher(
+    datetime.timedelta(seconds=settings.batch_window_seconds), settings.batch_delivery_radius
+)
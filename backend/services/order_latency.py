@@ -0,0 +1,140 @@
+import datetime
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Status -> column stamped when an order enters it
+STATUS_TIMESTAMPS = {
+    'ASSIGNED': 'assigned_at',
+    'PICKED_UP': 'picked_up_at',
+    'DELIVERED': 'delivered_at',
+    'CANCELLED': 'cancelled_at',
+}
+
+# Stage -> (start column, end column)
+STAGES = {
+    'queue': ('created_at', 'assigned_at'),        # waiting in PENDING
+    'pickup': ('assigned_at', 'picked_up_at'),     # bot driving to the restaurant
+    'delivery': ('picked_up_at', 'delivered_at'),  # restaurant to customer
+    'total': ('created_at', 'delivered_at'),
+    'cancel': ('created_at', 'cancelled_at'),
+}
+
+GROUPS = ('restaurant_type', 'bot')
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def _utc(value: datetime.datetime) -> datetime.datetime:
+    # SQLite and older rows may come back naive; every stamp we write is UTC
+    return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+
+
+class LatencySketch:
+    """
+    Streaming quantiles over log-spaced buckets: constant-time inserts, memory bounded by the
+    value range rather than the sample count, and every quantile within `accuracy` of the truth.
+    """
+
+    def __init__(self, accuracy: float = 0.01, min_value: float = 0.001):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        index = math.ceil(math.log(max(value, self.min_value)) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket, clamped to what was actually observed
+                return min(2 * self.gamma ** index / (self.gamma + 1), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            **{f"p{round(q * 100)}": _round(self.quantile(q)) for q in QUANTILES},
+            "max": round(self.max, 3) if self.count else None,
+        }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class OrderLatencyTracker:
+    """Per-stage latency of the orders that moved through this process, updated on each transition"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (stage, group, key) -> sketch; group "all" has the single key "all"
+        self._sketches: Dict[Tuple[str, str, str], LatencySketch] = {}
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+
+    def observe(self, order, column: str):
+        samples: List[Tuple[str, float]] = []
+        for stage, (start_column, end_column) in STAGES.items():
+            if end_column != column:
+                continue
+            start, end = getattr(order, start_column, None), getattr(order, end_column, None)
+            if start is None or end is None:
+                continue
+            samples.append((stage, max(0.0, (_utc(end) - _utc(start)).total_seconds())))
+
+        if not samples:
+            return
+
+        keys = [('all', 'all'), ('restaurant_type', order.restaurant_type)]
+        if order.bot_id is not None:
+            keys.append(('bot', str(order.bot_id)))
+
+        with self._lock:
+            for stage, seconds in samples:
+                for group, key in keys:
+                    sketch = self._sketches.get((stage, group, key))
+                    if sketch is None:
+                        sketch = self._sketches[(stage, group, key)] = LatencySketch()
+                    sketch.add(seconds)
+
+    def snapshot(self, stage: Optional[str] = None, group_by: Optional[str] = None) -> dict:
+        stages = {}
+        with self._lock:
+            for (stage_name, group, key), sketch in sorted(self._sketches.items()):
+                if stage and stage_name != stage:
+                    continue
+                if group == 'all':
+                    stages.setdefault(stage_name, {})["all"] = sketch.summary()
+                elif group_by == group:
+                    stages.setdefault(stage_name, {}).setdefault(group, {})[key] = sketch.summary()
+        return {"since": self.started_at, "unit": "seconds", "stages": stages}
+
+    def reset(self):
+        with self._lock:
+            self._sketches.clear()
+            self.started_at = datetime.datetime.now(datetime.timezone.utc)
+
+
+def set_order_status(order, status: str, now: datetime.datetime):
+    """Move an order to status, stamp the matching lifecycle column and record the stage latency"""
+    order.status = status
+    column = STATUS_TIMESTAMPS.get(status)
+    if column:
+        setattr(order, column, now)
+        order_latency.observe(order, column)
+
+
+order_latency = OrderLatencyTracker()
@@ -0,0 +1,119 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from models.bot import Bot
+from models.order import Order
+from services.bot_index import BotIndex
+from services.energy import EnergyModel
+from services.plan_costs import LegDistances, arrival, cheapest_insertion, removal_saving
+from services.route_algorithm import RouteOptimizer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Transfer:
+    order_id: int
+    from_bot_id: int
+    to_bot_id: int
+    # Where the pickup goes in the receiving bot's plan, and the steps until that bot gets there
+    index: int
+    arrival: float
+    gain: float
+    # Battery the order adds to the receiving bot's plan
+    energy: float
+
+
+class OrderRebalancer:
+    """
+    Work stealing for orders that are ASSIGNED but not picked up. Moving an order from bot A
+    to bot B gains
+
+        (steps until A reaches the pickup - steps until B does)
+        - (steps B's plan grows by - steps A's plan shrinks by)
+
+    with both read off the bots' current plans by insertion cost. An order moves when its
+    best gain reaches min_gain; the threshold keeps orders from bouncing between bots that
+    are about as good. A bot only receives orders it has the battery for. Every
+    `interval_ticks` movement ticks (0 = only on request).
+    """
+
+    def __init__(self, min_gain: float, interval_ticks: int, max_candidates: int = 4):
+        self.min_gain = min_gain
+        self.interval_ticks = interval_ticks
+        self.max_candidates = max_candidates
+        self._ticks = 0
+
+    def due(self) -> bool:
+        """Counts a movement tick; True on every interval_ticks-th"""
+        if self.interval_ticks <= 0:
+            return False
+        self._ticks += 1
+        return self._ticks % self.interval_ticks == 0
+
+    def find_transfers(self, bots: Dict[int, Bot], orders: List[Order], plans: Dict[int, List[dict]],
+                       route_optimizer: RouteOptimizer, bot_positions: BotIndex,
+                       energy: EnergyModel) -> List[Transfer]:
+        """Transfers to apply in order; later ones already account for the earlier ones"""
+        distance = LegDistances(route_optimizer)
+        # Working copies: each transfer edits both plans before the next order is weighed
+        plans = {bot_id: list(plan) for bot_id, plan in plans.items()}
+        room = {bot.id: bot.max_capacity - bot.current_orders for bot in bots.values()
+                if bot.status in ('IDLE', 'BUSY')}
+        bot_positions.sync([bot for bot in bots.values() if room.get(bot.id, 0) > 0])
+
+        transfers = []
+        for order in sorted(orders, key=lambda o: o.id):
+            source = bots.get(order.bot_id)
+            plan = plans.get(order.bot_id)
+            index = next((i for i, waypoint in enumerate(plan or ())
+                          if waypoint['order_id'] == order.id and waypoint['type'] == 'pickup'), None)
+            if source is None or index is None:
+                continue
+
+            start = (source.current_x, source.current_y)
+            current_arrival = arrival(plan, start, index, distance)
+            saving = removal_saving(plan, start, index, distance)
+            best = self._best_target(order, source, current_arrival + saving, bots, plans, room, distance,
+                                     bot_positions, energy)
+            if best is None or best.gain < self.min_gain:
+                continue
+
+            waypoint = plan.pop(index)
+            plans.setdefault(best.to_bot_id, []).insert(best.index, waypoint)
+            room[best.to_bot_id] -= 1
+            room[source.id] = room.get(source.id, 0) + 1
+            transfers.append(best)
+            logger.debug("Order %s: bot %s -> bot %s gains %s steps", order.id, source.id, best.to_bot_id, best.gain)
+        return transfers
+
+    def _best_target(self, order: Order, source: Bot, budget: float, bots: Dict[int, Bot],
+                     plans: Dict[int, List[dict]], room: Dict[int, int], distance: LegDistances,
+                     bot_positions: BotIndex, energy: EnergyModel) -> Optional[Transfer]:
+        # budget: the current arrival plus the removal saving; a bot whose distance to the
+        # pickup already eats it (less min_gain) cannot win, nor can anyone farther away
+        pickup = (order.pickup_x, order.pickup_y)
+        best: Optional[Transfer] = None
+        checked = 0
+        for lower_bound, bot_id, position in bot_positions.nearest(*pickup):
+            if lower_bound > budget - self.min_gain or checked >= self.max_candidates:
+                break
+            bot = bots.get(bot_id)
+            plan = plans.get(bot_id)
+            # A loaded bot without a plan yet can't be priced
+            if bot_id == source.id or room.get(bot_id, 0) <= 0 or (plan is None and bot.current_orders):
+                continue
+            checked += 1
+
+            plan = plan or []
+            index, detour = cheapest_insertion(plan, position, pickup, distance)
+            # The plan's own trip to a station stands in for the one after this delivery
+            cost = energy.cost(detour + distance(pickup, (order.delivery_x, order.delivery_y)), deliveries=1)
+            if not energy.can_take(bot, cost):
+                continue
+            previous = plan[index - 1]['position'] if index else position
+            target_arrival = (arrival(plan, position, index - 1, distance) if index else 0) + distance(previous, pickup)
+            gain = budget - target_arrival - detour
+            if best is None or gain > best.gain or (gain == best.gain and bot_id < best.to_bot_id):
+                best = Transfer(order.id, source.id, bot_id, index, target_arrival, gain, cost)
+        return best
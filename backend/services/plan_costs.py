@@ -0,0 +1,53 @@
+from typing import Dict, List, Tuple
+from services.route_algorithm import RouteOptimizer
+
+Cell = Tuple[int, int]
+
+
+class LegDistances:
+    """Path lengths between cells, memoised for one planning pass; unreachable is inf"""
+
+    def __init__(self, route_optimizer: RouteOptimizer):
+        self.route_optimizer = route_optimizer
+        self._lengths: Dict[Tuple[Cell, Cell], float] = {}
+
+    def __call__(self, start: Cell, end: Cell) -> float:
+        key = (start, end)
+        if key not in self._lengths:
+            path = self.route_optimizer.dijkstra(start, end)
+            self._lengths[key] = len(path) - 1 if path else float('inf')
+        return self._lengths[key]
+
+
+def cheapest_insertion(plan: List[dict], start: Cell, position: Cell, distance: LegDistances) -> Tuple[int, float]:
+    """Index to insert a waypoint at `position` into plan (walked from start) and the steps it adds"""
+    best_index, best_detour = len(plan), float('inf')
+    for index in range(len(plan) + 1):
+        previous = plan[index - 1]['position'] if index else start
+        detour = distance(previous, position)
+        if index < len(plan):
+            following = plan[index]['position']
+            detour += distance(position, following) - distance(previous, following)
+        if detour < best_detour:
+            best_index, best_detour = index, detour
+    return best_index, best_detour
+
+
+def removal_saving(plan: List[dict], start: Cell, index: int, distance: LegDistances) -> float:
+    """Steps saved by taking the waypoint at index out of plan"""
+    previous = plan[index - 1]['position'] if index else start
+    position = plan[index]['position']
+    saving = distance(previous, position)
+    if index + 1 < len(plan):
+        following = plan[index + 1]['position']
+        saving += distance(position, following) - distance(previous, following)
+    return saving
+
+
+def arrival(plan: List[dict], start: Cell, index: int, distance: LegDistances) -> float:
+    """Steps from start, along plan, until the waypoint at index is reached"""
+    steps, previous = 0.0, start
+    for waypoint in plan[:index + 1]:
+        steps += distance(previous, waypoint['position'])
+        previous = waypoint['position']
+    return steps
@@ -1,33 +1,49 @@
 # services/route_algorithm.py - Enhanced with restrictions
 import heapq
+import logging
 from typing import List, Dict, Tuple, Optional, Set
-from sqlalchemy.orm import Session
-from models.node import Node
 from models.order import Order
 from models.bot import Bot
-from models.blocked_path import BlockedPath
 from core.config import settings
+from core.metrics import registry
+from repositories import Repositories, as_repositories
+
+logger = logging.getLogger(__name__)
+
+ROUTE_COMPUTATIONS = registry.counter("route_computations_total", "Shortest-path searches run by the route optimizer")
 
 class RouteOptimizer:
-    def __init__(self, db: Session):
-        self.db = db
-        self.grid_size = settings.grid_size
+    def __init__(self, db, grid_size: Optional[int] = None):
+        # db is a Session or a Repositories unit of work
+        self.repos: Repositories = as_repositories(db)
+        self.grid_size = grid_size or settings.grid_size
         self.blocked_paths = self._load_blocked_paths()
         self.restricted_nodes = self._load_restricted_nodes()
     
+    @classmethod
+    def from_map(cls, grid_size: int, blocked_paths: Set[Tuple[Tuple[int, int], Tuple[int, int]]],
+                restricted_nodes: Dict[str, Set[Tuple[int, int]]]) -> "RouteOptimizer":
+        # Build an optimizer from in-memory map data, without a database session
+        optimizer = cls.__new__(cls)
+        optimizer.repos = None
+        optimizer.grid_size = grid_size
+        optimizer.blocked_paths = set()
+        for from_pos, to_pos in blocked_paths:
+            optimizer.blocked_paths.add((from_pos, to_pos))
+            optimizer.blocked_paths.add((to_pos, from_pos))
+        optimizer.restricted_nodes = restricted_nodes
+        return optimizer
+    
     def _load_blocked_paths(self) -> Set[Tuple[Tuple[int, int], Tuple[int, int]]]:
         blocked_paths = set()
         
         # Get blocked paths from database
-        db_blocked_paths = self.db.query(BlockedPath).all()
-        print(f"Loading {len(db_blocked_paths)} blocked paths from database")
+        db_blocked_paths = self.repos.blocked_paths.list_pairs()
+        logger.debug("Loading %d blocked paths", len(db_blocked_paths))
         
-        for blocked in db_blocked_paths:
+        for from_id, to_id in db_blocked_paths:
             # Convert node IDs to coordinates using the grid formula
             # ID = y * grid_size + x + 1, so: x = (ID - 1) % grid_size, y = (ID - 1) // grid_size
-            from_id = blocked.from_node_id
-            to_id = blocked.to_node_id
-            
             from_x = (from_id - 1) % self.grid_size
             from_y = (from_id - 1) // self.grid_size
             to_x = (to_id - 1) % self.grid_size  
@@ -39,8 +55,6 @@ class RouteOptimizer:
             # Add both directions as blocked
             blocked_paths.add((from_pos, to_pos))
             blocked_paths.add((to_pos, from_pos))
-            
-            print(f"Blocked path: {from_pos} ↔ {to_pos} (IDs: {from_id} ↔ {to_id})")
         
         return blocked_paths
     
@@ -52,9 +66,9 @@ class RouteOptimizer:
         }
         
         # Get all special nodes
-        restaurants = self.db.query(Node).filter(Node.is_restaurant == True).all()
-        houses = self.db.query(Node).filter(Node.is_delivery_point == True).all()
-        bot_stations = self.db.query(Node).filter(Node.is_bot_station == True).all()
+        restaurants = self.repos.nodes.list_restaurants()
+        houses = self.repos.nodes.list_delivery_points()
+        bot_stations = self.repos.nodes.list_bot_stations()
         
         for restaurant in restaurants:
             restricted['restaurants'].add((restaurant.x, restaurant.y))
@@ -65,9 +79,8 @@ class RouteOptimizer:
         for station in bot_stations:
             restricted['bot_stations'].add((station.x, station.y))
         
-        print(f"Loaded {len(restricted['restaurants'])} restaurants as restricted transit")
-        print(f"Loaded {len(restricted['houses'])} houses as restricted transit")
-        print(f"Loaded {len(restricted['bot_stations'])} bot stations")
+        logger.debug("Loaded %d restaurants and %d houses as restricted transit, %d bot stations",
+                     len(restricted['restaurants']), len(restricted['houses']), len(restricted['bot_stations']))
         
         return restricted
     
@@ -107,12 +120,13 @@ class RouteOptimizer:
         if start == end:
             return [start]
         
+        ROUTE_COMPUTATIONS.inc()
         distances = {start: 0}
         previous = {}
         pq = [(0, start)]
         visited = set()
         
-        print(f"Finding path: {start} → {end}")
+        logger.debug("Finding path: %s -> %s", start, end)
         
         while pq:
             current_dist, current = heapq.heappop(pq)
@@ -130,7 +144,7 @@ class RouteOptimizer:
                     current = previous[current]
                 path.append(start)
                 result_path = path[::-1]
-                print(f"Path found: {len(result_path)-1} steps")
+                logger.debug("Path found: %d steps", len(result_path) - 1)
                 return result_path
             
             for neighbor in self.get_neighbors(current[0], current[1]):
@@ -152,7 +166,7 @@ class RouteOptimizer:
                     previous[neighbor] = current
                     heapq.heappush(pq, (distance, neighbor))
         
-        print(f"No path found from {start} to {end}")
+        logger.debug("No path found from %s to %s", start, end)
         return []  
     
     def calculate_total_distance(self, points: List[Tuple[int, int]]) -> int:
@@ -209,7 +223,7 @@ class RouteOptimizer:
                         "restaurant_type": order.restaurant_type
                     })
                 else:
-                    print(f"No path to pickup {pickup_pos} for order {order.id}")
+                    logger.warning("No path to pickup %s for order %s", pickup_pos, order.id)
             
             # Go to delivery
             path_to_delivery = self.dijkstra(current_pos, delivery_pos)
@@ -226,7 +240,7 @@ class RouteOptimizer:
                     "customer_name": order.customer_name
                 })
             else:
-                print(f"No path to delivery {delivery_pos} for order {order.id}")
+                logger.warning("No path to delivery %s for order %s", delivery_pos, order.id)
         
         return {
             "route_points": route_points,
@@ -237,10 +251,7 @@ class RouteOptimizer:
     
     def find_nearest_restaurant(self, position: Tuple[int, int], restaurant_type: str) -> Optional[Tuple[int, int]]:
         
-        restaurants = self.db.query(Node).filter(
-            Node.is_restaurant == True,
-            Node.restaurant_type == restaurant_type.upper()
-        ).all()
+        restaurants = self.repos.nodes.list_restaurants(restaurant_type)
         
         if not restaurants:
             return None
@@ -270,13 +281,13 @@ class RouteOptimizer:
             
             # Check if path segment is blocked
             if self.is_path_blocked(current, next_pos):
-                print(f"Path validation failed: blocked segment {current} → {next_pos}")
+                logger.debug("Path validation failed: blocked segment %s -> %s", current, next_pos)
                 return False
             
 
             if i > 0 and i < len(path) - 1:  
                 if self.is_node_restricted_for_transit(current, path[-1], path[0]):
-                    print(f"Path validation failed: transit through restricted node {current}")
+                    logger.debug("Path validation failed: transit through restricted node %s", current)
                     return False
         
         return True
@@ -0,0 +1,274 @@
+import asyncio
+import datetime
+import math
+import random
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from core.config import settings
+from repositories.memory import InMemoryStore, MemoryRepositories, OrderRecord
+from services.auto_movement import AutoMovementService
+from services.bot_index import BotIndex
+from services.charging import ChargingScheduler
+from services.demand_model import DemandModel
+from services.energy import EnergyModel
+from services.idle_positioning import IdlePositioner
+from services.map_data import MapData
+from services.order_batcher import OrderBatcher
+from services.order_rebalancer import OrderRebalancer
+from services.route_algorithm import RouteOptimizer
+
+
+class SimClock:
+    """Simulated wall clock for the in-memory store, advanced once per tick"""
+
+    def __init__(self, tick_seconds: float):
+        self.epoch = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        self.tick_seconds = tick_seconds
+        self.tick = 0
+
+    def __call__(self) -> datetime.datetime:
+        return self.epoch + datetime.timedelta(seconds=self.tick * self.tick_seconds)
+
+
+@dataclass
+class OrderTicks:
+    created: int
+    assigned: Optional[int] = None
+    picked_up: Optional[int] = None
+    delivered: Optional[int] = None
+
+
+@dataclass
+class SimulationConfig:
+    ticks: int = 1800
+    tick_seconds: float = 2.0
+    orders_per_minute: float = 6.0
+    bots: int = 5
+    bot_capacity: int = 3
+    seed: int = 42
+    restaurant_order_limit: int = settings.restaurant_order_limit
+    restaurant_time_window: int = settings.restaurant_time_window
+    # "station" or "demand", see services.idle_positioning
+    idle_policy: str = settings.idle_policy
+    # 0 assigns every order as soon as it arrives, still grouping same-tick arrivals
+    batch_window_seconds: float = settings.batch_window_seconds
+    # 0 never moves an ASSIGNED order to another bot
+    rebalance_interval_ticks: int = settings.rebalance_interval_ticks
+    # Chargers per station, and the share of the fleet allowed out charging at peak
+    station_capacity: int = settings.station_capacity
+    charge_peak_share: float = settings.charge_peak_share
+
+
+@dataclass
+class SimulationReport:
+    ticks: int
+    simulated_seconds: float
+    wall_seconds: float
+    ticks_per_second: float
+    orders_created: int
+    orders_rejected: int
+    orders_delivered: int
+    orders_open: int
+    throughput_per_hour: float
+    delivery_time_p50: Optional[float]
+    delivery_time_p95: Optional[float]
+    bot_utilisation: float
+    mean_pickup_distance: Optional[float]
+    steps_per_delivery: Optional[float]
+    # Deliveries per hour over the second half of the run, once batteries have been through a cycle
+    late_throughput_per_hour: float
+    bot_charging: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    # Nearest-rank percentile, q in [0, 100]
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class OrderGenerator:
+    """Seeded Poisson order arrivals between random restaurants and houses"""
+
+    def __init__(self, map_data: MapData, orders_per_minute: float, tick_seconds: float, seed: int):
+        self.rng = random.Random(seed)
+        self.restaurants = sorted(map_data.restaurants, key=lambda n: n.id)
+        self.houses = sorted(map_data.houses, key=lambda n: n.id)
+        self.mean_per_tick = orders_per_minute * tick_seconds / 60
+
+    def _poisson(self) -> int:
+        # Knuth's method, fine for the small per-tick means we use
+        limit = math.exp(-self.mean_per_tick)
+        count, product = 0, self.rng.random()
+        while product > limit:
+            count += 1
+            product *= self.rng.random()
+        return count
+
+    def arrivals(self) -> list:
+        if not self.restaurants or not self.houses:
+            return []
+        return [
+            (self.rng.choice(self.restaurants), self.rng.choice(self.houses))
+            for _ in range(self._poisson())
+        ]
+
+
+class FleetSimulator:
+    """Fixed-timestep fleet simulation: the live movement tick and dispatch over an in-memory store"""
+
+    def __init__(self, map_data: MapData, config: SimulationConfig):
+        self.config = config
+        self.map_data = map_data
+        self.clock = SimClock(config.tick_seconds)
+        self.store = InMemoryStore(clock=self.clock)
+        self.store.load_map(map_data)
+        self.store.order_listeners.append(self._on_order_change)
+        self.repos = MemoryRepositories(self.store)
+
+        self.route_optimizer = RouteOptimizer.from_map(
+            map_data.grid_size, map_data.blocked_paths, map_data.restricted_nodes()
+        )
+        # Own bot index: several simulators may share a process (benchmarks)
+        self.bot_index = BotIndex(settings.tile_size)
+        self.movement = AutoMovementService()
+        self.movement.route_optimizer = self.route_optimizer
+        self.movement.bot_index = self.bot_index
+        self.demand = DemandModel(
+            datetime.timedelta(hours=settings.demand_half_life_hours), settings.demand_bucket_minutes
+        )
+        self.movement.idle_positioner = IdlePositioner(
+            self.demand, settings.idle_demand_share, settings.idle_demand_targets
+        ) if config.idle_policy == "demand" else None
+        self.movement.load_bot_stations(self.repos)
+        # The movement tick dispatches pending orders through the same batcher the live loop uses
+        self.movement.rebalancer = OrderRebalancer(settings.rebalance_min_gain, config.rebalance_interval_ticks)
+        self.movement.order_batcher = OrderBatcher(
+            datetime.timedelta(seconds=config.batch_window_seconds), settings.batch_delivery_radius
+        )
+        self.movement.energy = EnergyModel(
+            settings.battery_step_cost, settings.battery_delivery_cost, settings.battery_reserve
+        )
+        self.movement.charging = ChargingScheduler(
+            self.movement.energy, config.station_capacity, settings.charge_per_tick, settings.charge_threshold,
+            settings.charge_critical, config.charge_peak_share
+        )
+        self.generator = OrderGenerator(
+            map_data, config.orders_per_minute, config.tick_seconds, config.seed
+        )
+
+        stations = sorted((n.x, n.y) for n in map_data.bot_stations) or [(0, 0)]
+        for i in range(config.bots):
+            self.store.add_bot(
+                name=f"Sim-Bot-{i + 1}",
+                current_x=stations[i % len(stations)][0],
+                current_y=stations[i % len(stations)][1],
+                max_capacity=config.bot_capacity
+            )
+
+        self.order_ticks: Dict[int, OrderTicks] = {}
+        self.rejected = 0
+        self.busy_bot_ticks = 0
+        self.charging_bot_ticks = 0
+        self.bot_steps = 0
+
+    @property
+    def tick(self) -> int:
+        return self.clock.tick
+
+    def run(self) -> SimulationReport:
+        started = time.perf_counter()
+        asyncio.run(self._run_ticks())
+        return self.report(time.perf_counter() - started)
+
+    async def _run_ticks(self):
+        for _ in range(self.config.ticks):
+            await self.step()
+
+    async def step(self):
+        self._generate_orders()
+
+        positions = {bot.id: (bot.current_x, bot.current_y) for bot in self.store.bots.values()}
+        await self.movement.process_tick(self.repos)
+        self.bot_steps += sum(
+            1 for bot in self.store.bots.values() if positions[bot.id] != (bot.current_x, bot.current_y)
+        )
+        self.busy_bot_ticks += sum(1 for bot in self.store.bots.values() if bot.current_orders > 0)
+        self.charging_bot_ticks += sum(1 for bot in self.store.bots.values() if bot.status == 'CHARGING')
+
+        self.clock.tick += 1
+
+    def _on_order_change(self, order: OrderRecord, name: str, old, new):
+        # Stamp lifecycle ticks as the live code moves orders through their states
+        if name != 'status':
+            return
+        ticks = self.order_ticks[order.id]
+        if new == 'ASSIGNED':
+            ticks.assigned = self.tick
+        elif new == 'PICKED_UP':
+            ticks.picked_up = self.tick
+        elif new == 'DELIVERED':
+            ticks.delivered = self.tick
+
+    def _generate_orders(self):
+        since = self.clock() - datetime.timedelta(seconds=self.config.restaurant_time_window)
+
+        for restaurant, house in self.generator.arrivals():
+            # Same per-restaurant capacity limit as POST /orders/
+            cell = (restaurant.x, restaurant.y)
+            recent = self.repos.orders.count_recent_by_pickup([cell], since).get(cell, 0)
+            if recent >= self.config.restaurant_order_limit:
+                self.rejected += 1
+                continue
+
+            order = self.repos.orders.create({
+                "restaurant_type": restaurant.restaurant_type,
+                "restaurant_name": restaurant.name,
+                "restaurant_id": restaurant.id,
+                "customer_name": f"Customer_{len(self.order_ticks) + 1}",
+                "pickup_x": restaurant.x,
+                "pickup_y": restaurant.y,
+                "delivery_x": house.x,
+                "delivery_y": house.y
+            })
+            self.order_ticks[order.id] = OrderTicks(created=self.tick)
+            self.demand.record(cell, self.clock())
+
+    def report(self, wall_seconds: float) -> SimulationReport:
+        dt = self.config.tick_seconds
+        delivered = [t for t in self.order_ticks.values() if t.delivered is not None]
+        delivery_times = [(t.delivered - t.created) * dt for t in delivered]
+        pickup_distances = [
+            o.estimated_distance for o in self.store.orders.values()
+            if o.estimated_distance is not None
+        ]
+        simulated_seconds = self.tick * dt
+        half = self.tick // 2
+        late = sum(1 for t in delivered if t.delivered >= half)
+        late_seconds = (self.tick - half) * dt
+        bot_ticks = self.tick * len(self.store.bots)
+
+        return SimulationReport(
+            ticks=self.tick,
+            simulated_seconds=simulated_seconds,
+            wall_seconds=round(wall_seconds, 3),
+            ticks_per_second=round(self.tick / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+            orders_created=len(self.order_ticks),
+            orders_rejected=self.rejected,
+            orders_delivered=len(delivered),
+            orders_open=len(self.order_ticks) - len(delivered),
+            throughput_per_hour=round(len(delivered) / simulated_seconds * 3600, 2) if simulated_seconds else 0.0,
+            delivery_time_p50=percentile(delivery_times, 50),
+            delivery_time_p95=percentile(delivery_times, 95),
+            bot_utilisation=round(self.busy_bot_ticks / bot_ticks, 3) if bot_ticks else 0.0,
+            mean_pickup_distance=round(sum(pickup_distances) / len(pickup_distances), 2) if pickup_distances else None,
+            steps_per_delivery=round(self.bot_steps / len(delivered), 2) if delivered else None,
+            late_throughput_per_hour=round(late / late_seconds * 3600, 2) if late_seconds else 0.0,
+            bot_charging=round(self.charging_bot_ticks / bot_ticks, 3) if bot_ticks else 0.0
+        )
@@ -0,0 +1,129 @@
+import heapq
+import itertools
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+Cell = Tuple[int, int]
+
+
+def tiles_in_box(x0: int, y0: int, x1: int, y1: int, tile_size: int) -> Iterator[Cell]:
+    """Tiles overlapping the inclusive box (x0, y0)-(x1, y1)"""
+    for ty in range(y0 // tile_size, y1 // tile_size + 1):
+        for tx in range(x0 // tile_size, x1 // tile_size + 1):
+            yield tx, ty
+
+
+class GridBucketIndex:
+    """
+    Keyed points in uniform-grid buckets of tile_size x tile_size cells. A box query only
+    visits the buckets it overlaps, so its cost follows the box and the density inside it,
+    not the number of points.
+    """
+
+    def __init__(self, tile_size: int = 16):
+        self.tile_size = tile_size
+        self._buckets: Dict[Cell, Dict[Hashable, Cell]] = {}
+        self._positions: Dict[Hashable, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    def tile_of(self, x: int, y: int) -> Cell:
+        return x // self.tile_size, y // self.tile_size
+
+    def position(self, key) -> Optional[Cell]:
+        return self._positions.get(key)
+
+    def move(self, key, x: int, y: int):
+        """Insert the key, or move it if it is already indexed"""
+        old = self._positions.get(key)
+        if old == (x, y):
+            return
+        if old is not None:
+            self._discard(key, old)
+        self._positions[key] = (x, y)
+        self._buckets.setdefault(self.tile_of(x, y), {})[key] = (x, y)
+
+    def remove(self, key):
+        old = self._positions.pop(key, None)
+        if old is not None:
+            self._discard(key, old)
+
+    def clear(self):
+        self._buckets.clear()
+        self._positions.clear()
+
+    def _discard(self, key, position: Cell):
+        tile = self.tile_of(*position)
+        bucket = self._buckets.get(tile)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._buckets[tile]
+
+    def query(self, x0: int, y0: int, x1: int, y1: int) -> List:
+        """Keys whose position lies in the inclusive box"""
+        keys = []
+        for tile in tiles_in_box(max(x0, 0), max(y0, 0), x1, y1, self.tile_size):
+            bucket = self._buckets.get(tile)
+            if not bucket:
+                continue
+            for key, (x, y) in bucket.items():
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    keys.append(key)
+        return keys
+
+    def in_tile(self, tile: Cell) -> Dict[Hashable, Cell]:
+        return self._buckets.get(tile, {})
+
+    def nearest(self, x: int, y: int) -> Iterator[Tuple[int, Hashable, Cell]]:
+        """
+        (Manhattan distance, key, position) in ascending distance from (x, y). Buckets are
+        visited in rings of tiles around (x, y) and only as far as the consumer keeps reading,
+        so stopping early costs the density near (x, y), not the number of points.
+        """
+        if not self._positions:
+            return
+        tx, ty = self.tile_of(x, y)
+        last_ring = max(max(abs(bx - tx), abs(by - ty)) for bx, by in self._buckets)
+        order = itertools.count()
+        heap = []
+
+        for ring in range(last_ring + 1):
+            # Anything already found that is no farther than this ring can get is next
+            bound = self._ring_bound(x, y, tx, ty, ring)
+            while heap and heap[0][0] <= bound:
+                distance, _, key, position = heapq.heappop(heap)
+                yield distance, key, position
+            for tile in _ring_tiles(tx, ty, ring):
+                for key, (px, py) in self._buckets.get(tile, {}).items():
+                    heapq.heappush(heap, (abs(px - x) + abs(py - y), next(order), key, (px, py)))
+
+        while heap:
+            distance, _, key, position = heapq.heappop(heap)
+            yield distance, key, position
+
+    def _ring_bound(self, x: int, y: int, tx: int, ty: int, ring: int) -> int:
+        """Smallest Manhattan distance from (x, y) to a cell in the given ring of tiles"""
+        if ring == 0:
+            return 0
+        size = self.tile_size
+        return min(
+            x - (tx - ring + 1) * size + 1, (tx + ring) * size - x,
+            y - (ty - ring + 1) * size + 1, (ty + ring) * size - y,
+        )
+
+
+def _ring_tiles(tx: int, ty: int, ring: int) -> Iterator[Cell]:
+    """Tiles at Chebyshev distance ring from (tx, ty)"""
+    if ring == 0:
+        yield tx, ty
+        return
+    for dx in range(-ring, ring + 1):
+        yield tx + dx, ty - ring
+        yield tx + dx, ty + ring
+    for dy in range(-ring + 1, ring):
+        yield tx - ring, ty + dy
+        yield tx + ring, ty + dy
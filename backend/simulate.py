@@ -0,0 +1,74 @@
+# simulate.py - Headless fleet simulation for capacity planning
+import argparse
+import json
+from core.config import settings
+from core.log import setup_logging
+from services.map_data import load_map_csv
+from services.simulator import FleetSimulator, SimulationConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a deterministic, time-warped fleet simulation")
+    parser.add_argument("--ticks", type=int, default=1800, help="number of ticks to simulate")
+    parser.add_argument("--tick-seconds", type=float, default=2.0, help="simulated seconds per tick")
+    parser.add_argument("--rate", type=float, default=6.0, help="order arrivals per simulated minute")
+    parser.add_argument("--bots", type=int, default=settings.max_bots, help="fleet size")
+    parser.add_argument("--capacity", type=int, default=settings.max_orders_per_bot, help="orders per bot")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--grid-size", type=int, default=settings.grid_size)
+    parser.add_argument("--map", default="./sample_data.csv", help="sample_data.csv style map")
+    parser.add_argument("--blocked", default="./BlockedPaths.csv", help="BlockedPaths.csv style edges")
+    parser.add_argument("--idle-policy", choices=["station", "demand"], default=settings.idle_policy,
+                        help="where idle bots wait: nearest station, or cells near predicted demand")
+    parser.add_argument("--batch-window", type=float, default=settings.batch_window_seconds,
+                        help="seconds a partial same-restaurant batch waits for more orders")
+    parser.add_argument("--rebalance-interval", type=int, default=settings.rebalance_interval_ticks,
+                        help="ticks between moving assigned orders to bots that reach them sooner (0 = never)")
+    parser.add_argument("--station-capacity", type=int, default=settings.station_capacity,
+                        help="bots that can charge at one station at the same time")
+    parser.add_argument("--charge-peak-share", type=float, default=settings.charge_peak_share,
+                        help="share of the fleet allowed out charging at peak")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="log planner and movement details")
+    args = parser.parse_args()
+
+    map_data = load_map_csv(args.map, args.blocked, args.grid_size)
+    config = SimulationConfig(
+        ticks=args.ticks,
+        tick_seconds=args.tick_seconds,
+        orders_per_minute=args.rate,
+        bots=args.bots,
+        bot_capacity=args.capacity,
+        seed=args.seed,
+        idle_policy=args.idle_policy,
+        batch_window_seconds=args.batch_window,
+        rebalance_interval_ticks=args.rebalance_interval,
+        station_capacity=args.station_capacity,
+        charge_peak_share=args.charge_peak_share
+    )
+    # Per-bot movement logs only when asked for
+    setup_logging(level="WARNING", levels={"services": "DEBUG"} if args.verbose else None)
+    report = FleetSimulator(map_data, config).run()
+
+    if args.json:
+        print(json.dumps(report.to_dict(), indent=2))
+        return
+
+    print("=" * 60)
+    print(" FLEET SIMULATION REPORT")
+    print("=" * 60)
+    print(f"Ticks: {report.ticks} ({report.simulated_seconds / 3600:.2f} simulated hours)")
+    print(f"Wall clock: {report.wall_seconds}s ({report.ticks_per_second} ticks/sec)")
+    print(f"Orders: {report.orders_created} created, {report.orders_rejected} rejected, "
+          f"{report.orders_delivered} delivered, {report.orders_open} open")
+    print(f"Throughput: {report.throughput_per_hour} deliveries/hour "
+          f"({report.late_throughput_per_hour} over the second half)")
+    print(f"Delivery time p50/p95: {report.delivery_time_p50}s / {report.delivery_time_p95}s")
+    print(f"Bot utilisation: {report.bot_utilisation * 100:.1f}% ({report.bot_charging * 100:.1f}% charging)")
+    print(f"Mean pickup distance: {report.mean_pickup_distance}")
+    print(f"Bot steps per delivery: {report.steps_per_delivery}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,15 @@ import type {
     Restaurant,
     DeliveryPoint,
     MapGrid,
+    MapViewport,
+    DemandHeatmap,
     SystemStats,
     BotRoute,
     BlockedPathsResponse,
+    CompactGrid,
+    CompactRoute,
 } from '../types'
+import { COMPACT_MEDIA_TYPE, decodeGrid } from './compact'
 
 const API_BASE_URL = 'http://localhost:8000'
 const API_VERSION = '/api/v1'
@@ -86,6 +91,28 @@ export class ApiService {
         return response.data
     }
 
+    // Only the cells, bots and active orders inside the box (inclusive corners)
+    static async getMapViewport(x0: number, y0: number, x1: number, y1: number): Promise<MapViewport> {
+        const response: AxiosResponse<MapViewport> = await apiClient.get(
+        API_VERSION + `/map/viewport?x0=${x0}&y0=${y0}&x1=${x1}&y1=${y1}`
+        )
+        return response.data
+    }
+
+    static async getDemandHeatmap(limit = 100): Promise<DemandHeatmap> {
+        const response: AxiosResponse<DemandHeatmap> = await apiClient.get(API_VERSION + `/map/demand?limit=${limit}`)
+        return response.data
+    }
+
+    // Packed node flags plus bot and order columns; kilobytes where the JSON grid is megabytes
+    static async getCompactMapGrid(): Promise<CompactGrid> {
+        const response: AxiosResponse<ArrayBuffer> = await apiClient.get(API_VERSION + '/map/grid', {
+            headers: { Accept: COMPACT_MEDIA_TYPE },
+            responseType: 'arraybuffer',
+        })
+        return decodeGrid(response.data)
+    }
+
     static async getRestaurants(): Promise<Restaurant[]> {
         const response: AxiosResponse<Restaurant[]> = await apiClient.get(API_VERSION + '/map/restaurants')
         return response.data
@@ -171,6 +198,14 @@ export class ApiService {
         return response.data
     }
 
+    // Same as optimizeAllRoutes, with each detailed_path run-length encoded (decode with decodeRoute)
+    static async optimizeAllRoutesCompact(): Promise<Record<string, Omit<BotRoute, 'detailed_path'> & { detailed_path: CompactRoute | null }>> {
+        const response: AxiosResponse = await apiClient.get(API_VERSION + '/routes/optimize', {
+            headers: { Accept: COMPACT_MEDIA_TYPE },
+        })
+        return response.data
+    }
+
     static async rebalanceOrders() {
         const response: AxiosResponse = await apiClient.post(API_VERSION + '/routes/rebalance')
         return response.data
@@ -0,0 +1,105 @@
+import type { CompactGrid, CompactRoute } from '../types'
+
+// Decoders for the compact encodings in backend/core/compact.py; keep the layouts in step
+
+export const COMPACT_MEDIA_TYPE = 'application/vnd.eagroute.compact'
+
+const GRID_MAGIC = 'EGRD'
+const GRID_VERSION = 1
+const HEADER_BYTES = 16
+
+export const NODE_TYPES = ['NODE', 'HOUSE', 'RESTAURANT', 'BOT_STATION'] as const
+export const BOT_STATUSES = ['IDLE', 'BUSY', 'MAINTENANCE', 'CHARGING'] as const
+export const ORDER_STATUSES = ['PENDING', 'ASSIGNED', 'PICKED_UP', 'DELIVERED', 'CANCELLED'] as const
+export const RESTAURANT_TYPES = ['RAMEN', 'SUSHI', 'CURRY', 'PIZZA'] as const
+
+export const DELIVERY_POINT = 1 << 2
+export const RESTAURANT = 1 << 3
+export const BOT_STATION = 1 << 4
+
+// [dx, dy] per 2-bit direction code: right, down, left, up
+const DIRECTIONS: ReadonlyArray<readonly [number, number]> = [[1, 0], [0, 1], [-1, 0], [0, -1]]
+
+export const nodeType = (flags: number) => NODE_TYPES[flags & 0b11] ?? 'NODE'
+
+export const restaurantType = (flags: number) => RESTAURANT_TYPES[(flags >> 5) - 1] ?? null
+
+// Sections sit on 4-byte boundaries, so every column is a view on the response buffer, not a copy
+class SectionReader {
+    private offset = HEADER_BYTES
+
+    constructor(private buffer: ArrayBuffer) {}
+
+    take<T>(make: (buffer: ArrayBuffer, offset: number, length: number) => T, length: number, itemSize: number): T {
+        const view = make(this.buffer, this.offset, length)
+        this.offset += Math.ceil((length * itemSize) / 4) * 4
+        return view
+    }
+
+    u8(length: number) {
+        return this.take((b, o, n) => new Uint8Array(b, o, n), length, 1)
+    }
+
+    u16(length: number) {
+        return this.take((b, o, n) => new Uint16Array(b, o, n), length, 2)
+    }
+
+    u32(length: number) {
+        return this.take((b, o, n) => new Uint32Array(b, o, n), length, 4)
+    }
+}
+
+export function decodeGrid(buffer: ArrayBuffer): CompactGrid {
+    const header = new DataView(buffer, 0, HEADER_BYTES)
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4))
+    if (magic !== GRID_MAGIC || header.getUint16(4, true) !== GRID_VERSION) {
+        throw new Error(`Unsupported compact grid: ${magic} v${header.getUint16(4, true)}`)
+    }
+    const gridSize = header.getUint16(6, true)
+    const botCount = header.getUint32(8, true)
+    const orderCount = header.getUint32(12, true)
+
+    // Typed arrays use the platform byte order; the payload is little-endian like every browser target
+    const reader = new SectionReader(buffer)
+    return {
+        grid_size: gridSize,
+        nodes: reader.u8(gridSize * gridSize),
+        bots: {
+            id: reader.u32(botCount),
+            x: reader.u16(botCount),
+            y: reader.u16(botCount),
+            status: reader.u8(botCount),
+            current_orders: reader.u8(botCount),
+            battery_level: reader.u8(botCount),
+        },
+        orders: {
+            id: reader.u32(orderCount),
+            bot_id: reader.u32(orderCount),
+            pickup_x: reader.u16(orderCount),
+            pickup_y: reader.u16(orderCount),
+            delivery_x: reader.u16(orderCount),
+            delivery_y: reader.u16(orderCount),
+            status: reader.u8(orderCount),
+            restaurant_type: reader.u8(orderCount),
+        },
+    }
+}
+
+export function decodeRoute(route: CompactRoute | null | undefined): Array<[number, number]> {
+    if (!route) {
+        return []
+    }
+    let [x, y] = route.start
+    const cells: Array<[number, number]> = [[x, y]]
+    const runs = atob(route.runs)
+    for (let i = 0; i < runs.length; i++) {
+        const run = runs.charCodeAt(i)
+        const [dx, dy] = DIRECTIONS[run & 0b11] ?? [0, 0]
+        for (let step = 0; step <= run >> 2; step++) {
+            x += dx
+            y += dy
+            cells.push([x, y])
+        }
+    }
+    return cells
+}
@@ -4,7 +4,7 @@ export interface Bot {
     current_x: number
     current_y: number
     max_capacity: number
-    status: 'IDLE' | 'BUSY' | 'MAINTENANCE'
+    status: 'IDLE' | 'BUSY' | 'MAINTENANCE' | 'CHARGING'
     current_orders: number
     battery_level: number
     created_at: string
@@ -121,6 +121,36 @@ export interface MapGrid {
     active_orders: number
 }
 
+export interface MapViewport {
+    grid: Record<string, GridCell>
+    bounds: { x0: number ; y0: number ; x1: number ; y1: number }
+    grid_size: number
+    tile_size: number
+    total_bots: number
+    active_orders: number
+}
+
+// Socket.IO `tile_bots`: replaces the bots of one tile of a subscribed viewport
+export interface TileBotsEvent {
+    tile: [number, number]
+    bots: Array<{
+        id: number
+        x: number
+        y: number
+        status: string
+        current_orders: number
+        battery_level: number
+    }>
+}
+
+// GET /map/demand: relative predicted demand per restaurant cell and the idle bots' waiting cells
+export interface DemandHeatmap {
+    policy: 'station' | 'demand'
+    bucket_minutes: number
+    cells: Array<{ x: number ; y: number ; weight: number }>
+    waiting: Array<{ bot_id: number ; x: number ; y: number }>
+}
+
 export interface SystemStats {
     map: {
         total_nodes: number
@@ -156,4 +186,35 @@ export interface BotRoute {
 
 export interface ApiError {
     detail: string
-}
\ No newline at end of file
+}
+// Compact encodings, requested with `Accept: application/vnd.eagroute.compact`
+// (see backend/core/compact.py and services/compact.ts)
+export interface CompactRoute {
+    start: [number, number]
+    steps: number
+    runs: string
+}
+
+export interface CompactGrid {
+    grid_size: number
+    // One flag byte per cell, index y * grid_size + x
+    nodes: Uint8Array
+    bots: {
+        id: Uint32Array
+        x: Uint16Array
+        y: Uint16Array
+        status: Uint8Array
+        current_orders: Uint8Array
+        battery_level: Uint8Array
+    }
+    orders: {
+        id: Uint32Array
+        bot_id: Uint32Array
+        pickup_x: Uint16Array
+        pickup_y: Uint16Array
+        delivery_x: Uint16Array
+        delivery_y: Uint16Array
+        status: Uint8Array
+        restaurant_type: Uint8Array
+    }
+}